@@ -1,6 +1,6 @@
 """Functions used to generate source files during build time"""
 
-import zlib
+from methods import EMBED_CODECS, compress, format_buffer, open_if_changed
 
 
 def escape_string(s):
@@ -26,13 +26,13 @@ def escape_string(s):
 def make_certs_header(target, source, env):
     src = str(source[0])
     dst = str(target[0])
-    with open(src, "rb") as f, open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open(src, "rb") as f, open_if_changed(dst) as g:
         buf = f.read()
         decomp_size = len(buf)
 
-        # Use maximum zlib compression level to further reduce file size
-        # (at the cost of initial build times).
-        buf = zlib.compress(buf, zlib.Z_BEST_COMPRESSION)
+        # Use the maximum compression level to further reduce file size
+        # (at the cost of build times, unless cached by `compress`).
+        buf = compress(buf, env["embed_compression"])
 
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef CERTS_COMPRESSED_GEN_H\n")
@@ -44,12 +44,15 @@ def make_certs_header(target, source, env):
         if env["builtin_certs"]:
             # Defined here and not in env so changing it does not trigger a full rebuild.
             g.write("#define BUILTIN_CERTS_ENABLED\n")
+            g.write('#include "core/io/compression.h"\n')
+            g.write(
+                f"static const Compression::Mode _certs_compression_mode = {EMBED_CODECS[env['embed_compression']]};\n"
+            )
             g.write("static const int _certs_compressed_size = " + str(len(buf)) + ";\n")
             g.write("static const int _certs_uncompressed_size = " + str(decomp_size) + ";\n")
             g.write("static const unsigned char _certs_compressed[] = {\n")
-            for i in range(len(buf)):
-                g.write("\t" + str(buf[i]) + ",\n")
-            g.write("};\n")
+            g.write(format_buffer(buf, 1))
+            g.write("\n};\n")
         g.write("#endif // CERTS_COMPRESSED_GEN_H")
 
 
@@ -69,7 +72,7 @@ def make_authors_header(target, source, env):
 
     src = str(source[0])
     dst = str(target[0])
-    with open(src, "r", encoding="utf-8") as f, open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open(src, "r", encoding="utf-8") as f, open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef AUTHORS_GEN_H\n")
         g.write("#define AUTHORS_GEN_H\n")
@@ -126,7 +129,7 @@ def make_donors_header(target, source, env):
 
     src = str(source[0])
     dst = str(target[0])
-    with open(src, "r", encoding="utf-8") as f, open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open(src, "r", encoding="utf-8") as f, open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef DONORS_GEN_H\n")
         g.write("#define DONORS_GEN_H\n")
@@ -220,7 +223,7 @@ def make_license_header(target, source, env):
             part["copyright_index"] = len(data_list)
             data_list += part["Copyright"]
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as f:
+    with open_if_changed(dst) as f:
         f.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         f.write("#ifndef LICENSE_GEN_H\n")
         f.write("#define LICENSE_GEN_H\n")
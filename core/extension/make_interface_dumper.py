@@ -1,16 +1,16 @@
-import zlib
+from methods import compress, format_buffer, open_if_changed
 
 
 def run(target, source, env):
     src = str(source[0])
     dst = str(target[0])
-    with open(src, "rb") as f, open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open(src, "rb") as f, open_if_changed(dst) as g:
         buf = f.read()
         decomp_size = len(buf)
 
         # Use maximum zlib compression level to further reduce file size
-        # (at the cost of initial build times).
-        buf = zlib.compress(buf, zlib.Z_BEST_COMPRESSION)
+        # (at the cost of build times, unless cached by `compress`).
+        buf = compress(buf)
 
         g.write(
             """/* THIS FILE IS GENERATED DO NOT EDIT */
@@ -29,9 +29,8 @@ def run(target, source, env):
         g.write("static const int _gdextension_interface_data_compressed_size = " + str(len(buf)) + ";\n")
         g.write("static const int _gdextension_interface_data_uncompressed_size = " + str(decomp_size) + ";\n")
         g.write("static const unsigned char _gdextension_interface_data_compressed[] = {\n")
-        for i in range(len(buf)):
-            g.write("\t" + str(buf[i]) + ",\n")
-        g.write("};\n")
+        g.write(format_buffer(buf, 1))
+        g.write("\n};\n")
 
         g.write(
             """
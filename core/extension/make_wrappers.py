@@ -1,3 +1,5 @@
+from methods import open_if_changed
+
 proto_mod = """
 #define MODBIND$VER($RETTYPE m_name$ARG) \\
 virtual $RETVAL _##m_name($FUNCARGS) $CONST; \\
@@ -140,5 +142,5 @@ def run(target, source, env):
 
     txt += "\n#endif\n"
 
-    with open(str(target[0]), "w", encoding="utf-8", newline="\n") as f:
+    with open_if_changed(str(target[0])) as f:
         f.write(txt)
@@ -2,10 +2,12 @@
 
 from collections import OrderedDict
 
+from methods import open_if_changed
+
 
 def make_default_controller_mappings(target, source, env):
     dst = str(target[0])
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write('#include "core/typedefs.h"\n')
         g.write('#include "core/input/default_controller_mappings.h"\n')
@@ -1,3 +1,5 @@
+from methods import open_if_changed
+
 script_call = """ScriptInstance *_script_instance = ((Object *)(this))->get_script_instance();\\
 		if (_script_instance) {\\
 			Callable::CallError ce;\\
@@ -259,5 +261,5 @@ def run(target, source, env):
 
     txt += "#endif // GDVIRTUAL_GEN_H\n"
 
-    with open(str(target[0]), "w", encoding="utf-8", newline="\n") as f:
+    with open_if_changed(str(target[0])) as f:
         f.write(txt)
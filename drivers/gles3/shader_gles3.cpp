@@ -99,7 +99,7 @@ void ShaderGLES3::_add_stage(const char *p_code, StageType p_stage_type) {
 	}
 }
 
-void ShaderGLES3::_setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_name, int p_uniform_count, const char **p_uniform_names, int p_ubo_count, const UBOPair *p_ubos, int p_feedback_count, const Feedback *p_feedback, int p_texture_count, const TexUnitPair *p_tex_units, int p_specialization_count, const Specialization *p_specializations, int p_variant_count, const char **p_variants) {
+void ShaderGLES3::_setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_name, int p_uniform_count, const char **p_uniform_names, int p_ubo_count, const UBOPair *p_ubos, int p_feedback_count, const Feedback *p_feedback, int p_texture_count, const TexUnitPair *p_tex_units, int p_specialization_count, const Specialization *p_specializations, uint64_t p_specialization_default_mask, int p_variant_count, const char **p_variants) {
 	name = p_name;
 
 	if (p_vertex_code) {
@@ -117,12 +117,7 @@ void ShaderGLES3::_setup(const char *p_vertex_code, const char *p_fragment_code,
 	texunit_pair_count = p_texture_count;
 	specializations = p_specializations;
 	specialization_count = p_specialization_count;
-	specialization_default_mask = 0;
-	for (int i = 0; i < specialization_count; i++) {
-		if (specializations[i].default_value) {
-			specialization_default_mask |= (uint64_t(1) << uint64_t(i));
-		}
-	}
+	specialization_default_mask = p_specialization_default_mask;
 	variant_defines = p_variants;
 	variant_count = p_variant_count;
 	feedbacks = p_feedback;
@@ -151,6 +146,31 @@ void ShaderGLES3::_setup(const char *p_vertex_code, const char *p_fragment_code,
 	base_sha256 = tohash.as_string().sha256_text();
 }
 
+static CharString _join_chunks(const char *const *p_chunks) {
+	int length = 0;
+	for (const char *const *chunk = p_chunks; *chunk; chunk++) {
+		length += strlen(*chunk);
+	}
+
+	CharString code;
+	code.resize(length + 1);
+	char *dst = code.ptrw();
+	for (const char *const *chunk = p_chunks; *chunk; chunk++) {
+		const int chunk_length = strlen(*chunk);
+		memcpy(dst, *chunk, chunk_length);
+		dst += chunk_length;
+	}
+	*dst = '\0';
+	return code;
+}
+
+void ShaderGLES3::_setup(const char *const *p_vertex_chunks, const char *const *p_fragment_chunks, const char *p_name, int p_uniform_count, const char **p_uniform_names, int p_ubo_count, const UBOPair *p_ubos, int p_feedback_count, const Feedback *p_feedback, int p_texture_count, const TexUnitPair *p_tex_units, int p_specialization_count, const Specialization *p_specializations, uint64_t p_specialization_default_mask, int p_variant_count, const char **p_variants) {
+	const CharString vertex_code = p_vertex_chunks ? _join_chunks(p_vertex_chunks) : CharString();
+	const CharString fragment_code = p_fragment_chunks ? _join_chunks(p_fragment_chunks) : CharString();
+
+	_setup(p_vertex_chunks ? vertex_code.get_data() : nullptr, p_fragment_chunks ? fragment_code.get_data() : nullptr, p_name, p_uniform_count, p_uniform_names, p_ubo_count, p_ubos, p_feedback_count, p_feedback, p_texture_count, p_tex_units, p_specialization_count, p_specializations, p_specialization_default_mask, p_variant_count, p_variants);
+}
+
 RID ShaderGLES3::version_create() {
 	//initialize() was never called
 	ERR_FAIL_COND_V(variant_count == 0, RID());
@@ -173,7 +193,7 @@ void ShaderGLES3::_build_variant_code(StringBuilder &builder, uint32_t p_variant
 
 	for (int i = 0; i < specialization_count; i++) {
 		if (p_specialization & (uint64_t(1) << uint64_t(i))) {
-			builder.append("#define " + String(specializations[i].name) + "\n");
+			builder.append(specializations[i].define);
 		}
 	}
 	if (p_version->uniforms.size()) {
@@ -186,7 +206,6 @@ void ShaderGLES3::_build_variant_code(StringBuilder &builder, uint32_t p_variant
 	builder.append("\n"); //make sure defines begin at newline
 	builder.append(general_defines.get_data());
 	builder.append(variant_defines[p_variant]);
-	builder.append("\n");
 	for (int j = 0; j < p_version->custom_defines.size(); j++) {
 		builder.append(p_version->custom_defines[j].get_data());
 	}
@@ -1,112 +1,263 @@
 """Functions used to generate source files during build time"""
 
+import hashlib
 import os
 import os.path
+import re
 import shutil
+import struct
 import subprocess
 import tempfile
 import uuid
-import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from typing import Dict, Optional, Tuple
 
-from methods import print_warning
+from methods import EMBED_CODECS, compress, embed_buffers, open_if_changed, print_warning, write_file_if_changed
 
 
 def make_doc_header(target, source, env):
     dst = str(target[0])
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
-        buf = ""
-        docbegin = ""
-        docend = ""
+    with StringIO() as g:
+        # Each class is compressed separately, so the editor only has to inflate one
+        # of them at a time. Sorting by class name keeps the output stable.
+        classes = []
         for src in source:
             src = str(src)
             if not src.endswith(".xml"):
                 continue
             with open(src, "r", encoding="utf-8") as f:
                 content = f.read()
-            buf += content
+            classes.append((os.path.splitext(os.path.basename(src))[0], content.encode("utf-8")))
+        classes.sort(key=lambda x: x[0])
 
-        buf = (docbegin + buf + docend).encode("utf-8")
-        decomp_size = len(buf)
-
-        # Use maximum zlib compression level to further reduce file size
-        # (at the cost of initial build times).
-        buf = zlib.compress(buf, zlib.Z_BEST_COMPRESSION)
+        chunks = []
+        offset = 0
+        decomp_size = 0
+        digest = hashlib.sha256()
+        for name, content in classes:
+            digest.update(content)
+            # Use the maximum compression level to further reduce file size
+            # (at the cost of build times, unless cached by `compress`).
+            compressed = compress(content, env["embed_compression"])
+            chunks.append((name, offset, compressed, len(content)))
+            offset += len(compressed)
+            decomp_size += len(content)
+        buf = b"".join(x[2] for x in chunks)
 
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef _DOC_DATA_RAW_H\n")
         g.write("#define _DOC_DATA_RAW_H\n")
-        g.write('static const char *_doc_data_hash = "' + str(hash(buf)) + '";\n')
+        # Hash the uncompressed data, so it's stable across processes and machines (regardless of
+        # the zlib implementation), as it's used to validate the editor's doc cache.
+        g.write('static const char *_doc_data_hash = "' + digest.hexdigest() + '";\n')
+        g.write('#include "core/io/compression.h"\n')
+        g.write(
+            f"static const Compression::Mode _doc_data_compression_mode = {EMBED_CODECS[env['embed_compression']]};\n"
+        )
         g.write("static const int _doc_data_compressed_size = " + str(len(buf)) + ";\n")
         g.write("static const int _doc_data_uncompressed_size = " + str(decomp_size) + ";\n")
-        g.write("static const unsigned char _doc_data_compressed[] = {\n")
-        for i in range(len(buf)):
-            g.write("\t" + str(buf[i]) + ",\n")
+        g.write(embed_buffers(target, [("_doc_data_compressed", buf)]))
+
+        g.write("struct _DocDataClassChunk {\n")
+        g.write("\tconst char *name;\n")
+        g.write("\tint offset;\n")
+        g.write("\tint compressed_size;\n")
+        g.write("\tint uncompressed_size;\n")
+        g.write("};\n\n")
+        g.write("static const int _doc_data_class_chunk_count = " + str(len(chunks)) + ";\n")
+        g.write("static const _DocDataClassChunk _doc_data_class_chunks[] = {\n")
+        for name, chunk_offset, compressed, uncompressed_size in chunks:
+            g.write(f'\t{{ "{name}", {chunk_offset}, {len(compressed)}, {uncompressed_size} }},\n')
         g.write("};\n")
 
         g.write("#endif")
 
+        # Leave the header untouched if unchanged, to avoid needless rebuilds and doc cache invalidation.
+        write_file_if_changed(dst, g.getvalue())
+
+
+# Keyword lines of a .po file, e.g. `msgstr[1] "..."`.
+_PO_KEYWORD = re.compile(rb'^(msgctxt|msgid_plural|msgid|msgstr)(?:\[(\d+)\])?\s*"(.*)"$')
+_PO_ESCAPE = re.compile(rb"\\(?:([0-7]{1,3})|x([0-9a-fA-F]+)|(.))")
+_PO_ESCAPES = {b"n": b"\n", b"t": b"\t", b"r": b"\r", b"f": b"\f", b"v": b"\v", b"b": b"\b", b"a": b"\a", b"\\": b"\\", b'"': b'"'}  # fmt: skip
+
+
+def _unescape_po(string: bytes) -> bytes:
+    def replace(match):
+        if match[1]:
+            return bytes([int(match[1], 8) & 0xFF])
+        if match[2]:
+            return bytes([int(match[2], 16) & 0xFF])
+        if match[3] not in _PO_ESCAPES:
+            raise ValueError(f"invalid control sequence: {match[0]!r}")
+        return _PO_ESCAPES[match[3]]
+
+    return _PO_ESCAPE.sub(replace, string)
+
+
+def parse_po(data: bytes) -> Dict[bytes, bytes]:
+    """
+    Parses a UTF-8 .po file into the message table of its compiled .mo counterpart. Keys are
+    the message IDs, prefixed by `msgctxt` and `\\x04` if set and followed by `\\0` and the
+    plural ID if set. Values hold the translations, with plural forms separated by `\\0`.
+
+    Like `msgfmt`, obsolete (`#~`), untranslated and fuzzy entries are left out, except
+    for a fuzzy header.
+    """
+    messages: Dict[bytes, bytes] = {}
+    entry: Dict[bytes, bytearray] = {}
+    msgstr: Dict[int, bytearray] = {}
+    fuzzy = False
+    current: Optional[bytearray] = None
+
+    def finish_entry():
+        if b"msgid" not in entry or not msgstr:
+            return
+        key = bytes(entry[b"msgid"])
+        if b"msgctxt" in entry:
+            key = bytes(entry[b"msgctxt"]) + b"\x04" + key
+        if b"msgid_plural" in entry:
+            key += b"\0" + entry[b"msgid_plural"]
+        is_header = key == b""
+        if msgstr[min(msgstr)] and (not fuzzy or is_header):
+            if key in messages:
+                raise ValueError(f"duplicate message definition: {key!r}")
+            messages[key] = b"\0".join(msgstr[index] for index in sorted(msgstr))
+
+    for number, line in enumerate(data.splitlines(), 1):
+        line = line.strip()
+        if line.startswith(b"#"):
+            if msgstr:
+                finish_entry()
+                entry, msgstr, fuzzy, current = {}, {}, False, None
+            if line.startswith(b"#,") and b"fuzzy" in (flag.strip() for flag in line[2:].split(b",")):
+                fuzzy = True
+            continue
+        if not line:
+            continue
+        if line.startswith(b'"') and line.endswith(b'"') and len(line) > 1:
+            if current is None:
+                raise ValueError(f"line {number}: string without keyword")
+            current += _unescape_po(line[1:-1])
+            continue
+
+        match = _PO_KEYWORD.match(line)
+        if not match:
+            raise ValueError(f"line {number}: syntax error")
+        keyword, index = match[1], match[2]
+        if keyword in (b"msgctxt", b"msgid") and msgstr:
+            finish_entry()
+            entry, msgstr, fuzzy = {}, {}, False
+        current = bytearray(_unescape_po(match[3]))
+        if keyword == b"msgstr":
+            msgstr[int(index or 0)] = current
+        else:
+            entry[keyword] = current
+    finish_entry()
+
+    return messages
+
+
+def make_mo(messages: Dict[bytes, bytes]) -> bytes:
+    """
+    Builds a native endian .mo file from a message table, byte for byte the same as
+    `msgfmt --no-hash` would: messages sorted by ID, string tables, then the strings.
+    """
+    keys = sorted(messages)
+    count = len(keys)
+    originals_offset = 28
+    translations_offset = originals_offset + count * 8
+    strings_offset = translations_offset + count * 8
+
+    originals = []
+    translations = []
+    strings = []
+    offset = strings_offset
+    for table, values in ((originals, keys), (translations, [messages[key] for key in keys])):
+        for value in values:
+            table.append(struct.pack("=II", len(value), offset))
+            strings.append(value + b"\0")
+            offset += len(value) + 1
+
+    header = struct.pack("=7I", 0x950412DE, 0, count, originals_offset, translations_offset, 0, strings_offset)
+    return b"".join([header] + originals + translations + strings)
+
+
+def _msgfmt(path: str) -> bytes:
+    mo_path = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex + ".mo")
+    try:
+        subprocess.run(["msgfmt", path, "--no-hash", "-o", mo_path], stderr=subprocess.PIPE)
+        with open(mo_path, "rb") as f:
+            return f.read()
+    finally:
+        try:
+            os.remove(mo_path)
+        except OSError as e:
+            # Do not fail the entire build if it cannot delete a temporary file.
+            print_warning("Could not delete temporary .mo file: path=%r; [%s] %s" % (mo_path, e.__class__.__name__, e))
+
+
+def _compile_translation(path: str, category: str, use_msgfmt: bool, codec: str) -> Tuple[str, bytes, int]:
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "rb") as f:
+        buf = f.read()
+
+    # Compiling erases non-translated messages, so avoid it if exporting the POT.
+    if name == category:
+        name = "source"
+    elif use_msgfmt:
+        try:
+            buf = _msgfmt(path)
+        except OSError as e:
+            print_warning(
+                "msgfmt execution failed, using .po file instead of .mo: path=%r; [%s] %s"
+                % (path, e.__class__.__name__, e)
+            )
+    else:
+        try:
+            buf = make_mo(parse_po(buf))
+        except ValueError as e:
+            print_warning("Could not compile translation, using .po file instead of .mo: path=%r; %s" % (path, e))
+
+    # Use the maximum compression level to further reduce file size
+    # (at the cost of build times, unless cached by `compress`).
+    return name, compress(buf, codec), len(buf)
+
 
 def make_translations_header(target, source, env, category):
     dst = str(target[0])
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef _{}_TRANSLATIONS_H\n".format(category.upper()))
         g.write("#define _{}_TRANSLATIONS_H\n".format(category.upper()))
 
         sorted_paths = sorted([str(x) for x in source], key=lambda path: os.path.splitext(os.path.basename(path))[0])
 
-        msgfmt_available = shutil.which("msgfmt") is not None
+        use_msgfmt = env["msgfmt"]
+        if use_msgfmt and shutil.which("msgfmt") is None:
+            print_warning("msgfmt is not found, using the built-in .mo compiler instead")
+            use_msgfmt = False
 
-        if not msgfmt_available:
-            print_warning("msgfmt is not found, using .po files instead of .mo")
+        # Threads rather than processes, as multiprocessing does not play well with SCons.
+        # Compression and msgfmt calls release the GIL, and they take most of the time.
+        codec = env["embed_compression"]
+        with ThreadPoolExecutor() as executor:
+            compiled = list(
+                executor.map(lambda path: _compile_translation(path, category, use_msgfmt, codec), sorted_paths)
+            )
 
         xl_names = []
-        for i in range(len(sorted_paths)):
-            name = os.path.splitext(os.path.basename(sorted_paths[i]))[0]
-            # msgfmt erases non-translated messages, so avoid using it if exporting the POT.
-            if msgfmt_available and name != category:
-                mo_path = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex + ".mo")
-                cmd = "msgfmt " + sorted_paths[i] + " --no-hash -o " + mo_path
-                try:
-                    subprocess.Popen(cmd, shell=True, stderr=subprocess.PIPE).communicate()
-                    with open(mo_path, "rb") as f:
-                        buf = f.read()
-                except OSError as e:
-                    print_warning(
-                        "msgfmt execution failed, using .po file instead of .mo: path=%r; [%s] %s"
-                        % (sorted_paths[i], e.__class__.__name__, e)
-                    )
-                    with open(sorted_paths[i], "rb") as f:
-                        buf = f.read()
-                finally:
-                    try:
-                        os.remove(mo_path)
-                    except OSError as e:
-                        # Do not fail the entire build if it cannot delete a temporary file.
-                        print_warning(
-                            "Could not delete temporary .mo file: path=%r; [%s] %s" % (mo_path, e.__class__.__name__, e)
-                        )
-            else:
-                with open(sorted_paths[i], "rb") as f:
-                    buf = f.read()
-
-                if name == category:
-                    name = "source"
-
-            decomp_size = len(buf)
-            # Use maximum zlib compression level to further reduce file size
-            # (at the cost of initial build times).
-            buf = zlib.compress(buf, zlib.Z_BEST_COMPRESSION)
-
-            g.write("static const unsigned char _{}_translation_{}_compressed[] = {{\n".format(category, name))
-            for j in range(len(buf)):
-                g.write("\t" + str(buf[j]) + ",\n")
-
-            g.write("};\n")
-
+        buffers = []
+        for name, buf, decomp_size in compiled:
+            buffers.append(("_{}_translation_{}_compressed".format(category, name), buf))
             xl_names.append([name, len(buf), str(decomp_size)])
 
+        g.write('#include "core/io/compression.h"\n')
+        g.write(f"static const Compression::Mode _{category}_translations_compression_mode = {EMBED_CODECS[codec]};\n")
+        g.write(embed_buffers(target, buffers))
+
         g.write("struct {}TranslationList {{\n".format(category.capitalize()))
         g.write("\tconst char* lang;\n")
         g.write("\tint comp_size;\n")
@@ -34,6 +34,7 @@
 #include "core/core_constants.h"
 #include "core/extension/gdextension.h"
 #include "core/input/input.h"
+#include "core/io/compression.h"
 #include "core/io/json.h"
 #include "core/object/script_language.h"
 #include "core/os/keyboard.h"
@@ -200,6 +201,8 @@ DocTools *EditorHelp::ext_doc = nullptr;
 int EditorHelp::doc_generation_count = 0;
 String EditorHelp::doc_version_hash;
 Thread EditorHelp::worker_thread;
+HashSet<String> EditorHelp::pending_doc_classes;
+Mutex EditorHelp::pending_doc_mutex;
 
 static bool _attempt_doc_load(const String &p_class) {
 	// Docgen always happens in the outer-most class: it also generates docs for inner classes.
@@ -354,6 +357,7 @@ void EditorHelp::_class_desc_select(const String &p_select) {
 			}
 		} else {
 			// Look for link in `@GlobalScope`.
+			_load_class_doc("@GlobalScope");
 			if (topic == "class_enum") {
 				const DocData::ClassDoc &cd = doc->class_list["@GlobalScope"];
 				const String enum_link = link.trim_prefix("@GlobalScope.");
@@ -963,6 +967,9 @@ void EditorHelp::_update_doc() {
 		return;
 	}
 
+	// Only the documentation of the class being shown is needed.
+	_load_class_doc(edited_class);
+
 	scroll_locked = true;
 
 	class_desc->clear();
@@ -2957,11 +2964,67 @@ void EditorHelp::_load_doc_thread(void *p_udata) {
 	OS::get_singleton()->benchmark_end_measure("EditorHelp", vformat("Generate Documentation (Run %d)", doc_generation_count));
 }
 
-void EditorHelp::_gen_doc_thread(void *p_udata) {
+static const _DocDataClassChunk *_find_doc_data_class_chunk(const String &p_class) {
+	// Chunks are sorted by class name.
+	const CharString name = p_class.utf8();
+	int low = 0;
+	int high = _doc_data_class_chunk_count - 1;
+	while (low <= high) {
+		const int middle = (low + high) / 2;
+		const int cmp = strcmp(_doc_data_class_chunks[middle].name, name.get_data());
+		if (cmp == 0) {
+			return &_doc_data_class_chunks[middle];
+		} else if (cmp < 0) {
+			low = middle + 1;
+		} else {
+			high = middle - 1;
+		}
+	}
+	return nullptr;
+}
+
+static Error _load_doc_data_class_chunk(DocTools &r_doc, const _DocDataClassChunk &p_chunk) {
+	Vector<uint8_t> data;
+	data.resize(p_chunk.uncompressed_size);
+	int ret = Compression::decompress(data.ptrw(), p_chunk.uncompressed_size, _doc_data_compressed + p_chunk.offset, p_chunk.compressed_size, _doc_data_compression_mode);
+	ERR_FAIL_COND_V_MSG(ret == -1, ERR_FILE_CORRUPT, vformat("Compressed documentation of class \"%s\" is corrupt.", p_chunk.name));
+	return r_doc.load_xml(data.ptr(), data.size());
+}
+
+void EditorHelp::_load_class_doc(const String &p_class) {
+	MutexLock lock(pending_doc_mutex);
+	if (!pending_doc_classes.erase(p_class)) {
+		return;
+	}
+
+	// Classes are compressed separately, so only this one needs to be inflated.
+	const _DocDataClassChunk *chunk = _find_doc_data_class_chunk(p_class);
 	DocTools compdoc;
-	compdoc.load_compressed(_doc_data_compressed, _doc_data_compressed_size, _doc_data_uncompressed_size);
+	if (chunk && _load_doc_data_class_chunk(compdoc, *chunk) == OK) {
+		doc->merge_from(compdoc);
+	}
+}
+
+void EditorHelp::_load_all_class_docs() {
+	MutexLock lock(pending_doc_mutex);
+	if (pending_doc_classes.is_empty()) {
+		return;
+	}
+
+	DocTools compdoc;
+	for (int i = 0; i < _doc_data_class_chunk_count; i++) {
+		if (pending_doc_classes.has(_doc_data_class_chunks[i].name)) {
+			_load_doc_data_class_chunk(compdoc, _doc_data_class_chunks[i]);
+		}
+	}
+	pending_doc_classes.clear();
 	doc->merge_from(compdoc); // Ensure all is up to date.
 
+	// The cache is only valid once the documentation of all classes is there.
+	_save_doc_cache();
+}
+
+void EditorHelp::_save_doc_cache() {
 	Ref<Resource> cache_res;
 	cache_res.instantiate();
 	cache_res->set_meta("version_hash", doc_version_hash);
@@ -2980,8 +3043,6 @@ void EditorHelp::_gen_doc_thread(void *p_udata) {
 	if (err) {
 		ERR_PRINT("Cannot save editor help cache (" + get_cache_full_path() + ").");
 	}
-
-	OS::get_singleton()->benchmark_end_measure("EditorHelp", vformat("Generate Documentation (Run %d)", doc_generation_count));
 }
 
 void EditorHelp::_gen_extensions_docs() {
@@ -3008,12 +3069,24 @@ void EditorHelp::generate_doc(bool p_use_cache) {
 		_compute_doc_version_hash();
 	}
 
+	{
+		MutexLock lock(pending_doc_mutex);
+		pending_doc_classes.clear();
+	}
+
 	if (p_use_cache && FileAccess::exists(get_cache_full_path())) {
 		worker_thread.start(_load_doc_thread, nullptr);
 	} else {
 		print_verbose("Regenerating editor help cache");
 		doc->generate();
-		worker_thread.start(_gen_doc_thread, nullptr);
+
+		// The documentation of built-in classes is inflated on demand, a class at a time when showing
+		// it, or all of them when the whole documentation is needed (see `get_doc_data`).
+		MutexLock lock(pending_doc_mutex);
+		for (int i = 0; i < _doc_data_class_chunk_count; i++) {
+			pending_doc_classes.insert(_doc_data_class_chunks[i].name);
+		}
+		OS::get_singleton()->benchmark_end_measure("EditorHelp", vformat("Generate Documentation (Run %d)", doc_generation_count));
 	}
 }
 
@@ -3081,6 +3154,10 @@ void EditorHelp::update_doc() {
 
 void EditorHelp::cleanup_doc() {
 	_wait_for_thread();
+	{
+		MutexLock lock(pending_doc_mutex);
+		pending_doc_classes.clear();
+	}
 	memdelete(doc);
 	doc = nullptr;
 }
@@ -3192,6 +3269,7 @@ EditorHelp::~EditorHelp() {
 
 DocTools *EditorHelp::get_doc_data() {
 	_wait_for_thread();
+	_load_all_class_docs();
 	return doc;
 }
 
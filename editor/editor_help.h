@@ -31,6 +31,7 @@
 #ifndef EDITOR_HELP_H
 #define EDITOR_HELP_H
 
+#include "core/os/mutex.h"
 #include "core/os/thread.h"
 #include "editor/doc_tools.h"
 #include "editor/plugins/editor_plugin.h"
@@ -191,10 +192,15 @@ class EditorHelp : public VBoxContainer {
 	static int doc_generation_count;
 	static String doc_version_hash;
 	static Thread worker_thread;
+	// Built-in classes whose documentation wasn't inflated from the compressed data yet.
+	static HashSet<String> pending_doc_classes;
+	static Mutex pending_doc_mutex;
 
 	static void _wait_for_thread();
 	static void _load_doc_thread(void *p_udata);
-	static void _gen_doc_thread(void *p_udata);
+	static void _load_class_doc(const String &p_class);
+	static void _load_all_class_docs();
+	static void _save_doc_cache();
 	static void _gen_extensions_docs();
 	static void _compute_doc_version_hash();
 
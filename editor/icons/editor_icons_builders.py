@@ -3,7 +3,7 @@
 import os
 from io import StringIO
 
-from methods import to_raw_cstring
+from methods import open_if_changed, to_raw_cstring
 
 
 # See also `scene/theme/icons/default_theme_icons_builders.py`.
@@ -67,5 +67,5 @@ def make_editor_icons_action(target, source, env):
 
         s.write("#endif\n")
 
-        with open(dst, "w", encoding="utf-8", newline="\n") as f:
+        with open_if_changed(dst) as f:
             f.write(s.getvalue())
@@ -3,6 +3,8 @@
 import os
 from io import StringIO
 
+from methods import open_if_changed
+
 
 def parse_template(inherits, source, delimiter):
     script_template = {
@@ -85,5 +87,5 @@ def make_templates(target, source, env):
 
         s.write("\n#endif\n")
 
-        with open(dst, "w", encoding="utf-8", newline="\n") as f:
+        with open_if_changed(dst) as f:
             f.write(s.getvalue())
@@ -2,16 +2,19 @@
 
 import os
 
+from methods import embed_buffers, open_if_changed
+
 
 def make_fonts_header(target, source, env):
     dst = str(target[0])
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef _EDITOR_FONTS_H\n")
         g.write("#define _EDITOR_FONTS_H\n")
 
         # Saving uncompressed, since FreeType will reference from memory pointer.
+        buffers = []
         for i in range(len(source)):
             file = str(source[i])
             with open(file, "rb") as f:
@@ -20,10 +23,8 @@ def make_fonts_header(target, source, env):
             name = os.path.splitext(os.path.basename(file))[0]
 
             g.write("static const int _font_" + name + "_size = " + str(len(buf)) + ";\n")
-            g.write("static const unsigned char _font_" + name + "[] = {\n")
-            for j in range(len(buf)):
-                g.write("\t" + str(buf[j]) + ",\n")
+            buffers.append(("_font_" + name, buf))
 
-            g.write("};\n")
+        g.write(embed_buffers(target, buffers))
 
         g.write("#endif")
@@ -1,9 +1,12 @@
 """Functions used to generate source files during build time"""
 
+import hashlib
 import os.path
-from typing import Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Container, Dict, List, Optional, Set, Tuple
 
-from methods import print_error, to_raw_cstring
+from methods import open_if_changed, print_error, to_raw_cstring
 
 
 class RDHeaderStruct:
@@ -16,6 +19,11 @@ class RDHeaderStruct:
         self.fragment_included_files = []
         self.compute_included_files = []
 
+        # Source location (`file:line`) of each line, to map minified code back to it.
+        self.vertex_origins = []
+        self.fragment_origins = []
+        self.compute_origins = []
+
         self.reading = ""
         self.line_offset = 0
         self.vertex_offset = 0
@@ -23,77 +31,398 @@ class RDHeaderStruct:
         self.compute_offset = 0
 
 
-def include_file_in_rd_header(filename: str, header_data: RDHeaderStruct, depth: int) -> RDHeaderStruct:
-    with open(filename, "r", encoding="utf-8") as fs:
-        line = fs.readline()
-
-        while line:
-            index = line.find("//")
-            if index != -1:
-                line = line[:index]
-
-            if line.find("#[vertex]") != -1:
-                header_data.reading = "vertex"
-                line = fs.readline()
-                header_data.line_offset += 1
-                header_data.vertex_offset = header_data.line_offset
+class GLSLFile:
+    """
+    Lines of a GLSL source file, as returned by `readline()`, along with the target of
+    their `#include` directive (if any). Parsed once and shared by all shaders including it.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, "r", encoding="utf-8") as fs:
+            self.lines = fs.readlines()
+        self.includes = [get_include_target(line) for line in self.lines]
+
+
+def get_include_target(line: str) -> Optional[str]:
+    if line.find("#include ") == -1:
+        return None
+    return line.replace("#include ", "").strip()[1:-1]
+
+
+# Parsed GLSL files, kept for the whole SCons run as includes are shared by many shaders.
+# Entries are keyed by absolute path, and checked against the file's modification time.
+_glsl_files: Dict[str, Tuple[Tuple[int, int], GLSLFile]] = {}
+
+
+def read_glsl_file(filename: str) -> GLSLFile:
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _glsl_files.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    glsl_file = GLSLFile(path)
+    _glsl_files[path] = (key, glsl_file)
+    return glsl_file
+
+
+def find_includes(filename: str, root: Optional[str] = None) -> List[str]:
+    """
+    Returns the absolute paths of the existing files included by a GLSL file. Includes are
+    relative to the including file, except `thirdparty/` ones if `root` is given, which are
+    relative to it (see `include_file_in_rd_header`).
+    """
+    includes = []
+    directory = os.path.dirname(os.path.abspath(filename))
+    for line in read_glsl_file(filename).lines:
+        include = get_include_target(line.split("//", 1)[0])
+        if include is None:
+            continue
+        if root is not None and include.startswith("thirdparty/"):
+            included_file = os.path.join(root, include)
+        else:
+            included_file = os.path.join(directory, include)
+        included_file = os.path.normpath(included_file)
+        if os.path.isfile(included_file) and included_file not in includes:
+            includes.append(included_file)
+    return includes
+
+
+def scan_rd_includes(node, env, path):
+    """SCons scanner function for `RD_GLSL` sources, meant to be used recursively."""
+    if not node.exists():
+        return []
+    return [env.File(x) for x in find_includes(node.abspath, env.Dir("#").abspath)]
+
+
+def scan_includes(node, env, path):
+    """SCons scanner function for `GLSL_HEADER` and `GLES3_GLSL` sources, meant to be used recursively."""
+    if not node.exists():
+        return []
+    return [env.File(x) for x in find_includes(node.abspath)]
+
+
+def map_sources(function: Callable[[str], None], source) -> None:
+    """Runs a header builder on each source, across a thread pool if there are several."""
+    if len(source) < 2:
+        for x in source:
+            function(str(x))
+        return
+    with ThreadPoolExecutor() as executor:
+        # Consume the results, so exceptions are raised here.
+        list(executor.map(function, [str(x) for x in source]))
+
+
+# Comments and string literals, the latter matched so comment markers inside them are left alone.
+_GLSL_COMMENT_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_GLSL_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\s+|[^\s"]+|"')
+_GLSL_IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+_GLSL_DEFINE_RE = re.compile(r"#\s*define\s+([A-Za-z_]\w*)")
+# Characters which would merge into a different token if the whitespace between them was removed.
+_GLSL_OPERATOR_CHARS = set("+-*/%&|^!<>=.")
+# Lines the engine replaces with code at runtime, which may use any define of the stage.
+_GLSL_INJECTION_MARKERS = ("#CODE", "#GLOBALS", "#MATERIAL_UNIFORMS")
+
+
+def _strip_comment(match: re.Match) -> str:
+    text = match.group(0)
+    if text.startswith("/*"):
+        # Keep line breaks, so lines still match their source.
+        return " " + "\n" * text.count("\n")
+    if text.startswith("//"):
+        return ""
+    return text
+
+
+def _compact_glsl_line(line: str) -> str:
+    compacted = ""
+    tokens = _GLSL_TOKEN_RE.findall(line.strip())
+    for i, token in enumerate(tokens):
+        if not token.isspace():
+            compacted += token
+            continue
+        before = compacted[-1]
+        after = tokens[i + 1][0]
+        if (before.isalnum() or before == "_") and (after.isalnum() or after == "_"):
+            compacted += " "
+        elif before in _GLSL_OPERATOR_CHARS and after in _GLSL_OPERATOR_CHARS:
+            compacted += " "
+    return compacted
+
+
+def minify_glsl(
+    lines: List[str], drop_unused_defines: bool = True, shared_lines: Container[int] = ()
+) -> Tuple[List[str], List[int]]:
+    """
+    Strips comments, blank lines and redundant whitespace from GLSL source lines, and optionally
+    the `#define`s that nothing else refers to, except those in `shared_lines` (the indices of
+    lines which are shared with other shaders, see `split_chunks()`). Preprocessor lines (which include the `#[vertex]`
+    section markers and the engine's `#VERSION_DEFINES`/`#CODE` markers) are kept on their own
+    line, with their whitespace collapsed. Returns the minified lines along with the index of the
+    source line each of them comes from.
+    """
+    stripped = _GLSL_COMMENT_RE.sub(_strip_comment, "\n".join(lines)).split("\n")
+
+    minified = []
+    indices = []
+    continued = False
+    for index, line in enumerate(stripped):
+        if line.lstrip().startswith("#") or continued:
+            line = " ".join(line.split())
+        else:
+            line = _compact_glsl_line(line)
+        # An empty line ending a macro continuation is significant.
+        if line or continued:
+            minified.append(line)
+            indices.append(index)
+        continued = line.endswith("\\")
+
+    if drop_unused_defines and not any(line.startswith(_GLSL_INJECTION_MARKERS) for line in minified):
+        while True:
+            uses: Dict[str, int] = {}
+            for line in minified:
+                for identifier in _GLSL_IDENTIFIER_RE.findall(line):
+                    uses[identifier] = uses.get(identifier, 0) + 1
+            for line in minified:
+                match = _GLSL_DEFINE_RE.match(line)
+                if match is not None:
+                    uses[match.group(1)] -= 1
+
+            unused = set()
+            for i, line in enumerate(minified):
+                match = _GLSL_DEFINE_RE.match(line)
+                if match is not None and uses[match.group(1)] <= 0 and indices[i] not in shared_lines:
+                    unused.add(i)
+                    end = i
+                    while minified[end].endswith("\\") and end + 1 < len(minified):
+                        end += 1
+                        unused.add(end)
+            if not unused:
+                break
+            minified = [line for i, line in enumerate(minified) if i not in unused]
+            indices = [index for i, index in enumerate(indices) if i not in unused]
+
+    return minified, indices
+
+
+def format_line_map(name: str, origins: List[str]) -> str:
+    """
+    Formats the source location (`file:line`) of each line of minified code as a C++ comment,
+    so errors reported by the shader compiler can be traced back to the GLSL sources.
+    """
+    ranges = []
+    for line, origin in enumerate(origins, 1):
+        filename, _, source_line = origin.rpartition(":")
+        if ranges:
+            first, last, last_filename, first_source, last_source = ranges[-1]
+            if last == line - 1 and last_filename == filename and last_source == int(source_line) - 1:
+                ranges[-1] = (first, line, filename, first_source, int(source_line))
                 continue
+        ranges.append((line, line, filename, int(source_line), int(source_line)))
+
+    text = f"/* Source lines of the minified `{name}`:\n"
+    for first, last, filename, first_source, last_source in ranges:
+        if first == last:
+            text += f" * {first}: {filename}:{first_source}\n"
+        else:
+            text += f" * {first}-{last}: {filename}:{first_source}-{last_source}\n"
+    return text + " */"
+
+
+def split_chunks(lines: List[str], origins: List[str]) -> List[Tuple[str, str]]:
+    """
+    Splits the code of a shader stage into runs of consecutive lines coming from the same file,
+    along with a name derived from their content. Includes are shared by many shaders, so their
+    chunks are emitted with `format_chunks()` and merged by the linker instead of being copied
+    in each shader. Concatenating the chunks in order gives back the stage code.
+    """
+    if not lines:
+        return [(get_chunk_name("\n"), "\n")]
+
+    chunks = []
+    start = 0
+    for end in range(1, len(lines) + 1):
+        if end < len(lines) and origins[end].rpartition(":")[0] == origins[start].rpartition(":")[0]:
+            continue
+        text = "\n".join(lines[start:end]) + "\n"
+        chunks.append((get_chunk_name(text), text))
+        start = end
+    return chunks
+
+
+def get_shared_lines(origins: List[str]) -> Set[int]:
+    """Returns the indices of the lines coming from included files, which make up shared chunks."""
+    if not origins:
+        return set()
+    main_file = origins[0].rpartition(":")[0]
+    return {i for i, origin in enumerate(origins) if origin.rpartition(":")[0] != main_file}
+
+
+def get_chunk_name(text: str) -> str:
+    return "_glsl_chunk_" + hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def format_chunks(chunks: Dict[str, str]) -> str:
+    """
+    Defines shader chunks as C++17 inline variables, which the linker keeps a single copy of
+    across translation units. Guarded, as a translation unit may include several shaders.
+    """
+    text = ""
+    for name, code in chunks.items():
+        guard = name.lstrip("_").upper()
+        text += f"#ifndef {guard}\n#define {guard}\n"
+        text += f"inline constexpr char {name}[] = {{\n{to_raw_cstring(code)}\n}};\n#endif\n\n"
+    return text
 
-            if line.find("#[fragment]") != -1:
-                header_data.reading = "fragment"
-                line = fs.readline()
-                header_data.line_offset += 1
-                header_data.fragment_offset = header_data.line_offset
-                continue
 
-            if line.find("#[compute]") != -1:
-                header_data.reading = "compute"
-                line = fs.readline()
-                header_data.line_offset += 1
-                header_data.compute_offset = header_data.line_offset
-                continue
+def include_file_in_rd_header(filename: str, header_data: RDHeaderStruct, depth: int) -> RDHeaderStruct:
+    glsl_file = read_glsl_file(filename)
+    source = os.path.relpath(filename)
+    index = 0
+
+    while index < len(glsl_file.lines):
+        line = glsl_file.lines[index]
+        include = glsl_file.includes[index]
+        comment = line.find("//")
+        if comment != -1:
+            line = line[:comment]
+            include = get_include_target(line)
+
+        if line.find("#[vertex]") != -1:
+            header_data.reading = "vertex"
+            index += 1
+            header_data.line_offset += 1
+            header_data.vertex_offset = header_data.line_offset
+            continue
 
-            while line.find("#include ") != -1:
-                includeline = line.replace("#include ", "").strip()[1:-1]
+        if line.find("#[fragment]") != -1:
+            header_data.reading = "fragment"
+            index += 1
+            header_data.line_offset += 1
+            header_data.fragment_offset = header_data.line_offset
+            continue
 
-                if includeline.startswith("thirdparty/"):
-                    included_file = os.path.relpath(includeline)
+        if line.find("#[compute]") != -1:
+            header_data.reading = "compute"
+            index += 1
+            header_data.line_offset += 1
+            header_data.compute_offset = header_data.line_offset
+            continue
 
-                else:
-                    included_file = os.path.relpath(os.path.dirname(filename) + "/" + includeline)
+        while include is not None:
+            includeline = include
 
-                if included_file not in header_data.vertex_included_files and header_data.reading == "vertex":
-                    header_data.vertex_included_files += [included_file]
-                    if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
-                        print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
-                elif included_file not in header_data.fragment_included_files and header_data.reading == "fragment":
-                    header_data.fragment_included_files += [included_file]
-                    if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
-                        print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
-                elif included_file not in header_data.compute_included_files and header_data.reading == "compute":
-                    header_data.compute_included_files += [included_file]
-                    if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
-                        print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
+            if includeline.startswith("thirdparty/"):
+                included_file = os.path.relpath(includeline)
 
-                line = fs.readline()
+            else:
+                included_file = os.path.relpath(os.path.dirname(filename) + "/" + includeline)
 
-            line = line.replace("\r", "").replace("\n", "")
+            if included_file not in header_data.vertex_included_files and header_data.reading == "vertex":
+                header_data.vertex_included_files += [included_file]
+                if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
+                    print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
+            elif included_file not in header_data.fragment_included_files and header_data.reading == "fragment":
+                header_data.fragment_included_files += [included_file]
+                if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
+                    print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
+            elif included_file not in header_data.compute_included_files and header_data.reading == "compute":
+                header_data.compute_included_files += [included_file]
+                if include_file_in_rd_header(included_file, header_data, depth + 1) is None:
+                    print_error(f'In file "{filename}": #include "{includeline}" could not be found!"')
+
+            # Lines following an include are taken as is, comments included.
+            index += 1
+            line = glsl_file.lines[index] if index < len(glsl_file.lines) else ""
+            include = glsl_file.includes[index] if index < len(glsl_file.lines) else None
+
+        line = line.replace("\r", "").replace("\n", "")
+
+        if header_data.reading == "vertex":
+            header_data.vertex_lines += [line]
+            header_data.vertex_origins += [f"{source}:{index + 1}"]
+        if header_data.reading == "fragment":
+            header_data.fragment_lines += [line]
+            header_data.fragment_origins += [f"{source}:{index + 1}"]
+        if header_data.reading == "compute":
+            header_data.compute_lines += [line]
+            header_data.compute_origins += [f"{source}:{index + 1}"]
+
+        index += 1
+        header_data.line_offset += 1
 
-            if header_data.reading == "vertex":
-                header_data.vertex_lines += [line]
-            if header_data.reading == "fragment":
-                header_data.fragment_lines += [line]
-            if header_data.reading == "compute":
-                header_data.compute_lines += [line]
+    return header_data
 
-            line = fs.readline()
-            header_data.line_offset += 1
 
-    return header_data
+def get_rd_class_name(out_file: str) -> str:
+    out_file_base = out_file[out_file.rfind("/") + 1 :]
+    out_file_base = out_file_base[out_file_base.rfind("\\") + 1 :]
+    return out_file_base.replace(".glsl.gen.h", "").title().replace("_", "").replace(".", "") + "ShaderRD"
+
+
+def get_rd_stages(
+    header_data: RDHeaderStruct, minify: bool = False
+) -> Dict[str, Tuple[List[Tuple[str, str]], List[str]]]:
+    """Returns the chunks of each stage of an RD shader, along with the source location of their lines."""
+    if header_data.compute_lines:
+        stages = {"compute": (header_data.compute_lines, header_data.compute_origins)}
+    else:
+        stages = {
+            "vertex": (header_data.vertex_lines, header_data.vertex_origins),
+            "fragment": (header_data.fragment_lines, header_data.fragment_origins),
+        }
+
+    result = {}
+    for stage, (lines, origins) in stages.items():
+        if minify:
+            lines, indices = minify_glsl(lines, shared_lines=get_shared_lines(origins))
+            origins = [origins[i] for i in indices]
+        result[stage] = (split_chunks(lines, origins), origins)
+    return result
+
+
+def get_source_key(stages: Dict[str, Tuple[List[Tuple[str, str]], List[str]]]) -> str:
+    """
+    Hashes the code of an RD shader, so the shader cache can identify it without hashing the
+    code itself at runtime (see `ShaderRD::setup`).
+    """
+    key = hashlib.sha256()
+    for stage in ("vertex", "fragment", "compute"):
+        key.update(f"[{stage.title()}]".encode())
+        for _, text in stages.get(stage, ([], []))[0]:
+            key.update(text.encode())
+    return key.hexdigest()
+
+
+def get_rd_manifest(filename: str, minify: bool = False) -> Dict:
+    """
+    Describes the RD shader class built from a GLSL file: its source key, the files it includes
+    and the chunks of each stage. Comparing manifests across builds shows which shaders changed,
+    and so which shader cache entries are stale, without compiling anything.
+    """
+    header_data = RDHeaderStruct()
+    include_file_in_rd_header(filename, header_data, 0)
+    stages = get_rd_stages(header_data, minify)
+    return {
+        "class": get_rd_class_name(filename + ".gen.h"),
+        "source": os.path.relpath(filename).replace("\\", "/"),
+        "source_key": get_source_key(stages),
+        "includes": sorted(
+            set(
+                header_data.vertex_included_files
+                + header_data.fragment_included_files
+                + header_data.compute_included_files
+            )
+        ),
+        "stages": {stage: [name for name, _ in chunks] for stage, (chunks, _) in stages.items()},
+    }
 
 
 def build_rd_header(
-    filename: str, optional_output_filename: Optional[str] = None, header_data: Optional[RDHeaderStruct] = None
+    filename: str,
+    optional_output_filename: Optional[str] = None,
+    header_data: Optional[RDHeaderStruct] = None,
+    minify: bool = False,
 ) -> None:
     header_data = header_data or RDHeaderStruct()
     include_file_in_rd_header(filename, header_data, 0)
@@ -107,19 +436,24 @@ def build_rd_header(
     out_file_base = out_file_base[out_file_base.rfind("/") + 1 :]
     out_file_base = out_file_base[out_file_base.rfind("\\") + 1 :]
     out_file_ifdef = out_file_base.replace(".", "_").upper()
-    out_file_class = out_file_base.replace(".glsl.gen.h", "").title().replace("_", "").replace(".", "") + "ShaderRD"
-
-    if header_data.compute_lines:
-        body_parts = [
-            "static const char _compute_code[] = {\n%s\n\t\t};" % to_raw_cstring(header_data.compute_lines),
-            f'setup(nullptr, nullptr, _compute_code, "{out_file_class}");',
-        ]
+    out_file_class = get_rd_class_name(out_file)
+
+    stages = get_rd_stages(header_data, minify)
+    source_key = get_source_key(stages)
+    chunks = {}
+    body_parts = []
+    for stage, (stage_chunks, origins) in stages.items():
+        name = f"_{stage}_chunks"
+        if minify:
+            body_parts.append(format_line_map(name, origins).replace("\n", "\n\t\t"))
+        chunks.update(stage_chunks)
+        names = ", ".join(chunk for chunk, _ in stage_chunks)
+        body_parts.append(f"static const char *const {name}[] = {{ {names}, nullptr }};")
+
+    if "compute" in stages:
+        body_parts.append(f'setup(nullptr, nullptr, _compute_chunks, "{out_file_class}", "{source_key}");')
     else:
-        body_parts = [
-            "static const char _vertex_code[] = {\n%s\n\t\t};" % to_raw_cstring(header_data.vertex_lines),
-            "static const char _fragment_code[] = {\n%s\n\t\t};" % to_raw_cstring(header_data.fragment_lines),
-            f'setup(_vertex_code, _fragment_code, nullptr, "{out_file_class}");',
-        ]
+        body_parts.append(f'setup(_vertex_chunks, _fragment_chunks, nullptr, "{out_file_class}", "{source_key}");')
 
     body_content = "\n\t\t".join(body_parts)
 
@@ -130,7 +464,7 @@ def build_rd_header(
 
 #include "servers/rendering/renderer_rd/shader_rd.h"
 
-class {out_file_class} : public ShaderRD {{
+{format_chunks(chunks)}class {out_file_class} : public ShaderRD {{
 
 public:
 
@@ -143,40 +477,50 @@ public:
 #endif
 """
 
-    with open(out_file, "w", encoding="utf-8", newline="\n") as fd:
+    with open_if_changed(out_file) as fd:
         fd.write(shader_template)
 
 
 def build_rd_headers(target, source, env):
     env.NoCache(target)
-    for x in source:
-        build_rd_header(filename=str(x))
+    map_sources(lambda filename: build_rd_header(filename, minify=env["minify_shaders"]), source)
 
 
 class RAWHeaderStruct:
     def __init__(self):
         self.code = ""
+        # Source location (`file:line`) of each line of `code`.
+        self.origins = []
 
 
 def include_file_in_raw_header(filename: str, header_data: RAWHeaderStruct, depth: int) -> None:
-    with open(filename, "r", encoding="utf-8") as fs:
-        line = fs.readline()
+    glsl_file = read_glsl_file(filename)
+    source = os.path.relpath(filename)
+    index = 0
 
-        while line:
-            while line.find("#include ") != -1:
-                includeline = line.replace("#include ", "").strip()[1:-1]
+    while index < len(glsl_file.lines):
+        line = glsl_file.lines[index]
+        include = glsl_file.includes[index]
 
-                included_file = os.path.relpath(os.path.dirname(filename) + "/" + includeline)
-                include_file_in_raw_header(included_file, header_data, depth + 1)
+        while include is not None:
+            included_file = os.path.relpath(os.path.dirname(filename) + "/" + include)
+            include_file_in_raw_header(included_file, header_data, depth + 1)
 
-                line = fs.readline()
+            index += 1
+            line = glsl_file.lines[index] if index < len(glsl_file.lines) else ""
+            include = glsl_file.includes[index] if index < len(glsl_file.lines) else None
 
-            header_data.code += line
-            line = fs.readline()
+        if line and (not header_data.code or header_data.code.endswith("\n")):
+            header_data.origins += [f"{source}:{index + 1}"]
+        header_data.code += line
+        index += 1
 
 
 def build_raw_header(
-    filename: str, optional_output_filename: Optional[str] = None, header_data: Optional[RAWHeaderStruct] = None
+    filename: str,
+    optional_output_filename: Optional[str] = None,
+    header_data: Optional[RAWHeaderStruct] = None,
+    minify: bool = False,
 ):
     header_data = header_data or RAWHeaderStruct()
     include_file_in_raw_header(filename, header_data, 0)
@@ -191,21 +535,28 @@ def build_raw_header(
     out_file_base = out_file_base[out_file_base.rfind("\\") + 1 :]
     out_file_ifdef = out_file_base.replace(".", "_").upper()
 
+    code = header_data.code
+    line_map = ""
+    if minify:
+        # Raw sources may be included by other shaders at runtime, which can use any of their defines.
+        lines, indices = minify_glsl(code.splitlines(), drop_unused_defines=False)
+        code = "\n".join(lines) + "\n"
+        line_map = format_line_map(out_file_base, [header_data.origins[i] for i in indices]) + "\n"
+
     shader_template = f"""/* WARNING, THIS FILE WAS GENERATED, DO NOT EDIT */
 #ifndef {out_file_ifdef}_RAW_H
 #define {out_file_ifdef}_RAW_H
 
-static const char {out_file_base}[] = {{
-{to_raw_cstring(header_data.code)}
+{line_map}static const char {out_file_base}[] = {{
+{to_raw_cstring(code)}
 }};
 #endif
 """
 
-    with open(out_file, "w", encoding="utf-8", newline="\n") as f:
+    with open_if_changed(out_file) as f:
         f.write(shader_template)
 
 
 def build_raw_headers(target, source, env):
     env.NoCache(target)
-    for x in source:
-        build_raw_header(filename=str(x))
+    map_sources(lambda filename: build_raw_header(filename, minify=env["minify_shaders"]), source)
@@ -1,5 +1,7 @@
 """Functions used to generate source files during build time"""
 
+from methods import format_buffer, open_if_changed
+
 
 def make_splash(target, source, env):
     src = str(source[0])
@@ -8,16 +10,15 @@ def make_splash(target, source, env):
     with open(src, "rb") as f:
         buf = f.read()
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef BOOT_SPLASH_H\n")
         g.write("#define BOOT_SPLASH_H\n")
         # Use a neutral gray color to better fit various kinds of projects.
         g.write("static const Color boot_splash_bg_color = Color(0.14, 0.14, 0.14);\n")
         g.write("static const unsigned char boot_splash_png[] = {\n")
-        for i in range(len(buf)):
-            g.write(str(buf[i]) + ",\n")
-        g.write("};\n")
+        g.write(format_buffer(buf, 1))
+        g.write("\n};\n")
         g.write("#endif")
 
 
@@ -28,7 +29,7 @@ def make_splash_editor(target, source, env):
     with open(src, "rb") as f:
         buf = f.read()
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef BOOT_SPLASH_EDITOR_H\n")
         g.write("#define BOOT_SPLASH_EDITOR_H\n")
@@ -36,9 +37,8 @@ def make_splash_editor(target, source, env):
         # This helps achieve a visually "smoother" transition between the splash screen and the editor.
         g.write("static const Color boot_splash_editor_bg_color = Color(0.125, 0.145, 0.192);\n")
         g.write("static const unsigned char boot_splash_editor_png[] = {\n")
-        for i in range(len(buf)):
-            g.write(str(buf[i]) + ",\n")
-        g.write("};\n")
+        g.write(format_buffer(buf, 1))
+        g.write("\n};\n")
         g.write("#endif")
 
 
@@ -49,12 +49,11 @@ def make_app_icon(target, source, env):
     with open(src, "rb") as f:
         buf = f.read()
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as g:
+    with open_if_changed(dst) as g:
         g.write("/* THIS FILE IS GENERATED DO NOT EDIT */\n")
         g.write("#ifndef APP_ICON_H\n")
         g.write("#define APP_ICON_H\n")
         g.write("static const unsigned char app_icon_png[] = {\n")
-        for i in range(len(buf)):
-            g.write(str(buf[i]) + ",\n")
-        g.write("};\n")
+        g.write(format_buffer(buf, 1))
+        g.write("\n};\n")
         g.write("#endif")
@@ -1,15 +1,24 @@
 import atexit
 import contextlib
 import glob
+import hashlib
+import http.client
+import json
 import math
 import os
 import re
 import subprocess
 import sys
-from collections import OrderedDict
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import StringIO, TextIOBase
 from pathlib import Path
-from typing import Generator, List, Optional, Union, cast
+from typing import Callable, Generator, List, Optional, Tuple, Union, cast
 
 from misc.utility.color import print_error, print_info, print_warning
 
@@ -210,6 +219,19 @@ def get_cmdline_bool(option, default):
         return default
 
 
+# Modules found by `detect_modules` in previous runs, by search path, with the modification times
+# of the folders which were looked at.
+MODULE_CACHE_FILENAME = f"{base_folder_path}.scons_modules.json"
+_module_cache = None
+
+
+def get_folder_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 def detect_modules(search_path, recursive=False):
     """Detects and collects a list of C++ modules at specified path
 
@@ -225,8 +247,27 @@ def detect_modules(search_path, recursive=False):
     Returns an `OrderedDict` with module names as keys, and directory paths as
     values. If a path is relative, then it is a built-in module. If a path is
     absolute, then it is a custom module collected outside of the engine source.
+
+    Results are cached in `MODULE_CACHE_FILENAME`, along with the modification
+    times of the folders which were looked at: these change when files are added
+    to or removed from them, which invalidates the results. This spares walking
+    large trees of custom modules on every run.
     """
+    global _module_cache
+    if _module_cache is None:
+        try:
+            with open(MODULE_CACHE_FILENAME, "r", encoding="utf-8") as f:
+                _module_cache = json.load(f)
+        except (OSError, ValueError):
+            _module_cache = {}
+
+    cache_key = f"{os.path.abspath(search_path)}:{recursive}"
+    cached = _module_cache.get(cache_key)
+    if cached and all(get_folder_mtime(path) == mtime for path, mtime in cached["folders"].items()):
+        return OrderedDict(cached["modules"])
+
     modules = OrderedDict()
+    folders = {}
 
     def add_module(path):
         module_name = os.path.basename(path)
@@ -244,25 +285,31 @@ def detect_modules(search_path, recursive=False):
         return False
 
     def get_files(path):
+        folders[path] = get_folder_mtime(path)
         files = glob.glob(os.path.join(path, "*"))
         # Sort so that `register_module_types` does not change that often,
         # and plugins are registered in alphabetic order as well.
         files.sort()
         return files
 
+    def check_module(path):
+        if os.path.isdir(path):
+            folders[path] = get_folder_mtime(path)
+        return is_module(path)
+
     if not recursive:
-        if is_module(search_path):
+        if check_module(search_path):
             add_module(search_path)
         for path in get_files(search_path):
             if is_engine(path):
                 continue
-            if is_module(path):
+            if check_module(path):
                 add_module(path)
     else:
         to_search = [search_path]
         while to_search:
             path = to_search.pop()
-            if is_module(path):
+            if check_module(path):
                 add_module(path)
             for child in get_files(path):
                 if not os.path.isdir(child):
@@ -270,6 +317,13 @@ def detect_modules(search_path, recursive=False):
                 if is_engine(child):
                     continue
                 to_search.insert(0, child)
+
+    _module_cache[cache_key] = {"folders": folders, "modules": list(modules.items())}
+    try:
+        with open(MODULE_CACHE_FILENAME, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(_module_cache, indent=1) + "\n")
+    except OSError:
+        pass
     return modules
 
 
@@ -338,16 +392,26 @@ def module_check_dependencies(self, module):
 def sort_module_list(env):
     deps = {k: v[0] + list(filter(lambda x: x in env.module_list, v[1])) for k, v in env.module_dependencies.items()}
 
-    frontier = list(env.module_list.keys())
+    # Modules are taken from the end of the frontier, and put back at its start until all their
+    # dependencies are explored. A full round without progress means that they can't be sorted.
+    frontier = deque(env.module_list.keys())
     explored = []
-    while len(frontier):
+    explored_set = set()
+    postponed = 0
+    while frontier:
         cur = frontier.pop()
-        deps_list = deps[cur] if cur in deps else []
-        if len(deps_list) and any([d not in explored for d in deps_list]):
+        if any(d not in explored_set for d in deps.get(cur, [])):
             # Will explore later, after its dependencies
-            frontier.insert(0, cur)
+            frontier.appendleft(cur)
+            postponed += 1
+            if postponed > len(frontier):
+                unsorted = ", ".join(f"{module} ({', '.join(deps[module])})" for module in sorted(frontier))
+                print_error(f"Module dependencies are circular or not enabled: {unsorted}.")
+                sys.exit(255)
             continue
+        postponed = 0
         explored.append(cur)
+        explored_set.add(cur)
     for k in explored:
         env.module_list.move_to_end(k)
 
@@ -579,13 +643,22 @@ def add_program(env, name, sources, **args):
 def CommandNoCache(env, target, sources, command, **args):
     result = env.Command(target, sources, command, **args)
     env.NoCache(result)
+    # Generated files are only rewritten when their content changes (see `write_file_if_changed`),
+    # which requires SCons not to delete them before running the builder.
+    env.Precious(result)
     return result
 
 
-def Run(env, function):
+def precious_emitter(target, source, env):
+    """Emitter for builders generating files with `write_file_if_changed`, see `CommandNoCache`."""
+    env.Precious(target)
+    return target, source
+
+
+def Run(env, function, **kwargs):
     from SCons.Script import Action
 
-    return Action(function, "$GENCOMSTR")
+    return Action(function, "$GENCOMSTR", **kwargs)
 
 
 def detect_darwin_sdk_path(platform, env):
@@ -749,12 +822,98 @@ def using_emcc(env):
     return "emcc" in os.path.basename(env["CC"])
 
 
+class BuildEstimate:
+    """
+    Estimates the progress of a build, weighted by time, and its remaining time, from the
+    durations of the targets in previous builds (see `show_progress`).
+
+    Targets which are up to date take no time, so the work left is the time the targets which
+    weren't visited yet took in previous builds, scaled by the share of the work visited so far
+    which had to be built again. It is done at the speed observed so far, or by `jobs` targets at
+    a time at first.
+    """
+
+    # Seconds of build after which the observed speed is used for the remaining time.
+    WARMUP = 5
+
+    def __init__(self, durations: dict, jobs: int, start: Optional[float] = None):
+        self.durations = durations
+        self.jobs = max(1, jobs)
+        self.start = time.perf_counter() if start is None else start
+        self.lock = threading.Lock()
+        self.total_work = sum(durations.values())
+        self.visited = set()
+        # Durations in previous builds of the visited targets, and of those which were built again.
+        self.visited_work = 0.0
+        self.rebuilt_work = 0.0
+        # Durations of the targets built by this build.
+        self.built = {}
+        self.done_work = 0.0
+
+    def visit(self, target: str) -> None:
+        with self.lock:
+            if target in self.durations and target not in self.visited:
+                self.visited.add(target)
+                self.visited_work += self.durations[target]
+
+    def record(self, target: str, seconds: float) -> None:
+        with self.lock:
+            self.built[target] = seconds
+            self.done_work += seconds
+            if target in self.durations:
+                self.rebuilt_work += self.durations[target]
+
+    def get_remaining_work(self) -> float:
+        ratio = min(1.0, self.rebuilt_work / self.visited_work) if self.visited_work else 1.0
+        return max(0.0, self.total_work - self.visited_work) * ratio
+
+    def get_progress(self) -> float:
+        """Returns the share of the work done, between 0 and 1."""
+        remaining = self.get_remaining_work()
+        return self.done_work / (self.done_work + remaining) if self.done_work + remaining else 1.0
+
+    def get_remaining_time(self, now: Optional[float] = None) -> float:
+        elapsed = (time.perf_counter() if now is None else now) - self.start
+        speed = self.jobs
+        if elapsed >= self.WARMUP and self.done_work:
+            speed = min(self.jobs, max(self.done_work / elapsed, 0.1))
+        return self.get_remaining_work() / speed
+
+    def get_durations(self, prune: bool = False) -> dict:
+        """
+        Returns the durations to use for the next build: the ones measured now, or the previous
+        ones. With `prune`, for builds which visited all the targets, only visited targets are kept.
+        """
+        with self.lock:
+            durations = {**self.durations, **self.built}
+            if prune:
+                durations = {
+                    target: durations[target] for target in durations if target in self.visited or target in self.built
+                }
+            return durations
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def load_target_durations(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {target: float(seconds) for target, seconds in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
 def show_progress(env):
     # Ninja has its own progress/tracking tool that clashes with ours.
     if env["ninja"]:
         return
 
     NODE_COUNT_FILENAME = f"{base_folder_path}.scons_node_count"
+    DURATIONS_FILENAME = f"{base_folder_path}.scons_target_durations.json"
 
     class ShowProgress:
         def __init__(self):
@@ -766,6 +925,11 @@ def show_progress(env):
             except OSError:
                 pass
 
+            # Progress is weighted by the durations of the targets in previous builds, if known.
+            self.estimate = BuildEstimate(load_target_durations(DURATIONS_FILENAME), env.GetOption("num_jobs"))
+            # Estimates at most every second, as (elapsed time, progress, remaining time).
+            self.samples = []
+
             # Progress reporting is not available in non-TTY environments since it
             # messes with the output (for example, when writing to a file).
             self.display = cast(bool, env["progress"] and sys.stdout.isatty())
@@ -775,18 +939,50 @@ def show_progress(env):
 
         def __call__(self, node, *args, **kw):
             self.count += 1
+            self.estimate.visit(str(node))
+            if not self.display and not env["progress_export"]:
+                return
+
+            now = time.perf_counter()
+            elapsed = now - self.estimate.start
+            if self.estimate.total_work:
+                progress = self.estimate.get_progress()
+                remaining = self.estimate.get_remaining_time(now)
+            else:
+                progress = min(self.count / self.max, 1) if self.max else 0
+                remaining = None
+            if not self.samples or elapsed - self.samples[-1][0] >= 1:
+                self.samples.append((round(elapsed, 2), round(progress, 4), remaining and round(remaining, 1)))
+
             if self.display:
-                percent = int(min(self.count * 100 / self.max, 100))
-                sys.stdout.write(f"\r[{percent:3d}%] ")
+                eta = f", {format_duration(remaining)} left" if remaining is not None else ""
+                sys.stdout.write(f"\r[{int(progress * 100):3d}%{eta}] ")
                 sys.stdout.flush()
 
+        def record_task(self, task, start: float, end: float):
+            # Targets retrieved from the cache keep the durations of their last actual build.
+            if not getattr(task.targets[0], "cached", 0):
+                self.estimate.record(str(task.targets[0]), end - start)
+
     from SCons.Script import Progress
     from SCons.Script.Main import GetBuildFailures
 
     progressor = ShowProgress()
     Progress(progressor)
+    add_build_task_listener(progressor.record_task)
 
     def progress_finish():
+        if progressor.estimate.built:
+            try:
+                with open(DURATIONS_FILENAME, "w", encoding="utf-8", newline="\n") as f:
+                    # Targets which weren't visited by a complete build no longer exist.
+                    prune = not GetBuildFailures() and progressor.count >= progressor.max
+                    durations = progressor.estimate.get_durations(prune)
+                    json.dump(durations, f, separators=(",", ":"), sort_keys=True)
+            except OSError:
+                pass
+        if env["progress_export"]:
+            export_build_progress(env["progress_export"], progressor.estimate, progressor.samples)
         if GetBuildFailures() or not progressor.count:
             return
         try:
@@ -798,6 +994,26 @@ def show_progress(env):
     atexit.register(progress_finish)
 
 
+def export_build_progress(path: str, estimate: BuildEstimate, samples: list) -> None:
+    """
+    Writes the durations of the targets built, and the progress estimates made during the build
+    (as `[elapsed time, progress, remaining time]`), to a JSON file for build dashboards.
+    """
+    report = {
+        "jobs": estimate.jobs,
+        "elapsed": round(time.perf_counter() - estimate.start, 3),
+        "work": round(estimate.done_work, 3),
+        "estimated_work": round(estimate.total_work, 3),
+        "targets": {target: round(seconds, 3) for target, seconds in sorted(estimate.built.items())},
+        "estimates": samples,
+    }
+    try:
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(report, indent=1) + "\n")
+    except OSError:
+        print_warning(f'Failed to write build progress to "{path}".')
+
+
 def convert_size(size_bytes: int) -> str:
     if size_bytes == 0:
         return "0 bytes"
@@ -817,40 +1033,511 @@ def get_size(start_path: str = ".") -> int:
     return total_size
 
 
-def clean_cache(cache_path: str, cache_limit: int, verbose: bool) -> None:
-    if not cache_limit:
-        return
+# Directory holding compressed payloads of `compress`, inside the SCons cache (see `prepare_cache`).
+_compression_cache_path = ""
+
+# Codecs available for compressed data embedded in the binary (see `embed_compression` option),
+# with the matching `Compression::Mode` used to decompress them in the engine.
+EMBED_CODECS = {
+    "zlib": "Compression::MODE_DEFLATE",
+    "zstd": "Compression::MODE_ZSTD",
+    "brotli": "Compression::MODE_BROTLI",
+}
 
-    files = glob.glob(os.path.join(cache_path, "*", "*"))
-    if not files:
-        return
 
-    # Store files in list of (filename, size, atime).
-    stats = []
-    for file in files:
+def get_embed_codec(codec: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes], str]:
+    """
+    Returns the compression and decompression functions of one of `EMBED_CODECS`, at its
+    highest compression level, followed by a description of the codec and its version.
+    Only zlib is bundled with Python; raises `ImportError` if the other modules are missing.
+    """
+    if codec == "zlib":
+        return (
+            lambda data: zlib.compress(data, zlib.Z_BEST_COMPRESSION),
+            zlib.decompress,
+            f"zlib {zlib.ZLIB_RUNTIME_VERSION} {zlib.Z_BEST_COMPRESSION}",
+        )
+    if codec == "zstd":
         try:
-            stats.append((file, *os.stat(file)[6:8]))
+            from compression import zstd  # type: ignore  # Python 3.14+.
+
+            return (lambda data: zstd.compress(data, 19), zstd.decompress, f"zstd {zstd.zstd_version} 19")
+        except ImportError:
+            import zstandard  # type: ignore
+
+            return (
+                lambda data: zstandard.ZstdCompressor(level=19).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data),
+                f"zstd {zstandard.ZSTD_VERSION} 19",
+            )
+    if codec == "brotli":
+        import brotli  # type: ignore
+
+        return (
+            lambda data: brotli.compress(data, quality=11),
+            brotli.decompress,
+            f"brotli {getattr(brotli, '__version__', '')} 11",
+        )
+    raise ValueError(f'Unknown codec "{codec}", expected one of: {", ".join(EMBED_CODECS)}.')
+
+
+def compress(data: bytes, codec: str = "zlib") -> bytes:
+    """
+    Compresses `data` with one of `EMBED_CODECS` at its highest level, reusing the result of
+    previous builds if the SCons cache is enabled. Generators embedding large compressed payloads
+    are not cached by SCons (`CommandNoCache`), so this avoids paying for maximum compression
+    again on clean builds and branch switches.
+
+    Payloads are keyed by a digest of the data and the codec with its version and level, so
+    cached results are identical to fresh ones. They share the `cache_limit` of the SCons
+    cache and its LRU eviction in `clean_cache`.
+    """
+    compressor, _, description = get_embed_codec(codec)
+    if not _compression_cache_path:
+        return compressor(data)
+
+    key = hashlib.sha256(f"{description}\n".encode() + data).hexdigest()
+    path = os.path.join(_compression_cache_path, key)
+    try:
+        with open(path, "rb") as file:
+            compressed = file.read()
+        # Mark the payload as recently used for eviction (see `update_cache_index`).
+        record_cache_event("hit", os.path.relpath(path, os.path.dirname(_compression_cache_path)), len(compressed))
+        return compressed
+    except OSError:
+        record_cache_event("miss")
+
+    compressed = compressor(data)
+    try:
+        os.makedirs(_compression_cache_path, exist_ok=True)
+        # Write to a temporary file first, so concurrent builds never read a partial payload.
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(compressed)
+        os.replace(temp_path, path)
+        record_cache_event("push", os.path.relpath(path, os.path.dirname(_compression_cache_path)), len(compressed))
+    except OSError:
+        print_warning(f'Failed to store compressed payload in cache "{_compression_cache_path}"; skipping.')
+    return compressed
+
+
+# The SCons cache keeps an index in this folder (see `update_cache_index`), so that its size is known
+# and its least recently used entries can be evicted without listing or stat'ing the whole cache,
+# which is slow for large caches on network file systems.
+CACHE_INDEX_FOLDER = "index"
+CACHE_INDEX_VERSION = 1
+# Once over `cache_limit`, entries are evicted down to this ratio of it, so that eviction doesn't
+# run again on the next build.
+CACHE_EVICTION_RATIO = 0.9
+# Maximum number of concurrent transfers with the remote cache (see `CacheBackend`).
+CACHE_REMOTE_JOBS = 8
+# Seconds after which the lock of the index is considered stale, left by an interrupted build.
+CACHE_LOCK_TIMEOUT = 60
+# Header holding the SHA-256 digest of the entries sent to and from the remote cache, so that
+# truncated or corrupted transfers are rejected rather than used by builds.
+CACHE_DIGEST_HEADER = "X-Content-SHA256"
+
+# Uses of the cache by this build, as tuples of (event, key, size) where event is "hit", "miss",
+# "push" or "fetch" (from the remote cache, see `CacheBackend`), and keys are paths relative to the
+# cache folder.
+_cache_events = []
+_cache_events_lock = threading.Lock()
+
+
+def record_cache_event(event: str, key: str = "", size: int = 0) -> None:
+    with _cache_events_lock:
+        _cache_events.append((event, key.replace("\\", "/"), size))
+
+
+class CacheBackend:
+    """
+    Remote storage of the entries of the SCons cache, shared by several machines. Entries are
+    identified by their key, their path relative to the cache folder (which contains the build
+    signature of the node). The local `CacheDir` is always used first: entries missing from it are
+    fetched from the backend and stored locally, and new entries are pushed to the backend in the
+    background. At most `jobs` transfers run at the same time.
+    """
+
+    def __init__(self, jobs: int = 4):
+        self.transfers = threading.BoundedSemaphore(jobs)
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        self.pending: List[Future] = []
+
+    def fetch(self, key: str) -> Optional[bytes]:
+        """Returns the content of the entry, or `None` if the backend doesn't have it."""
+        raise NotImplementedError
+
+    def push(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def retrieve(self, key: str) -> Optional[bytes]:
+        with self.transfers:
+            return self.fetch(key)
+
+    def store(self, key: str, path: str) -> None:
+        """Pushes the file at `path` as the entry `key` in the background, see `wait`."""
+
+        def store_file():
+            with self.transfers, open(path, "rb") as f:
+                self.push(key, f.read())
+
+        self.pending.append(self.executor.submit(store_file))
+
+    def wait(self) -> int:
+        """Waits for the pushes in progress, and returns the number of pushed entries."""
+        count = 0
+        for future in self.pending:
+            try:
+                future.result()
+                count += 1
+            except OSError as e:
+                print_warning(f"Failed to push an entry to the remote cache: {e}")
+        self.pending = []
+        self.executor.shutdown()
+        return count
+
+
+class HTTPCacheBackend(CacheBackend):
+    """
+    Stores entries on an HTTP server, with `GET` and `PUT` requests to `<url>/<key>` (see
+    `misc/scripts/cache_server.py`). The backend is disabled for the rest of the build at the
+    first connection error, so an unreachable server only costs one timeout.
+    """
+
+    def __init__(self, url: str, jobs: int = 4, timeout: float = 10):
+        super().__init__(jobs)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.available = True
+
+    def request(self, key: str, method: str, data: Optional[bytes] = None) -> Optional[bytes]:
+        if not self.available:
+            return None
+        request = urllib.request.Request(f"{self.url}/{key}", data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/octet-stream")
+            request.add_header(CACHE_DIGEST_HEADER, hashlib.sha256(data).hexdigest())
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                digest = response.headers.get(CACHE_DIGEST_HEADER)
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                print_warning(f'Remote cache request "{method} {key}" failed: {e.code} {e.reason}')
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            if self.available:
+                self.available = False
+                print_warning(f'Remote cache "{self.url}" is unavailable ({e}); using the local cache only.')
+            return None
+        except http.client.HTTPException as e:  # Such as an incomplete body.
+            print_warning(f'Remote cache request "{method} {key}" failed: {e!r}')
+            return None
+        if data is None and digest != hashlib.sha256(body).hexdigest():
+            print_warning(f'Remote cache entry "{key}" doesn\'t match its digest; skipping.')
+            return None
+        return body
+
+    def fetch(self, key: str) -> Optional[bytes]:
+        return self.request(key, "GET")
+
+    def push(self, key: str, data: bytes) -> None:
+        self.request(key, "PUT", data)
+
+
+def get_cache_dir_class(backend: Optional[CacheBackend] = None):
+    """
+    Returns a `CacheDir` class recording the entries which are retrieved and pushed (see
+    `record_cache_event`), and falling back to `backend` for the entries it doesn't have.
+    """
+    from SCons.CacheDir import CacheDir
+
+    class IndexedCacheDir(CacheDir):
+        def get_key(self, node) -> str:
+            return os.path.relpath(self.cachepath(node)[1], self.path)
+
+        def fetch(self, node) -> bool:
+            """Stores the entry of `node` from the backend in the local cache, if it has it."""
+            key = self.get_key(node)
+            data = backend.retrieve(key.replace("\\", "/")) if backend else None
+            if data is None:
+                return False
+            cachedir, cachefile = self.cachepath(node)
+            try:
+                os.makedirs(cachedir, exist_ok=True)
+                temp_path = f"{cachefile}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, cachefile)
+            except OSError:
+                print_warning(f'Failed to store entry "{key}" of the remote cache locally; skipping.')
+                return False
+            record_cache_event("fetch", key, len(data))
+            return True
+
+        def retrieve(self, node) -> bool:
+            retrieved = super().retrieve(node)
+            if not retrieved and self.is_enabled() and self.fetch(node):
+                retrieved = super().retrieve(node)
+            if retrieved:
+                # The retrieved copy is local, so this doesn't stat the cache itself.
+                record_cache_event("hit", self.get_key(node), os.path.getsize(node.get_abspath()))
+            elif self.is_enabled():
+                record_cache_event("miss")
+            return retrieved
+
+        def push(self, node):
+            if self.is_readonly() or not self.is_enabled() or os.path.exists(self.cachepath(node)[1]):
+                return super().push(node)
+            result = super().push(node)
+            if os.path.isfile(node.get_abspath()):
+                record_cache_event("push", self.get_key(node), os.path.getsize(node.get_abspath()))
+                if backend and os.path.isfile(self.cachepath(node)[1]):
+                    backend.store(self.get_key(node).replace("\\", "/"), self.cachepath(node)[1])
+            return result
+
+    return IndexedCacheDir
+
+
+@contextlib.contextmanager
+def cache_index_lock(index_path: str) -> Generator[Callable[[], None], None, None]:
+    """
+    Serializes updates of the cache index by concurrent builds sharing the cache. Yields a function
+    refreshing the lock, which long updates call regularly so that other builds don't remove it as stale.
+    """
+    lock_path = os.path.join(index_path, "lock")
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > CACHE_LOCK_TIMEOUT:
+                    print_warning(f'Removing stale cache index lock "{lock_path}".')
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.1)
+
+    refresh_time = time.time()
+
+    def refresh() -> None:
+        nonlocal refresh_time
+        if time.time() - refresh_time > CACHE_LOCK_TIMEOUT / 4:
+            os.utime(lock_path)
+            refresh_time = time.time()
+
+    try:
+        yield refresh
+    finally:
+        os.remove(lock_path)
+
+
+def get_cache_shard(key: str) -> str:
+    return key.split("/", 1)[0]
+
+
+def read_cache_journal(journal_path: str) -> dict:
+    """Returns the size and last use time of each entry of the cache, from the journal of the index."""
+    entries = {}
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                last_use, size, key = line.rstrip("\n").split("\t", 2)
+                entries[key] = (int(size), float(last_use))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def write_cache_journal(journal_path: str, entries: dict) -> None:
+    temp_path = f"{journal_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+        for key, (size, last_use) in entries.items():
+            f.write(f"{last_use:.0f}\t{size}\t{key}\n")
+    os.replace(temp_path, journal_path)
+
+
+def scan_cache(cache_path: str) -> dict:
+    """Lists the entries of the cache with their size and last access time, to create its index."""
+    entries = {}
+    for path in glob.glob(os.path.join(cache_path, "*", "*")):
+        key = os.path.relpath(path, cache_path).replace("\\", "/")
+        if get_cache_shard(key) == CACHE_INDEX_FOLDER or not os.path.isfile(path) or path.endswith(".tmp"):
+            continue
+        try:
+            stat = os.stat(path)
+            entries[key] = (stat.st_size, stat.st_atime)
         except OSError:
-            print_error(f'Failed to access cache file "{file}"; skipping.')
-
-    # Sort by most recent access (most sensible to keep) first. Search for the first entry where
-    # the cache limit is reached.
-    stats.sort(key=lambda x: x[2], reverse=True)
-    sum = 0
-    for index, stat in enumerate(stats):
-        sum += stat[1]
-        if sum > cache_limit:
-            purge = [x[0] for x in stats[index:]]
-            count = len(purge)
-            for file in purge:
-                try:
-                    os.remove(file)
-                except OSError:
-                    print_error(f'Failed to remove cache file "{file}"; skipping.')
-                    count -= 1
-            if verbose and count:
-                print_info(f"Purged {count} file{'s' if count else ''} from cache.")
+            print_error(f'Failed to access cache file "{path}"; skipping.')
+    return entries
+
+
+def count_cache_entries(summary: dict, entries: dict) -> None:
+    """Sets the size, entry count and shard sizes of the summary from the entries of the journal."""
+    shards = {}
+    for key, (size, _) in entries.items():
+        shards[get_cache_shard(key)] = shards.get(get_cache_shard(key), 0) + size
+    summary.update(size=sum(shards.values()), entries=len(entries), shards=shards)
+
+
+def create_cache_summary(entries: dict) -> dict:
+    summary = {
+        "version": CACHE_INDEX_VERSION,
+        "journal_lines": len(entries),
+        "hits": 0,
+        "misses": 0,
+        "pushes": 0,
+        "fetches": 0,
+        "bytes_saved": 0,
+        "evictions": 0,
+        "evicted_bytes": 0,
+    }
+    count_cache_entries(summary, entries)
+    return summary
+
+
+def load_cache_summary(index_path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(index_path, "summary.json"), "r", encoding="utf-8") as f:
+            summary = json.load(f)
+        return summary if summary.get("version") == CACHE_INDEX_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def evict_cache_entries(
+    cache_path: str, summary: dict, entries: dict, target_size: int, refresh_lock: Optional[Callable[[], None]] = None
+) -> int:
+    """Removes the least recently used entries until the cache fits in `target_size`, returns their count."""
+    total_size = sum(size for size, _ in entries.values())
+    count = 0
+    for key, (size, _) in sorted(entries.items(), key=lambda x: x[1][1]):
+        if total_size <= target_size:
             break
+        if refresh_lock:
+            refresh_lock()
+        try:
+            os.remove(os.path.join(cache_path, key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            print_error(f'Failed to remove cache file "{key}"; skipping.')
+            continue
+        del entries[key]
+        total_size -= size
+        summary["evicted_bytes"] += size
+        count += 1
+    count_cache_entries(summary, entries)
+    summary["evictions"] += count
+    return count
+
+
+def update_cache_index(cache_path: str, cache_limit: int, events: List[Tuple[str, str, int]]) -> Tuple[dict, int]:
+    """
+    Adds the uses of the cache by this build to its index, then evicts the least recently used
+    entries if the cache exceeds `cache_limit`. Returns the updated summary of the index, and the
+    number of evicted entries.
+
+    The index consists of a summary (sizes per shard, entry count and counters) and a journal,
+    to which the last use of each entry used by the build is appended. Only the journal is read to
+    add or evict entries, and only evicted entries are touched; the journal is compacted at that time,
+    or when it gets much larger than the number of entries. The sizes of the summary are recomputed
+    from the journal whenever it is read, as concurrent builds can push or fetch the same entries.
+    The index is created from the contents of the cache the first time.
+    """
+    index_path = os.path.join(cache_path, CACHE_INDEX_FOLDER)
+    journal_path = os.path.join(index_path, "journal")
+    os.makedirs(index_path, exist_ok=True)
+
+    with cache_index_lock(index_path) as refresh_lock:
+        summary = load_cache_summary(index_path)
+        entries = None
+        if summary is None:
+            entries = scan_cache(cache_path)
+            write_cache_journal(journal_path, entries)
+            summary = create_cache_summary(entries)
+        elif any(event in ("push", "fetch") for event, _, _ in events):
+            entries = read_cache_journal(journal_path)
+
+        now = time.time()
+        lines = []
+        for event, key, size in events:
+            if event == "miss":
+                summary["misses"] += 1
+                continue
+            if event == "hit":
+                summary["hits"] += 1
+                summary["bytes_saved"] += size
+            elif entries is not None and key not in entries:
+                # Another build, or another job of this one, may have pushed or fetched the same entry.
+                counter = "pushes" if event == "push" else "fetches"
+                summary[counter] = summary.get(counter, 0) + 1
+            if entries is not None:
+                entries[key] = (size, now)
+            lines.append(f"{now:.0f}\t{size}\t{key}\n")
+        if lines:
+            with open(journal_path, "a", encoding="utf-8", newline="\n") as f:
+                f.writelines(lines)
+            summary["journal_lines"] += len(lines)
+        if entries is not None:
+            count_cache_entries(summary, entries)
+
+        count = 0
+        over_limit = cache_limit and summary["size"] > cache_limit
+        if over_limit or summary["journal_lines"] > 2 * summary["entries"] + 10000:
+            if entries is None:
+                entries = read_cache_journal(journal_path)
+                count_cache_entries(summary, entries)
+            if over_limit:
+                target_size = int(cache_limit * CACHE_EVICTION_RATIO)
+                count = evict_cache_entries(cache_path, summary, entries, target_size, refresh_lock)
+            write_cache_journal(journal_path, entries)
+            summary["journal_lines"] = len(entries)
+
+        temp_path = os.path.join(index_path, f"summary.json.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(summary, indent=4, sort_keys=True) + "\n")
+        os.replace(temp_path, os.path.join(index_path, "summary.json"))
+
+    return summary, count
+
+
+def get_cache_stats(summary: dict, events: List[Tuple[str, str, int]], evicted: int) -> List[str]:
+    """Returns a report of the use of the cache by this build and since its index was created."""
+    hits = sum(1 for event, _, _ in events if event == "hit")
+    misses = sum(1 for event, _, _ in events if event == "miss")
+    saved = sum(size for event, _, size in events if event == "hit")
+    pushed = sum(1 for event, _, _ in events if event == "push")
+    fetched = sum(1 for event, _, _ in events if event == "fetch")
+
+    def rate(hits: int, misses: int) -> str:
+        return f"{hits * 100 / (hits + misses):.1f}%" if hits + misses else "n/a"
+
+    return [
+        f"Cache: {convert_size(summary['size'])} in {summary['entries']} entries ({len(summary['shards'])} shards).",
+        f"This build: {hits} hits, {misses} misses (hit rate {rate(hits, misses)}), {convert_size(saved)} "
+        f"retrieved, {fetched} fetched from the remote cache, {pushed} pushed, {evicted} evicted.",
+        f"Overall: {summary['hits']} hits, {summary['misses']} misses (hit rate "
+        f"{rate(summary['hits'], summary['misses'])}), {convert_size(summary['bytes_saved'])} retrieved, "
+        f"{summary.get('fetches', 0)} fetched, {summary['pushes']} pushed, {summary['evictions']} evicted ({convert_size(summary['evicted_bytes'])}).",
+    ]
+
+
+def clean_cache(cache_path: str, cache_limit: int, verbose: bool, stats: bool = False) -> None:
+    with _cache_events_lock:
+        events = list(_cache_events)
+    try:
+        summary, count = update_cache_index(cache_path, cache_limit, events)
+    except OSError as e:
+        print_error(f'Failed to update the index of cache "{cache_path}": {e}')
+        return
+    if verbose and count:
+        print_info(f"Purged {count} file{'s' if count != 1 else ''} from cache.")
+    if stats:
+        for line in get_cache_stats(summary, events, count):
+            print_info(line)
 
 
 def prepare_cache(env) -> None:
@@ -862,11 +1549,19 @@ def prepare_cache(env) -> None:
         cache_path = cast(str, os.environ.get("SCONS_CACHE"))
 
     if not cache_path:
+        if env["cache_remote"]:
+            print_warning("`cache_remote` requires a local cache; set `cache_path` to use it.")
         return
 
-    env.CacheDir(cache_path)
+    backend = None
+    if env["cache_remote"]:
+        backend = HTTPCacheBackend(env["cache_remote"], CACHE_REMOTE_JOBS)
+    env.CacheDir(cache_path, get_cache_dir_class(backend))
     print(f'SCons cache enabled... (path: "{cache_path}")')
 
+    global _compression_cache_path
+    _compression_cache_path = os.path.join(cache_path, "compressed")
+
     if env["cache_limit"]:
         cache_limit = float(env["cache_limit"])
     elif os.environ.get("SCONS_CACHE_LIMIT"):
@@ -879,11 +1574,21 @@ def prepare_cache(env) -> None:
         print(
             "Current cache limit is {} (used: {})".format(
                 convert_size(cache_limit) if cache_limit else "∞",
-                convert_size(get_size(cache_path)),
+                convert_size((load_cache_summary(os.path.join(cache_path, CACHE_INDEX_FOLDER)) or {}).get("size", 0)),
             )
         )
 
-    atexit.register(clean_cache, cache_path, cache_limit, env["verbose"])
+    atexit.register(clean_cache, cache_path, cache_limit, env["verbose"], env["cache_stats"])
+    if backend:
+        print(f'Remote cache enabled... (url: "{env["cache_remote"]}")')
+
+        def wait_for_remote_cache():
+            # Registered last so that it runs first, before eviction can remove the entries being pushed.
+            count = backend.wait()
+            if env["verbose"] and count:
+                print_info(f"Pushed {count} entr{'ies' if count != 1 else 'y'} to the remote cache.")
+
+        atexit.register(wait_for_remote_cache)
 
 
 def prepare_purge(env):
@@ -899,6 +1604,25 @@ def prepare_purge(env):
     atexit.register(purge_flaky_files)
 
 
+# Time spent in each phase of SConstruct before building (see `record_startup_phase`).
+_startup_phases = []
+_startup_clock = time.perf_counter()
+
+
+def record_startup_phase(name: str) -> None:
+    """Records the time spent since the previous phase (or since this module was imported) as `name`."""
+    global _startup_clock
+    now = time.perf_counter()
+    _startup_phases.append((name, now - _startup_clock))
+    _startup_clock = now
+
+
+def print_startup_phases() -> None:
+    print_info(f"Startup time: {sum(seconds for _, seconds in _startup_phases):.2f} s")
+    for name, seconds in _startup_phases:
+        print_info(f"  {name:<24} {seconds:6.2f} s")
+
+
 def prepare_timer():
     import time
 
@@ -911,6 +1635,193 @@ def prepare_timer():
     atexit.register(print_elapsed_time, time.time())
 
 
+# Number of the slowest targets and generators listed by the build profiler.
+PROFILE_SUMMARY_SIZE = 10
+
+
+class BuildProfiler:
+    """
+    Records the time spent building each node, see `prepare_profiler`. Nodes may be built
+    concurrently by several jobs, each of them is assigned a slot in order of appearance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.slots = {}
+        # Tuples of (targets, category, generator, sources, start, end, slot), in seconds since the start.
+        self.events = []
+
+    def record(self, targets: List[str], category: str, generator: str, sources: List[str], start: float, end: float):
+        with self.lock:
+            slot = self.slots.setdefault(threading.get_ident(), len(self.slots))
+            self.events.append((targets, category, generator, sources, start - self.origin, end - self.origin, slot))
+
+    def get_trace(self) -> dict:
+        """Returns the events in the Chrome trace format, for `chrome://tracing` or https://ui.perfetto.dev."""
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": slot, "args": {"name": f"Job {slot + 1}"}}
+            for slot in range(len(self.slots))
+        ]
+        for targets, category, generator, sources, start, end, slot in self.events:
+            args = {"targets": targets}
+            if generator:
+                args["generator"] = generator
+            trace.append(
+                {
+                    "name": targets[0],
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round(start * 1e6),
+                    "dur": round((end - start) * 1e6),
+                    "pid": 0,
+                    "tid": slot,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def get_compile_times(self) -> dict:
+        """Returns the compile time of each C++ source in seconds, as read by the `scu_compile_times` option."""
+        compile_times = {}
+        for _, category, _, sources, start, end, _ in self.events:
+            if category == "compile" and sources and os.path.basename(os.path.dirname(sources[0])) != "scu":
+                compile_times[sources[0]] = round(end - start, 3)
+        return dict(sorted(compile_times.items()))
+
+    def get_summary(self, count: int = PROFILE_SUMMARY_SIZE) -> List[str]:
+        totals = {}
+        generators = {}
+        for _, category, generator, _, start, end, _ in self.events:
+            totals[category] = totals.get(category, 0) + end - start
+            if generator:
+                generators[generator] = generators.get(generator, 0) + end - start
+
+        lines = ["Build profile (total time per category):"]
+        lines += [
+            f"  {category:<10} {seconds:9.2f} s" for category, seconds in sorted(totals.items(), key=lambda x: -x[1])
+        ]
+        lines.append("Slowest targets:")
+        for targets, category, _, _, start, end, _ in sorted(self.events, key=lambda x: x[4] - x[5])[:count]:
+            lines.append(f"  {end - start:9.2f} s  {category:<10} {targets[0]}")
+        if generators:
+            lines.append("Slowest generators:")
+            for generator, seconds in sorted(generators.items(), key=lambda x: -x[1])[:count]:
+                lines.append(f"  {seconds:9.2f} s  {generator}")
+        return lines
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(self.get_trace(), f)
+        compile_times = self.get_compile_times()
+        if compile_times:
+            with open(os.path.splitext(path)[0] + ".compile_times.json", "w", encoding="utf-8", newline="\n") as f:
+                f.write(json.dumps(compile_times, indent=4) + "\n")
+
+
+# Categories of the builders, by name (see `get_node_category`).
+BUILDER_CATEGORIES = {
+    "Object": "compile",
+    "SharedObject": "compile",
+    "StaticObject": "compile",
+    "Library": "archive",
+    "StaticLibrary": "archive",
+    "Program": "link",
+    "SharedLibrary": "link",
+    "LoadableModule": "link",
+}
+
+
+def get_node_category(node) -> Tuple[str, str]:
+    """
+    Returns the category of the action building `node` ("compile", "archive", "link", "generator",
+    "cache" if it was retrieved from the cache, or "command"), and the name of the function which
+    generated it, if any.
+    """
+    from SCons.Action import FunctionAction
+
+    if getattr(node, "cached", 0):
+        return "cache", ""
+    for action in node.get_executor().get_action_list():
+        if isinstance(action, FunctionAction):
+            function = action.execfunction
+            return "generator", f"{getattr(function, '__module__', '')}.{getattr(function, '__name__', str(function))}"
+    builder = node.get_builder()
+    name = builder.get_name(node.get_build_env()) if builder else ""
+    return BUILDER_CATEGORIES.get(name, "command"), ""
+
+
+# Functions called after each node is built (see `add_build_task_listener`).
+_build_task_listeners = []
+
+
+def add_build_task_listener(listener: Callable) -> None:
+    """
+    Calls `listener(task, start, end)` after SCons executes each task, with the times it started
+    and ended (from `time.perf_counter`). Listeners are called from the threads running the jobs.
+    SCons is only instrumented once a listener is added.
+    """
+    if not _build_task_listeners:
+        from SCons.Script.Main import BuildTask
+
+        execute = BuildTask.execute
+
+        def execute_with_listeners(task):
+            start = time.perf_counter()
+            try:
+                execute(task)
+            finally:
+                end = time.perf_counter()
+                for listener in _build_task_listeners:
+                    listener(task, start, end)
+
+        BuildTask.execute = execute_with_listeners
+    _build_task_listeners.append(listener)
+
+
+def prepare_profiler(env):
+    """
+    When `profile_build` is set, times the execution of every node and writes a Chrome trace of
+    the build to this path at exit, as well as the compile times of the sources next to it, and
+    prints the slowest targets and generators. The build is not instrumented otherwise.
+    """
+    if not env["profile_build"]:
+        return
+
+    profiler = BuildProfiler()
+
+    def record_task(task, start: float, end: float):
+        node = task.targets[0]
+        category, generator = get_node_category(node)
+        targets = [str(target) for target in task.targets]
+        sources = [str(source) for source in node.sources]
+        profiler.record(targets, category, generator, sources, start, end)
+
+    add_build_task_listener(record_task)
+
+    def write_profile():
+        if not profiler.events:
+            return
+        profiler.write(env["profile_build"])
+        for line in profiler.get_summary():
+            print_info(line)
+        print_info(f'Build profile written to "{env["profile_build"]}".')
+
+    atexit.register(write_profile)
+
+
+def prepare_generated_report(env):
+    if not env["verbose"]:
+        return
+
+    def print_generated_report():
+        written, skipped = _generated_files["written"], _generated_files["skipped"]
+        if written or skipped:
+            print_info(f"Generated files: {written} rewritten, {skipped} unchanged.")
+
+    atexit.register(print_generated_report)
+
+
 def dump(env):
     """
     Dumps latest build information for debugging purposes and external tools.
@@ -1086,7 +1997,6 @@ def generate_vs_project(env, original_args, project_name="godot"):
             others.append(str(file).replace("/", "\\"))
 
     skip_filters = False
-    import hashlib
     import json
 
     md5 = hashlib.md5(
@@ -1443,6 +2353,50 @@ def generate_copyright_header(filename: str) -> str:
     return TEMPLATE % filename
 
 
+# Number of generated files rewritten and left untouched by `write_file_if_changed`, reported
+# at the end of verbose builds. Builders may run concurrently, hence the lock.
+_generated_files = {"written": 0, "skipped": 0}
+_generated_files_lock = threading.Lock()
+
+
+def write_file_if_changed(path: str, content: Union[str, bytes]) -> bool:
+    """
+    Writes `content` to `path`, unless the file already holds the exact same data.
+    Leaving unchanged files untouched preserves their modification time, so neither
+    SCons nor compiler caches consider their dependents out of date. SCons deletes the
+    targets of a builder before running it unless they're precious, so builders should
+    be set up with `env.CommandNoCache` or `precious_emitter`.
+
+    Returns `True` if the file was written.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    with _generated_files_lock:
+                        _generated_files["skipped"] += 1
+                    return False
+    except OSError:
+        pass
+    with open(path, "wb") as file:
+        file.write(data)
+    with _generated_files_lock:
+        _generated_files["written"] += 1
+    return True
+
+
+@contextlib.contextmanager
+def open_if_changed(path: str) -> Generator[TextIOBase, None, None]:
+    """
+    Drop-in replacement for `open(path, "w", encoding="utf-8", newline="\\n")` in builders:
+    the content is buffered and only written out if it differs from the existing file.
+    """
+    with StringIO(newline="\n") as file:
+        yield file
+        write_file_if_changed(path, file.getvalue())
+
+
 @contextlib.contextmanager
 def generated_wrapper(
     path,  # FIXME: type with `Union[str, Node, List[Node]]` when pytest conflicts are resolved
@@ -1494,7 +2448,7 @@ def generated_wrapper(
         header_guard = (f"{prefix}{split[0]}{suffix}.{'.'.join(split[1:])}".upper()
                 .replace(".", "_").replace("-", "_").replace(" ", "_").replace("__", "_"))  # fmt: skip
 
-    with open(path, "wt", encoding="utf-8", newline="\n") as file:
+    with open_if_changed(path) as file:
         file.write(generate_copyright_header(path))
         file.write("\n/* THIS FILE IS GENERATED. EDITS WILL BE LOST. */\n\n")
 
@@ -1550,3 +2504,131 @@ def to_raw_cstring(value: Union[str, List[str]]) -> str:
         split += [segment]
 
     return " ".join(f'R"<!>({x.decode()})<!>"' for x in split)
+
+
+# Precomputed decimal literals for every byte value, so formatting a buffer never
+# has to call `str()` per byte.
+_BYTE_LITERALS = [f"{byte}," for byte in range(256)]
+
+
+def format_buffer(buffer: bytes, indent: int = 0, width: int = 120) -> str:
+    """
+    Formats binary data as the body of a C/C++ array initializer, to embed it in
+    generated sources. Produces wide lines of decimal values instead of one value
+    per line, which keeps both the generation and the compiler parsing time low.
+
+    - `buffer`: The bytes to format.
+    - `indent`: Amount of tabs to prefix each line with.
+    - `width`: Maximum line width, counting a tab as 4 characters.
+
+    Plain initializer lists are used rather than string literals, as MSVC limits the
+    length of string literals, and C++ doesn't allow a literal to fill an array exactly
+    without its null terminator (which would change the size of the symbol).
+    """
+    prefix = "\t" * indent
+    # Each value takes at most 5 characters ("255, "), so a fixed amount of values per
+    # line keeps us within `width` without having to measure every line.
+    per_line = max(1, (width - 4 * indent) // 5)
+    literals = _BYTE_LITERALS.__getitem__
+    view = memoryview(buffer)
+    return "\n".join(
+        prefix + " ".join(map(literals, view[offset : offset + per_line])) for offset in range(0, len(view), per_line)
+    )
+
+
+def embedded_targets(env, header: str) -> List[str]:
+    """
+    Returns the targets of a builder embedding binary data with `embed_buffers`, from
+    the path of its generated header. With `incbin=yes`, a C++ source holding the
+    assembler stub and the raw data file it includes are generated alongside it.
+    """
+    if not env["incbin"]:
+        return [header]
+    base = header[: -len(".gen.h")] if header.endswith(".gen.h") else os.path.splitext(header)[0]
+    return [header, base + ".gen.cpp", base + ".gen.bin"]
+
+
+def embedded_sources(nodes) -> list:
+    """Returns the sources to compile from the nodes of `embedded_targets`, if any."""
+    return [node for node in nodes if str(node).endswith(".gen.cpp")]
+
+
+def embed_buffers(
+    target,
+    buffers: List[Tuple[str, bytes]],
+    declaration: str = "static const unsigned char",
+    extern_declaration: str = 'extern "C" const unsigned char',
+    label_prefix: Optional[str] = None,
+    includes: Optional[List[str]] = None,
+) -> str:
+    """
+    Returns the code embedding each `(name, buffer)` pair as an array called `name`,
+    to be written in the header generated by a builder.
+
+    If `target` was set up by `embedded_targets` for an `incbin=yes` build, the buffers
+    are instead concatenated in a raw data file which the generated source includes
+    with the assembler `.incbin` directive, and the header only declares the arrays.
+    This spares the compiler from parsing huge initializer lists, while keeping the
+    same names and sizes.
+
+    As assembler labels are global, they're prefixed with `label_prefix` (derived from
+    the data file name by default), and the header binds each name to its label with a
+    reference, so the same name can be embedded by several builders. An empty prefix
+    exports the names themselves, which may be macros defined by the `includes` headers.
+    """
+    if len(target) < 3:
+        return "".join(f"{declaration} {name}[] = {{\n{format_buffer(buffer, 1)}\n}};\n" for name, buffer in buffers)
+
+    data_path = os.path.abspath(str(target[2])).replace("\\", "/")
+    if label_prefix is None:
+        data_name = os.path.basename(data_path).split(".")[0]
+        label_prefix = "_incbin_" + re.sub(r"\W", "_", data_name) + "_"
+    digest = hashlib.sha256()
+    directives = []
+    declarations = []
+    offset = 0
+    for name, buffer in buffers:
+        label = label_prefix + name
+        digest.update(buffer)
+        directives += [
+            f'\t\t".globl " _INCBIN_LABEL({label}) "\\n"',
+            f'\t\t".balign 16\\n" _INCBIN_LABEL({label}) ":\\n"',
+        ]
+        if buffer:  # Assemblers warn about empty `.incbin` directives.
+            directives.append(f'\t\t".incbin \\"{data_path}\\", {offset}, {len(buffer)}\\n"')
+        offset += len(buffer)
+        if label == name:
+            declarations.append(f"{extern_declaration} {name}[];\n")
+        else:
+            declarations += [
+                f"{extern_declaration} {label}[{len(buffer)}];\n",
+                f"{declaration} (&{name})[{len(buffer)}] = {label};\n",
+            ]
+    write_file_if_changed(data_path, b"".join(buffer for _, buffer in buffers))
+
+    includes_code = "".join(f'#include "{include}"\n' for include in includes or []) + ("\n" if includes else "")
+    directives_code = "\n".join(directives)
+    # The digest makes the source change along with the data, so SCons knows to rebuild it.
+    # Labels are expanded before being stringified, as they may be macros.
+    with generated_wrapper(str(target[1])) as file:
+        file.write(f"""\
+// Embeds "{os.path.basename(data_path)}" (SHA-256: {digest.hexdigest()}).
+
+{includes_code}#if defined(__APPLE__)
+#define _INCBIN_SECTION ".const_data"
+#elif defined(_WIN32)
+#define _INCBIN_SECTION ".section .rdata,\\"dr\\""
+#else
+#define _INCBIN_SECTION ".section .rodata"
+#endif
+
+#define _INCBIN_STRINGIFY(m_value) #m_value
+#define _INCBIN_EXPAND(m_value) _INCBIN_STRINGIFY(m_value)
+#define _INCBIN_LABEL(m_name) _INCBIN_EXPAND(__USER_LABEL_PREFIX__) _INCBIN_EXPAND(m_name)
+
+__asm__(_INCBIN_SECTION "\\n"
+{directives_code}
+\t\t".text\\n");
+""")
+
+    return "".join(declarations)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+Compares the legacy one-byte-per-line embedding of binary blobs with `methods.format_buffer`,
+measuring both the header generation time and the compiler front-end time (`-fsyntax-only`).
+
+Usage: misc/scripts/benchmark_embed.py [blob] [--cxx c++]
+Defaults to the ICU data blob used by the `text_server_adv` module.
+"""
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from methods import convert_size, format_buffer  # noqa: E402
+
+
+def write_legacy(path: str, buf: bytes) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as g:
+        g.write("extern const unsigned long long BLOB_SIZE = " + str(len(buf)) + ";\n")
+        g.write("extern const unsigned char BLOB[] = {\n")
+        for i in range(len(buf)):
+            g.write("\t" + str(buf[i]) + ",\n")
+        g.write("};\n")
+
+
+def write_bulk(path: str, buf: bytes) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as g:
+        g.write("extern const unsigned long long BLOB_SIZE = " + str(len(buf)) + ";\n")
+        g.write("extern const unsigned char BLOB[] = {\n")
+        g.write(format_buffer(buf, 1))
+        g.write("\n};\n")
+
+
+def time_call(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("blob", nargs="?", default=str(ROOT / "thirdparty/icu4c/icudt_godot.dat"))
+    parser.add_argument("--cxx", default=os.environ.get("CXX", "c++"), help="Compiler used to time the front end.")
+    parser.add_argument("--size", type=int, default=0, help="Use random data of this size (in MiB) instead.")
+    args = parser.parse_args()
+
+    if args.size:
+        buf = os.urandom(args.size * 1024 * 1024)
+        print(f"Using {convert_size(len(buf))} of random data.")
+    else:
+        try:
+            with open(args.blob, "rb") as f:
+                buf = f.read()
+        except OSError as e:
+            print(f'Could not read "{args.blob}": {e}. Pass another blob, or `--size` for random data.')
+            return 1
+        print(f'Using "{args.blob}" ({convert_size(len(buf))}).')
+
+    print(f"{'method':<8} {'generate':>10} {'file size':>12} {'front end':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, writer in (("legacy", write_legacy), ("bulk", write_bulk)):
+            path = os.path.join(tmp, f"{name}.gen.cpp")
+            generate = time_call(writer, path, buf)
+            size = convert_size(os.path.getsize(path))
+
+            command = shlex.split(args.cxx) + ["-std=gnu++17", "-fsyntax-only", path]
+            try:
+                start = time.perf_counter()
+                subprocess.run(command, check=True)
+                front_end = f"{time.perf_counter() - start:9.2f}s"
+            except (subprocess.CalledProcessError, OSError):
+                front_end = "failed"
+
+            print(f"{name:<8} {generate:9.2f}s {size:>12} {front_end:>10}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+Serves a build cache shared by several machines, for the `cache_remote` build option: entries
+are read with `GET /<key>` and written with `PUT /<key>`, where keys are paths relative to the
+cache folder, as in the SCons cache (`<shard>/<signature>`). Entries are sent both ways along with
+their SHA-256 digest (`methods.CACHE_DIGEST_HEADER`): uploads which don't match it are rejected,
+and clients discard downloads which don't.
+
+Entries are stored in `--root` with the same layout and index as a local cache (see
+`methods.update_cache_index`), so the folder can also be used as `cache_path` on this machine.
+With `--limit`, the least recently used entries are evicted once the cache gets larger.
+
+There is no authentication: only serve the cache on a trusted network, as any client can
+add entries, and builds use them without checking how they were built.
+
+Usage: misc/scripts/cache_server.py [--root cache] [--port 8070] [--limit GiB]
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import methods  # noqa: E402
+
+# Shard folder (optional) and file name, which can't start with a dot.
+KEY_REGEX = re.compile(r"^(?:[0-9A-Za-z_]+/)?[0-9A-Za-z_][0-9A-Za-z_.\-]*$")
+# Largest accepted entry, in bytes.
+MAX_ENTRY_SIZE = 4 * 1024 * 1024 * 1024
+# Seconds between updates of the index, which evict entries if needed.
+INDEX_UPDATE_INTERVAL = 60
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    server: "CacheServer"
+
+    def get_path(self):
+        key = self.path.lstrip("/")
+        if not KEY_REGEX.match(key) or key.split("/", 1)[0] == methods.CACHE_INDEX_FOLDER:
+            self.send_error(400, "Invalid key")
+            return key, None
+        return key, os.path.join(self.server.root, key)
+
+    def do_HEAD(self):
+        _, path = self.get_path()
+        if path is None:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            self.send_error(404)
+            return
+        # Only checks for the entry, so it doesn't count as a hit or miss.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+
+    def do_GET(self):
+        key, path = self.get_path()
+        if path is None:
+            return
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.server.record("miss")
+            self.send_error(404)
+            return
+        self.server.record("hit", key, len(data))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(methods.CACHE_DIGEST_HEADER, hashlib.sha256(data).hexdigest())
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        key, path = self.get_path()
+        if path is None:
+            return
+        size = int(self.headers.get("Content-Length", -1))
+        if size < 0 or size > MAX_ENTRY_SIZE:
+            self.send_error(411 if size < 0 else 413)
+            return
+        data = self.rfile.read(size)
+        if len(data) != size:
+            self.send_error(400, "Incomplete body")
+            return
+        if self.headers.get(methods.CACHE_DIGEST_HEADER) != hashlib.sha256(data).hexdigest():
+            self.send_error(400, "Missing or mismatched digest")
+            return
+        exists = os.path.exists(path)
+        if not exists:
+            # Write to a temporary file first, so clients never read a partial entry.
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self.server.record("push", key, size)
+        self.send_response(200 if exists else 201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CacheServer(ThreadingHTTPServer):
+    def __init__(self, address, root: str, limit: int = 0, verbose: bool = False):
+        self.address_family = socket.AF_INET6 if ":" in address[0] else socket.AF_INET
+        super().__init__(address, CacheRequestHandler)
+        self.root = root
+        self.limit = limit
+        self.verbose = verbose
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, event: str, key: str = "", size: int = 0) -> None:
+        with self.lock:
+            self.events.append((event, key, size))
+
+    def update_index(self):
+        """Adds the requests served since the last update to the index, and evicts entries if needed."""
+        with self.lock:
+            events, self.events = self.events, []
+        summary, evicted = methods.update_cache_index(self.root, self.limit, events)
+        if self.verbose or evicted:
+            for line in methods.get_cache_stats(summary, events, evicted):
+                print(line.replace("This build", "Last interval"))
+        return summary
+
+
+def serve(root: str, host: str, port: int, limit: int, verbose: bool) -> None:
+    os.makedirs(root, exist_ok=True)
+    httpd = CacheServer((host, port), root, limit, verbose)
+    # Create the index now, rather than when the first requests are served.
+    httpd.update_index()
+    stop = threading.Event()
+
+    def update_index():
+        while not stop.wait(INDEX_UPDATE_INTERVAL):
+            httpd.update_index()
+
+    updater = threading.Thread(target=update_index, daemon=True)
+    updater.start()
+    print(f'Serving the cache in "{root}" at: http://{host or "127.0.0.1"}:{httpd.server_address[1]}')
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt received, stopping server.")
+    finally:
+        stop.set()
+        updater.join()
+        httpd.server_close()
+        httpd.update_index()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-r", "--root", default="cache", help="Folder storing the cache entries.")
+    parser.add_argument("-b", "--bind", default="", help="Address to listen on (all interfaces by default).")
+    parser.add_argument("-p", "--port", default=8070, type=int, help="Port to listen on.")
+    parser.add_argument("-l", "--limit", default=0, type=float, help="Max size (in GiB) of the cache, 0 for no limit.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request and cache statistics.")
+    args = parser.parse_args()
+
+    serve(os.path.abspath(args.root), args.bind, args.port, max(0, int(args.limit * 1024 * 1024 * 1024)), args.verbose)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""
+Compares the codecs of the `embed_compression` build option on the data embedded in the binary:
+documentation (compressed per class), editor translations (compiled to .mo) and certificates.
+Reports the compressed size, compression time and decompression time of each codec, so one
+can be picked per target (e.g. smallest size for web exports, fastest decoding for the editor).
+
+Decompression times are measured with the Python bindings of each codec, which wrap the same
+libraries as the engine; compare them relatively rather than as absolute startup costs.
+
+Usage: misc/scripts/compare_embed_codecs.py [--output report.md]
+"""
+
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from editor.editor_builders import make_mo, parse_po  # noqa: E402
+from methods import EMBED_CODECS, convert_size, get_embed_codec  # noqa: E402
+
+
+def load_datasets() -> Dict[str, List[bytes]]:
+    datasets = {
+        "docs": [Path(path).read_bytes() for path in sorted(glob.glob(str(ROOT / "doc/classes/*.xml")))],
+        "translations": [],
+        "certs": [(ROOT / "thirdparty/certs/ca-certificates.crt").read_bytes()],
+    }
+    for path in sorted(glob.glob(str(ROOT / "editor/translations/*/*.po"))):
+        datasets["translations"].append(make_mo(parse_po(Path(path).read_bytes())))
+    return datasets
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Also write the report to this Markdown file.")
+    args = parser.parse_args()
+
+    datasets = load_datasets()
+    lines = [
+        "| data | codec | size | ratio | compression | decompression |",
+        "|------|-------|-----:|------:|------------:|--------------:|",
+    ]
+    for codec in EMBED_CODECS:
+        try:
+            compressor, decompressor, description = get_embed_codec(codec)
+        except ImportError as e:
+            print(f"Skipping {codec}: {e}")
+            continue
+        print(f"Measuring {description}...")
+
+        for name, chunks in datasets.items():
+            uncompressed = sum(len(chunk) for chunk in chunks)
+            start = time.perf_counter()
+            compressed = [compressor(chunk) for chunk in chunks]
+            compression = time.perf_counter() - start
+            start = time.perf_counter()
+            for chunk in compressed:
+                decompressor(chunk)
+            decompression = time.perf_counter() - start
+
+            size = sum(len(chunk) for chunk in compressed)
+            lines.append(
+                f"| {name} | {codec} | {convert_size(size)} | {size / uncompressed:.1%} "
+                f"| {compression:.2f} s | {decompression * 1000:.1f} ms |"
+            )
+
+    report = "\n".join(lines) + "\n"
+    print(report, end="")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            f.write(report)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
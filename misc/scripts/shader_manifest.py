@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+Writes a manifest of the RD shader classes generated by the build: for each of them, its
+source key (which `ShaderRD` uses in place of hashing its code to identify it in the shader
+cache), the files it includes and the content hashes of the chunks of each stage.
+
+Variants are declared by the engine when initializing each shader, so they are not part of the
+manifest; a changed source key invalidates the cache entries of every variant.
+
+Compare the manifest of two builds to find the shaders whose cached pipelines are stale,
+without compiling anything. Pass `--minify` if the build uses `minify_shaders=yes`.
+
+Usage: misc/scripts/shader_manifest.py [--minify] [--output manifest.json] [--compare old_manifest.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from glsl_builders import get_rd_manifest, map_sources  # noqa: E402
+
+SHADERS = "servers/rendering/renderer_rd/shaders/**/*.glsl"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minify", action="store_true", help="Describe shaders built with `minify_shaders=yes`.")
+    parser.add_argument("--output", help="Write the manifest to this JSON file instead of the standard output.")
+    parser.add_argument("--compare", help="List the shaders which changed since this manifest, and fail if any did.")
+    args = parser.parse_args()
+
+    # Paths in the manifest are relative to the root of the repository, as in the build.
+    os.chdir(ROOT)
+    sources = [path for path in sorted(glob.glob(SHADERS, recursive=True)) if not path.endswith("_inc.glsl")]
+    shaders = {}
+
+    def describe(source: str) -> None:
+        manifest = get_rd_manifest(source, args.minify)
+        shaders[manifest["class"]] = manifest
+
+    map_sources(describe, sources)
+    manifest = {name: shaders[name] for name in sorted(shaders)}
+
+    text = json.dumps(manifest, indent=4) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+    elif not args.compare:
+        print(text, end="")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old_manifest = json.load(f)
+        changed = [name for name in manifest if name in old_manifest and manifest[name] != old_manifest[name]]
+        added = [name for name in manifest if name not in old_manifest]
+        removed = [name for name in old_manifest if name not in manifest]
+        for title, names in (("Changed", changed), ("Added", added), ("Removed", removed)):
+            for name in names:
+                print(f"{title}: {name}")
+        print(f"{len(changed) + len(added) + len(removed)} of {len(manifest)} shaders have stale cache entries.")
+        return 1 if changed or added or removed else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
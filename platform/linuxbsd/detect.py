@@ -1,10 +1,11 @@
 import os
 import platform
+import shutil
 import sys
 from typing import TYPE_CHECKING
 
 from methods import get_compiler_version, print_error, print_info, print_warning, using_gcc
-from platform_methods import detect_arch, validate_arch
+from platform_methods import PkgConfig, detect_arch, validate_arch
 
 if TYPE_CHECKING:
     from SCons.Script.SConscript import SConsEnvironment
@@ -18,8 +19,7 @@ def can_build():
     if os.name != "posix" or sys.platform == "darwin":
         return False
 
-    pkgconf_error = os.system("pkg-config --version > /dev/null")
-    if pkgconf_error:
+    if not shutil.which("pkg-config"):
         print_error("pkg-config not found. Aborting.")
         return False
 
@@ -71,6 +71,55 @@ def get_flags():
     }
 
 
+def get_pkg_config_probes(env: "SConsEnvironment"):
+    """Returns the packages which `configure` looks for with `pkg-config`, so that they can be probed concurrently."""
+    probes = []
+    builtin_libraries = {
+        "builtin_freetype": ["freetype2"],
+        "builtin_graphite": ["graphite2"],
+        "builtin_icu4c": ["icu-i18n icu-uc"],
+        "builtin_harfbuzz": ["harfbuzz harfbuzz-icu"],
+        "builtin_libpng": ["libpng16"],
+        "builtin_enet": ["libenet"],
+        "builtin_zstd": ["libzstd"],
+        "builtin_brotli": ["libbrotlicommon libbrotlidec"] if env["brotli"] else [],
+        "builtin_libtheora": ["theora theoradec", "vorbis vorbisfile", "ogg"],
+        "builtin_libvorbis": ["vorbis vorbisfile", "ogg"],
+        "builtin_libogg": ["ogg"],
+        "builtin_libwebp": ["libwebp"],
+        "builtin_mbedtls": ["mbedtls", "mbedtls mbedcrypto mbedx509"],
+        "builtin_wslay": ["libwslay"],
+        "builtin_miniupnpc": ["miniupnpc"],
+        "builtin_pcre2": ["libpcre2-32"],
+        "builtin_openxr": ["openxr"],
+        "builtin_zlib": ["zlib"],
+    }
+    for option, packages in builtin_libraries.items():
+        if not env[option]:
+            probes += packages
+
+    if not env["use_sowrap"]:
+        system_libraries = {
+            "fontconfig": ["fontconfig"],
+            "alsa": ["alsa"],
+            "pulseaudio": ["libpulse"],
+            "dbus": ["dbus-1"],
+            "speechd": ["speech-dispatcher"],
+            "udev": ["libudev"],
+            "x11": ["x11", "xcursor", "xinerama", "xext", "xrandr", "xrender", "xi"],
+            "wayland": ["libdecor-0", "wayland-client", "wayland-cursor", "wayland-egl"],
+        }
+        probes.append("xkbcommon")
+        for option, packages in system_libraries.items():
+            if env[option]:
+                probes += packages
+
+    if env["vulkan"] and not env["use_volk"]:
+        probes.append("vulkan")
+
+    return list(dict.fromkeys(probes))
+
+
 def configure(env: "SConsEnvironment"):
     # Validate arch.
     supported_arches = ["x86_32", "x86_64", "arm32", "arm64", "rv64", "ppc32", "ppc64", "loongarch64"]
@@ -220,19 +269,23 @@ def configure(env: "SConsEnvironment"):
     if env["touch"]:
         env.Append(CPPDEFINES=["TOUCH_ENABLED"])
 
+    # Probes of system libraries are cached (see `PkgConfig`), the missing ones run concurrently first.
+    pkg_config = PkgConfig(env)
+    pkg_config.prefetch(get_pkg_config_probes(env))
+
     # FIXME: Check for existence of the libs before parsing their flags with pkg-config
 
     if not env["builtin_freetype"]:
-        env.ParseConfig("pkg-config freetype2 --cflags --libs")
+        pkg_config.parse_config(env, "freetype2")
 
     if not env["builtin_graphite"]:
-        env.ParseConfig("pkg-config graphite2 --cflags --libs")
+        pkg_config.parse_config(env, "graphite2")
 
     if not env["builtin_icu4c"]:
-        env.ParseConfig("pkg-config icu-i18n icu-uc --cflags --libs")
+        pkg_config.parse_config(env, "icu-i18n icu-uc")
 
     if not env["builtin_harfbuzz"]:
-        env.ParseConfig("pkg-config harfbuzz harfbuzz-icu --cflags --libs")
+        pkg_config.parse_config(env, "harfbuzz harfbuzz-icu")
 
     if not env["builtin_icu4c"] or not env["builtin_harfbuzz"]:
         print_warning(
@@ -240,16 +293,16 @@ def configure(env: "SConsEnvironment"):
         )
 
     if not env["builtin_libpng"]:
-        env.ParseConfig("pkg-config libpng16 --cflags --libs")
+        pkg_config.parse_config(env, "libpng16")
 
     if not env["builtin_enet"]:
-        env.ParseConfig("pkg-config libenet --cflags --libs")
+        pkg_config.parse_config(env, "libenet")
 
     if not env["builtin_zstd"]:
-        env.ParseConfig("pkg-config libzstd --cflags --libs")
+        pkg_config.parse_config(env, "libzstd")
 
     if env["brotli"] and not env["builtin_brotli"]:
-        env.ParseConfig("pkg-config libbrotlicommon libbrotlidec --cflags --libs")
+        pkg_config.parse_config(env, "libbrotlicommon libbrotlidec")
 
     # Sound and video libraries
     # Keep the order as it triggers chained dependencies (ogg needed by others, etc.)
@@ -257,39 +310,39 @@ def configure(env: "SConsEnvironment"):
     if not env["builtin_libtheora"]:
         env["builtin_libogg"] = False  # Needed to link against system libtheora
         env["builtin_libvorbis"] = False  # Needed to link against system libtheora
-        env.ParseConfig("pkg-config theora theoradec --cflags --libs")
+        pkg_config.parse_config(env, "theora theoradec")
     else:
         if env["arch"] in ["x86_64", "x86_32"]:
             env["x86_libtheora_opt_gcc"] = True
 
     if not env["builtin_libvorbis"]:
         env["builtin_libogg"] = False  # Needed to link against system libvorbis
-        env.ParseConfig("pkg-config vorbis vorbisfile --cflags --libs")
+        pkg_config.parse_config(env, "vorbis vorbisfile")
 
     if not env["builtin_libogg"]:
-        env.ParseConfig("pkg-config ogg --cflags --libs")
+        pkg_config.parse_config(env, "ogg")
 
     if not env["builtin_libwebp"]:
-        env.ParseConfig("pkg-config libwebp --cflags --libs")
+        pkg_config.parse_config(env, "libwebp")
 
     if not env["builtin_mbedtls"]:
         # mbedTLS only provides a pkgconfig file since 3.6.0, but we still support 2.28.x,
         # so fallback to manually specifying LIBS if it fails.
-        if os.system("pkg-config --exists mbedtls") == 0:  # 0 means found
-            env.ParseConfig("pkg-config mbedtls mbedcrypto mbedx509 --cflags --libs")
+        if pkg_config.exists("mbedtls"):
+            pkg_config.parse_config(env, "mbedtls mbedcrypto mbedx509")
         else:
             env.Append(LIBS=["mbedtls", "mbedcrypto", "mbedx509"])
 
     if not env["builtin_wslay"]:
-        env.ParseConfig("pkg-config libwslay --cflags --libs")
+        pkg_config.parse_config(env, "libwslay")
 
     if not env["builtin_miniupnpc"]:
-        env.ParseConfig("pkg-config miniupnpc --cflags --libs")
+        pkg_config.parse_config(env, "miniupnpc")
 
     # On Linux wchar_t should be 32-bits
     # 16-bit library shouldn't be required due to compiler optimizations
     if not env["builtin_pcre2"]:
-        env.ParseConfig("pkg-config libpcre2-32 --cflags --libs")
+        pkg_config.parse_config(env, "libpcre2-32")
 
     if not env["builtin_recastnavigation"]:
         # No pkgconfig file so far, hardcode default paths.
@@ -301,12 +354,12 @@ def configure(env: "SConsEnvironment"):
         env.Append(LIBS=["embree4"])
 
     if not env["builtin_openxr"]:
-        env.ParseConfig("pkg-config openxr --cflags --libs")
+        pkg_config.parse_config(env, "openxr")
 
     if env["fontconfig"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists fontconfig") == 0:  # 0 means found
-                env.ParseConfig("pkg-config fontconfig --cflags --libs")
+            if pkg_config.exists("fontconfig"):
+                pkg_config.parse_config(env, "fontconfig")
                 env.Append(CPPDEFINES=["FONTCONFIG_ENABLED"])
             else:
                 print_warning("fontconfig development libraries not found. Disabling the system fonts support.")
@@ -316,8 +369,8 @@ def configure(env: "SConsEnvironment"):
 
     if env["alsa"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists alsa") == 0:  # 0 means found
-                env.ParseConfig("pkg-config alsa --cflags --libs")
+            if pkg_config.exists("alsa"):
+                pkg_config.parse_config(env, "alsa")
                 env.Append(CPPDEFINES=["ALSA_ENABLED", "ALSAMIDI_ENABLED"])
             else:
                 print_warning("ALSA development libraries not found. Disabling the ALSA audio driver.")
@@ -327,8 +380,8 @@ def configure(env: "SConsEnvironment"):
 
     if env["pulseaudio"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists libpulse") == 0:  # 0 means found
-                env.ParseConfig("pkg-config libpulse --cflags --libs")
+            if pkg_config.exists("libpulse"):
+                pkg_config.parse_config(env, "libpulse")
                 env.Append(CPPDEFINES=["PULSEAUDIO_ENABLED"])
             else:
                 print_warning("PulseAudio development libraries not found. Disabling the PulseAudio audio driver.")
@@ -338,8 +391,8 @@ def configure(env: "SConsEnvironment"):
 
     if env["dbus"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists dbus-1") == 0:  # 0 means found
-                env.ParseConfig("pkg-config dbus-1 --cflags --libs")
+            if pkg_config.exists("dbus-1"):
+                pkg_config.parse_config(env, "dbus-1")
                 env.Append(CPPDEFINES=["DBUS_ENABLED"])
             else:
                 print_warning("D-Bus development libraries not found. Disabling screensaver prevention.")
@@ -349,8 +402,8 @@ def configure(env: "SConsEnvironment"):
 
     if env["speechd"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists speech-dispatcher") == 0:  # 0 means found
-                env.ParseConfig("pkg-config speech-dispatcher --cflags --libs")
+            if pkg_config.exists("speech-dispatcher"):
+                pkg_config.parse_config(env, "speech-dispatcher")
                 env.Append(CPPDEFINES=["SPEECHD_ENABLED"])
             else:
                 print_warning("speech-dispatcher development libraries not found. Disabling text to speech support.")
@@ -359,8 +412,8 @@ def configure(env: "SConsEnvironment"):
             env.Append(CPPDEFINES=["SPEECHD_ENABLED"])
 
     if not env["use_sowrap"]:
-        if os.system("pkg-config --exists xkbcommon") == 0:  # 0 means found
-            env.ParseConfig("pkg-config xkbcommon --cflags --libs")
+        if pkg_config.exists("xkbcommon"):
+            pkg_config.parse_config(env, "xkbcommon")
             env.Append(CPPDEFINES=["XKB_ENABLED"])
         else:
             if env["wayland"]:
@@ -377,8 +430,8 @@ def configure(env: "SConsEnvironment"):
         env.Append(CPPDEFINES=["JOYDEV_ENABLED"])
         if env["udev"]:
             if not env["use_sowrap"]:
-                if os.system("pkg-config --exists libudev") == 0:  # 0 means found
-                    env.ParseConfig("pkg-config libudev --cflags --libs")
+                if pkg_config.exists("libudev"):
+                    pkg_config.parse_config(env, "libudev")
                     env.Append(CPPDEFINES=["UDEV_ENABLED"])
                 else:
                     print_warning("libudev development libraries not found. Disabling controller hotplugging support.")
@@ -390,7 +443,7 @@ def configure(env: "SConsEnvironment"):
 
     # Linkflags below this line should typically stay the last ones
     if not env["builtin_zlib"]:
-        env.ParseConfig("pkg-config zlib --cflags --libs")
+        pkg_config.parse_config(env, "zlib")
 
     env.Prepend(CPPPATH=["#platform/linuxbsd"])
     if env["use_sowrap"]:
@@ -406,55 +459,55 @@ def configure(env: "SConsEnvironment"):
 
     if env["x11"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists x11"):
+            if not pkg_config.exists("x11"):
                 print_error("X11 libraries not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config x11 --cflags --libs")
-            if os.system("pkg-config --exists xcursor"):
+            pkg_config.parse_config(env, "x11")
+            if not pkg_config.exists("xcursor"):
                 print_error("Xcursor library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xcursor --cflags --libs")
-            if os.system("pkg-config --exists xinerama"):
+            pkg_config.parse_config(env, "xcursor")
+            if not pkg_config.exists("xinerama"):
                 print_error("Xinerama library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xinerama --cflags --libs")
-            if os.system("pkg-config --exists xext"):
+            pkg_config.parse_config(env, "xinerama")
+            if not pkg_config.exists("xext"):
                 print_error("Xext library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xext --cflags --libs")
-            if os.system("pkg-config --exists xrandr"):
+            pkg_config.parse_config(env, "xext")
+            if not pkg_config.exists("xrandr"):
                 print_error("XrandR library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xrandr --cflags --libs")
-            if os.system("pkg-config --exists xrender"):
+            pkg_config.parse_config(env, "xrandr")
+            if not pkg_config.exists("xrender"):
                 print_error("XRender library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xrender --cflags --libs")
-            if os.system("pkg-config --exists xi"):
+            pkg_config.parse_config(env, "xrender")
+            if not pkg_config.exists("xi"):
                 print_error("Xi library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config xi --cflags --libs")
+            pkg_config.parse_config(env, "xi")
         env.Append(CPPDEFINES=["X11_ENABLED"])
 
     if env["wayland"]:
         if not env["use_sowrap"]:
-            if os.system("pkg-config --exists libdecor-0"):
+            if not pkg_config.exists("libdecor-0"):
                 print_warning("libdecor development libraries not found. Disabling client-side decorations.")
                 env["libdecor"] = False
             else:
-                env.ParseConfig("pkg-config libdecor-0 --cflags --libs")
-            if os.system("pkg-config --exists wayland-client"):
+                pkg_config.parse_config(env, "libdecor-0")
+            if not pkg_config.exists("wayland-client"):
                 print_error("Wayland client library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config wayland-client --cflags --libs")
-            if os.system("pkg-config --exists wayland-cursor"):
+            pkg_config.parse_config(env, "wayland-client")
+            if not pkg_config.exists("wayland-cursor"):
                 print_error("Wayland cursor library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config wayland-cursor --cflags --libs")
-            if os.system("pkg-config --exists wayland-egl"):
+            pkg_config.parse_config(env, "wayland-cursor")
+            if not pkg_config.exists("wayland-egl"):
                 print_error("Wayland EGL library not found. Aborting.")
                 sys.exit(255)
-            env.ParseConfig("pkg-config wayland-egl --cflags --libs")
+            pkg_config.parse_config(env, "wayland-egl")
         else:
             env.Prepend(CPPPATH=["#thirdparty/linuxbsd_headers/wayland/"])
             if env["libdecor"]:
@@ -469,11 +522,13 @@ def configure(env: "SConsEnvironment"):
     if env["vulkan"]:
         env.Append(CPPDEFINES=["VULKAN_ENABLED", "RD_ENABLED"])
         if not env["use_volk"]:
-            env.ParseConfig("pkg-config vulkan --cflags --libs")
+            pkg_config.parse_config(env, "vulkan")
         if not env["builtin_glslang"]:
             # No pkgconfig file so far, hardcode expected lib name.
             env.Append(LIBS=["glslang", "SPIRV"])
 
+    pkg_config.save()
+
     if env["opengl3"]:
         env.Append(CPPDEFINES=["GLES3_ENABLED"])
 
@@ -1,5 +1,8 @@
+import json
 import os
 import platform
+import re
+import shutil
 import subprocess
 import sys
 
@@ -160,3 +163,159 @@ def detect_mvk(env, osname):
             return mvk_path
 
     return ""
+
+
+# Results of `pkg-config` in previous runs (see `PkgConfig`).
+PKG_CONFIG_CACHE_FILENAME = f"{methods.base_folder_path}.scons_pkg_config.json"
+# Environment variables changing the results of `pkg-config`.
+PKG_CONFIG_VARIABLES = [
+    "PKG_CONFIG_PATH",
+    "PKG_CONFIG_LIBDIR",
+    "PKG_CONFIG_SYSROOT_DIR",
+    "PKG_CONFIG_ALLOW_SYSTEM_CFLAGS",
+    "PKG_CONFIG_ALLOW_SYSTEM_LIBS",
+]
+
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_pc_requires(path):
+    """Returns the packages listed by the `Requires` and `Requires.private` fields of a `.pc` file."""
+    packages = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = re.match(r"\s*Requires(?:\.private)?\s*:(.*)", line)
+                if not match:
+                    continue
+                # Skips version constraints, as in `glib-2.0 >= 2.56, libffi`.
+                tokens = re.findall(r"[<>!=]=?|[^\s,<>!=]+", match.group(1))
+                for i, token in enumerate(tokens):
+                    if token[0] not in "<>!=" and (i == 0 or tokens[i - 1][0] not in "<>!="):
+                        packages.append(token)
+    except OSError:
+        pass
+    return packages
+
+
+class PkgConfig:
+    """
+    Runs `pkg-config` for the libraries found on the system, and caches the results in
+    `PKG_CONFIG_CACHE_FILENAME` so that later runs don't spawn it at all.
+
+    The cache is tied to `pkg-config` itself and the variables configuring it, and each result
+    to the `.pc` files of its packages and of those they require. Results are also dropped when a folder searched for `.pc`
+    files changes, as packages were installed or removed. Missing results can be fetched
+    concurrently beforehand with `prefetch`.
+    """
+
+    def __init__(self, env, cache_path=PKG_CONFIG_CACHE_FILENAME):
+        self.cache_path = cache_path
+        # `pkg-config` runs with the variables of the build environment, and those configuring it in
+        # the user's environment if it doesn't set them, as they were honored when it ran in a shell.
+        self.env_vars = {str(key): str(value) for key, value in env["ENV"].items()}
+        for name in PKG_CONFIG_VARIABLES:
+            if name not in self.env_vars and name in os.environ:
+                self.env_vars[name] = os.environ[name]
+        executable = shutil.which("pkg-config", path=self.env_vars.get("PATH")) or "pkg-config"
+        self.fingerprint = {name: self.env_vars.get(name) for name in PKG_CONFIG_VARIABLES}
+        self.fingerprint["executable"] = [executable, get_mtime(executable)]
+        self.executable = executable
+
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+        if self.cache.get("fingerprint") != self.fingerprint or not all(
+            get_mtime(folder) == mtime for folder, mtime in self.cache["folders"].items()
+        ):
+            folders = self.get_search_folders()
+            self.cache = {
+                "fingerprint": self.fingerprint,
+                "folders": {folder: get_mtime(folder) for folder in folders},
+                "results": {},
+            }
+        self.changed = False
+
+    def get_search_folders(self):
+        folders = []
+        if self.fingerprint["PKG_CONFIG_PATH"]:
+            folders += self.fingerprint["PKG_CONFIG_PATH"].split(os.pathsep)
+        if self.fingerprint["PKG_CONFIG_LIBDIR"]:
+            folders += self.fingerprint["PKG_CONFIG_LIBDIR"].split(os.pathsep)
+        else:
+            result = self.run(["--variable", "pc_path", "pkg-config"])
+            folders += result["output"].strip().split(os.pathsep) if result["returncode"] == 0 else []
+        return [folder for folder in folders if folder]
+
+    def run(self, args):
+        process = subprocess.run([self.executable] + args, env=self.env_vars, capture_output=True, text=True)
+        return {"returncode": process.returncode, "output": process.stdout, "error": process.stderr}
+
+    def find_pc_file(self, package):
+        for folder in self.cache["folders"]:
+            path = os.path.join(folder, package + ".pc")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def probe(self, packages):
+        """Returns the flags of `packages` (separated by spaces), as reported by `pkg-config --cflags --libs`."""
+        result = self.run(packages.split() + ["--cflags", "--libs"])
+        # The flags also come from the packages they require, directly or not.
+        pc_files = {}
+        pending = packages.split()
+        while pending:
+            path = self.find_pc_file(pending.pop())
+            if path and path not in pc_files:
+                pc_files[path] = get_mtime(path)
+                pending += get_pc_requires(path)
+        result["pc_files"] = pc_files
+        return result
+
+    def get_result(self, packages):
+        result = self.cache["results"].get(packages)
+        if result is None or not all(get_mtime(path) == mtime for path, mtime in result["pc_files"].items()):
+            result = self.probe(packages)
+            self.cache["results"][packages] = result
+            self.changed = True
+        return result
+
+    def prefetch(self, packages_list):
+        """Fetches the results missing from the cache for each of `packages_list` concurrently."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        missing = [packages for packages in packages_list if packages not in self.cache["results"]]
+        if not missing:
+            return
+        with ThreadPoolExecutor() as executor:
+            for packages, result in zip(missing, executor.map(self.probe, missing)):
+                self.cache["results"][packages] = result
+        self.changed = True
+
+    def exists(self, packages):
+        """Same as `pkg-config --exists packages`."""
+        return self.get_result(packages)["returncode"] == 0
+
+    def parse_config(self, env, packages):
+        """Same as `env.ParseConfig("pkg-config packages --cflags --libs")`."""
+        result = self.get_result(packages)
+        if result["returncode"] != 0:
+            sys.stderr.write(result["error"])
+            raise OSError(f"'pkg-config {packages} --cflags --libs' exited {result['returncode']}")
+        env.MergeFlags(result["output"])
+
+    def save(self):
+        if self.changed:
+            try:
+                with open(self.cache_path, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(json.dumps(self.cache, indent=1) + "\n")
+            except OSError:
+                pass
+            self.changed = False
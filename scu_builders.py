@@ -1,17 +1,153 @@
 """Functions used to generate scu build source files during build time"""
 
 import glob
+import hashlib
+import json
 import math
 import os
+import re
+import subprocess
+import time
 from pathlib import Path
 
-from methods import print_error
+from methods import print_error, print_warning
 
 base_folder_path = str(Path(__file__).parent) + "/"
 base_folder_only = os.path.basename(os.path.normpath(base_folder_path))
 _verbose = False  # Set manually for debug prints
 _scu_folders = set()
 _max_includes_per_scu = 1024
+# Measured compile time of sources (relative to the root folder), in seconds.
+_compile_times = {}
+# Size and resolved `#include "..."` of each file read to estimate compile costs.
+_file_info_cache = {}
+_included_files_cache = {}
+_include_regex = re.compile(r'#[ \t]*include[ \t]*"([^"]+)"')
+# Sources (relative to the root folder) built in their own SCU files, or the maximum age
+# in seconds of such sources, see `set_hot_files`.
+_hot_files = set()
+_hot_file_age = 0
+# Whether sources colliding with others are found and built on their own, see `find_colliding_sources`.
+_detect_collisions = False
+# Comments and literals, which are skipped when looking for collisions between sources.
+_comment_or_literal_regex = re.compile(
+    r'R"([^(\s]*)\(.*?\)\1"|//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.DOTALL
+)
+_directive_regex = re.compile(r"^[ \t]*#[ \t]*(\w+)(.*(?:\\\n.*)*)", re.MULTILINE)
+_token_regex = re.compile(r"[A-Za-z_]\w*|::|[{}();=\[<>]")
+# Macros defined by each header, see `get_header_macros`.
+_header_macros_cache = {}
+# Finds the sources which a SCsub adds with a glob, see `find_scu_folders`.
+_source_glob_regex = re.compile(r'\.add_source_files\(\s*[^,()]+,\s*f?"([^"]*\*\.cpp)"\s*\)')
+# Folders which never hold sources of the engine.
+_skipped_folders = {"bin", "scu", "thirdparty"}
+# Folders which SCsub files glob, but which can't be built as SCU files.
+_excluded_folders = {
+    "modules/openxr/extensions",  # Sensitive include order for platform code.
+}
+# Exceptions which can't be found by `find_collisions`, by folder.
+_known_exceptions = {
+    "core/variant": ["variant_utility"],
+    "editor": ["file_system_dock", "editor_resource_preview"],
+    "modules/openxr": ["register_types"],
+}
+# Folders which are known to build as SCU files. Others are only used with `discover_folders`,
+# as `find_collisions` can't catch every issue, and they haven't all been compiled as SCU files.
+_verified_folders = [
+    "core",
+    "core/crypto",
+    "core/debugger",
+    "core/extension",
+    "core/input",
+    "core/io",
+    "core/math",
+    "core/object",
+    "core/os",
+    "core/string",
+    "core/variant",
+    "drivers/unix",
+    "drivers/png",
+    "drivers/gles3/effects",
+    "drivers/gles3/storage",
+    "editor",
+    "editor/debugger",
+    "editor/debugger/debug_adapter",
+    "editor/export",
+    "editor/gui",
+    "editor/themes",
+    "editor/project_manager",
+    "editor/import",
+    "editor/import/3d",
+    "editor/plugins",
+    "editor/plugins/gizmos",
+    "editor/plugins/tiles",
+    "platform/android/export",
+    "platform/ios/export",
+    "platform/linuxbsd/export",
+    "platform/macos/export",
+    "platform/web/export",
+    "platform/windows/export",
+    "modules/lightmapper_rd",
+    "modules/gltf",
+    "modules/gltf/structures",
+    "modules/gltf/editor",
+    "modules/gltf/extensions",
+    "modules/gltf/extensions/physics",
+    "modules/navigation",
+    "modules/navigation/2d",
+    "modules/navigation/3d",
+    "modules/webrtc",
+    "modules/websocket",
+    "modules/gridmap",
+    "modules/multiplayer",
+    "modules/multiplayer/editor",
+    "modules/openxr",
+    "modules/openxr/action_map",
+    "modules/openxr/editor",
+    "modules/openxr/scene",
+    "modules/godot_physics_2d",
+    "modules/godot_physics_3d",
+    "modules/godot_physics_3d/joints",
+    "modules/csg",
+    "modules/gdscript",
+    "modules/gdscript/editor",
+    "modules/gdscript/language_server",
+    "scene/2d",
+    "scene/2d/physics",
+    "scene/2d/physics/joints",
+    "scene/3d",
+    "scene/3d/physics",
+    "scene/3d/physics/joints",
+    "scene/animation",
+    "scene/gui",
+    "scene/main",
+    "scene/theme",
+    "scene/resources",
+    "scene/resources/2d",
+    "scene/resources/2d/skeleton",
+    "scene/resources/3d",
+    "servers",
+    "servers/rendering",
+    "servers/rendering/dummy/storage",
+    "servers/rendering/storage",
+    "servers/rendering/renderer_rd",
+    "servers/rendering/renderer_rd/effects",
+    "servers/rendering/renderer_rd/environment",
+    "servers/rendering/renderer_rd/storage_rd",
+    "servers/rendering/renderer_rd/forward_clustered",
+    "servers/rendering/renderer_rd/forward_mobile",
+    "servers/audio",
+    "servers/audio/effects",
+    "servers/navigation",
+    "servers/xr",
+]
+# Maximum number of includes in each SCU file of some folders, lower than `scu_limit`.
+_folder_includes_per_scu = {
+    "editor": 32,
+}
+# Tolerance of the cost of SCU files (relative to the average) when splitting sources between
+# them, see `partition_sources`. It leaves room to pick stable boundaries.
+_cost_tolerance = 0.15
 
 
 def clear_out_stale_files(output_folder, extension, fresh_files):
@@ -64,6 +200,446 @@ def find_files_in_folder(folder, sub_folder, include_list, extension, sought_exc
     return include_list, found_exceptions
 
 
+def get_file_info(path):
+    info = _file_info_cache.get(path)
+    if info is None:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            info = (0, [])
+        else:
+            folder = os.path.dirname(path)
+            includes = []
+            for include in _include_regex.findall(text):
+                # Relative to the including file first, then to the root folder, as the compiler does.
+                for candidate in (os.path.join(folder, include), base_folder_path + include):
+                    if os.path.isfile(candidate):
+                        includes.append(os.path.normpath(candidate))
+                        break
+            info = (len(text), includes)
+        _file_info_cache[path] = info
+    return info
+
+
+def find_included_files(path):
+    """Returns the project headers included by a file, directly or not."""
+    found = _included_files_cache.get(path)
+    if found is None:
+        pending = list(get_file_info(path)[1])
+        found = set()
+        while pending:
+            header = pending.pop()
+            if header not in found:
+                found.add(header)
+                pending += get_file_info(header)[1]
+        _included_files_cache[path] = found
+    return found
+
+
+def estimate_compile_costs(sources):
+    """
+    Estimates the cost of compiling each source in an SCU file from its size, plus the size of the
+    headers it includes. Headers are only parsed once per SCU file, so the size of each of them is
+    shared between the sources which include it: the sources with heavy includes of their own
+    weigh more than those which only include what the whole folder does.
+    """
+    included_files = {source: find_included_files(base_folder_path + source) for source in sources}
+    users = {}
+    for headers in included_files.values():
+        for header in headers:
+            users[header] = users.get(header, 0) + 1
+
+    return {
+        source: get_file_info(base_folder_path + source)[0]
+        + sum(get_file_info(header)[0] / users[header] for header in included_files[source])
+        for source in sources
+    }
+
+
+def get_compile_costs(sources):
+    """
+    Returns the cost of compiling each source (relative to the root folder). Measured compile times
+    are used when available, and the estimates of the other sources are scaled to the same unit.
+    """
+    estimates = estimate_compile_costs(sources)
+    measured = [source for source in sources if source in _compile_times]
+    if not measured:
+        return estimates
+
+    estimated_total = sum(estimates[source] for source in measured)
+    scale = sum(_compile_times[source] for source in measured) / estimated_total if estimated_total else 0
+    return {source: _compile_times.get(source, estimates[source] * scale) for source in sources}
+
+
+def load_compile_times(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {source.replace("\\", "/"): float(seconds) for source, seconds in json.load(f).items()}
+    except (OSError, ValueError, AttributeError) as e:
+        print_error(f'SCU: Could not read compile times from "{path}": {e}')
+        return {}
+
+
+def get_stable_hash(name):
+    return int.from_bytes(hashlib.md5(name.encode("utf-8")).digest()[:8], "little")
+
+
+def partition_sources(sources, costs, num_output_files, max_per_file):
+    """
+    Splits the sorted `sources` in contiguous ranges of similar cost, with at most `max_per_file`
+    sources each, and returns the `(start, end)` index of each range.
+
+    Sources are split in two recursively, each half getting its share of the SCU files, rather
+    than filled in order, which would move every boundary after a new source. Each split is made
+    at the source with the lowest hash of its path among those within `_cost_tolerance` of the
+    ideal split, and leaving both halves few enough sources for their SCU files. Adding or
+    removing a source thus rarely moves a boundary, and mostly only changes the SCU file it is in
+    (and its object), unless another SCU file is needed. The more room `max_per_file` leaves,
+    the less likely boundaries are to move. Hot files don't change the partition at all, as
+    `process_folder` only leaves them out of their SCU file afterwards.
+    """
+    if not sources:
+        return []
+    num_output_files = min(max(num_output_files, math.ceil(len(sources) / max_per_file), 1), len(sources))
+    # Cost of the sources before each index.
+    offsets = [0]
+    for source in sources:
+        offsets.append(offsets[-1] + costs[source])
+    tolerance = offsets[-1] / num_output_files * _cost_tolerance
+
+    ranges = []
+
+    def split(start, end, num_files):
+        if num_files == 1:
+            ranges.append((start, end))
+            return
+        left_files = num_files // 2
+        right_files = num_files - left_files
+        lowest = max(start + left_files, end - right_files * max_per_file)
+        highest = min(end - right_files, start + left_files * max_per_file)
+        ideal = offsets[start] + (offsets[end] - offsets[start]) * left_files / num_files
+        candidates = [index for index in range(lowest, highest + 1) if abs(offsets[index] - ideal) <= tolerance]
+        if not candidates:
+            # Heavy sources, the closest split is as good as it gets.
+            candidates = [min(range(lowest, highest + 1), key=lambda index: abs(offsets[index] - ideal))]
+        middle = min(candidates, key=lambda index: get_stable_hash(sources[index]))
+        split(start, middle, left_files)
+        split(middle, end, right_files)
+
+    split(0, len(sources), num_output_files)
+    return ranges
+
+
+def find_git_modified_files():
+    """Returns the files (relative to the root folder) with uncommitted changes, including new ones."""
+    # Both commands list paths relative to the working directory.
+    commands = [
+        ["git", "diff", "--name-only", "--relative", "HEAD"],
+        ["git", "ls-files", "--others", "--exclude-standard"],
+    ]
+    files = set()
+    for command in commands:
+        try:
+            output = subprocess.run(command, cwd=base_folder_path, capture_output=True, text=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            print_warning(f"SCU: Could not list modified files with git ({e}), not isolating any.")
+            return set()
+        files.update(line.strip() for line in output.splitlines() if line.strip())
+    return files
+
+
+def set_hot_files(mode):
+    """
+    Sets which sources are being worked on, and are thus likely to be rebuilt again soon: those with
+    uncommitted changes if `mode` is "git", or else those modified in the last `mode` hours.
+    """
+    global _hot_files, _hot_file_age
+    _hot_files = set()
+    _hot_file_age = 0
+    if not mode:
+        return
+    if mode == "git":
+        _hot_files = find_git_modified_files()
+        return
+    try:
+        _hot_file_age = float(mode) * 3600
+    except ValueError:
+        print_error(f'SCU: Invalid value "{mode}" for hot files, expected "git" or a number of hours.')
+
+
+def is_hot_file(source):
+    if _hot_file_age > 0:
+        return time.time() - os.path.getmtime(base_folder_path + source) < _hot_file_age
+    return source in _hot_files
+
+
+class SourceSymbols:
+    """Names which a source file defines for the rest of its SCU file, and names it uses."""
+
+    def __init__(self):
+        # Functions, variables and types with internal linkage, defined in the source itself.
+        self.internal = set()
+        # Definitions of the macros defined by the source (still defined at its end, or not).
+        self.macros = {}
+        self.leaked_macros = set()
+        # Macros defined before including headers, which may change what they declare.
+        self.configuration_macros = set()
+        # Definitions of the macros defined by the project headers which the source includes
+        # (those of the last header, if several define the same macro).
+        self.header_macros = {}
+        # Every identifier in the source.
+        self.identifiers = set()
+
+
+def _find_macros(text):
+    """Returns the definitions of each macro of a preprocessed text, and whether each is still defined at its end."""
+    macros = {}
+    defined = {}
+    for directive, arguments in _directive_regex.findall(text):
+        name = re.match(r"\s*(\w*)", arguments).group(1)
+        if directive == "define" and name:
+            macros.setdefault(name, set()).add(" ".join(arguments.split()))
+            defined[name] = True
+        elif directive == "undef":
+            defined[name] = False
+    return macros, {name for name, value in defined.items() if value}
+
+
+def get_header_macros(path):
+    macros = _header_macros_cache.get(path)
+    if macros is None:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = _comment_or_literal_regex.sub("", f.read())
+        except OSError:
+            text = ""
+        macros, _ = _find_macros(text)
+        guards = {
+            re.match(r"\s*(\w*)", arguments).group(1)
+            for directive, arguments in _directive_regex.findall(text)
+            if directive == "ifndef"
+        }
+        macros = {name: definitions for name, definitions in macros.items() if name not in guards}
+        _header_macros_cache[path] = macros
+    return macros
+
+
+def _get_declared_name(declaration, has_body, anonymous):
+    """Returns the name of a file scope declaration, if it has internal linkage (or is a type definition)."""
+    if declaration[0] == "template":
+        # Skip the template parameters.
+        depth = 0
+        for index, token in enumerate(declaration):
+            depth += {"<": 1, ">": -1}.get(token, 0)
+            if token == ">" and depth == 0:
+                rest = declaration[index + 1 :]
+                return _get_declared_name(rest, has_body, anonymous) if rest else None
+        return None
+    if declaration[0] in ("struct", "class", "union", "enum"):
+        names = [token for token in declaration[1:] if token not in ("class", "struct") and token[0].isalpha()]
+        return names[0] if has_body and names else None
+    if declaration[0] == "typedef":
+        return declaration[-1] if declaration[-1][0].isalpha() else None
+    if declaration[0] == "using":
+        return declaration[1] if len(declaration) > 2 and declaration[2] == "=" else None
+    if declaration[0] in ("friend", "extern"):
+        return None
+
+    head = []
+    for token in declaration:
+        if token in ("(", "=", "["):
+            break
+        head.append(token)
+    # Qualified names define members declared elsewhere, and single names are macro calls.
+    if "::" in head or len(head) < 2 or head[-1] == "operator" or not head[-1][0].isalpha():
+        return None
+    is_variable = len(head) == len(declaration) or declaration[len(head)] != "("
+    if anonymous or "static" in head or (is_variable and ("const" in head or "constexpr" in head)):
+        return head[-1]
+    return None
+
+
+def find_internal_symbols(text):
+    """Returns the names with internal linkage defined at file scope by a preprocessed source, see `SourceSymbols`."""
+    symbols = set()
+    # Whether each namespace (or `extern "C"` block) we are in is anonymous.
+    namespaces = []
+    body_depth = 0
+    start = 0
+    continued = False
+
+    for match in re.finditer(r"[{};]", text):
+        character = match.group()
+        if body_depth > 0:
+            # Only look for the end of function, type or initializer bodies.
+            body_depth += {"{": 1, "}": -1}.get(character, 0)
+            if body_depth == 0:
+                start = match.end()
+            continue
+
+        declaration = _token_regex.findall(text[start : match.start()])
+        start = match.end()
+        if character == "}":
+            if namespaces:
+                namespaces.pop()
+            continued = False
+        elif character == "{" and declaration and declaration[0] in ("namespace", "inline", "extern"):
+            namespaces.append(declaration[-1] == "namespace")
+            continued = False
+        else:
+            if declaration and not continued:
+                name = _get_declared_name(declaration, character == "{", any(namespaces))
+                if name:
+                    symbols.add(name)
+            if character == "{":
+                body_depth = 1
+                # Types and initializers end with a semicolon, which is not a new declaration.
+                continued = "=" in declaration or declaration[:1] in (
+                    ["struct"],
+                    ["class"],
+                    ["union"],
+                    ["enum"],
+                    ["typedef"],
+                )
+            else:
+                continued = False
+
+    return symbols
+
+
+def find_source_symbols(path):
+    symbols = SourceSymbols()
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return symbols
+    text = _comment_or_literal_regex.sub(lambda match: "\n" * match.group().count("\n"), text)
+    symbols.identifiers = set(re.findall(r"[A-Za-z_]\w*", text))
+    symbols.macros, symbols.leaked_macros = _find_macros(text)
+
+    first_include = re.search(r"^[ \t]*#[ \t]*include", text, re.MULTILINE)
+    symbols.configuration_macros = set(_find_macros(text[: first_include.start()])[0]) if first_include else set()
+
+    for header in find_included_files(path):
+        symbols.header_macros.update(get_header_macros(header))
+
+    symbols.internal = find_internal_symbols(_directive_regex.sub("", text))
+    return symbols
+
+
+def _find_macro_collisions(source, other):
+    """Returns the macros defined after `source` which may change the meaning of `other`."""
+    visible = source.leaked_macros | (source.header_macros.keys() - other.header_macros.keys())
+    collisions = set()
+    for name in visible & other.identifiers:
+        definitions = source.macros.get(name) or source.header_macros.get(name)
+        # Defining a macro again the same way is harmless.
+        if definitions != (other.macros.get(name) or other.header_macros.get(name)):
+            collisions.add(name)
+    return collisions
+
+
+def find_collisions(sources):
+    """
+    Returns the reasons why sources (relative to the root folder) can't be built in the same SCU
+    file: for each source which defines a macro before including headers (which may change what
+    the headers declare for the next sources), `{(source, None): macros}`, and for each pair of
+    sources which define the same names with internal linkage, or a macro (or include a header
+    defining a macro) used differently by the other, `{(source, other): names}`.
+    """
+    symbols = {source: find_source_symbols(base_folder_path + source) for source in sources}
+    collisions = {}
+    for source in sources:
+        if symbols[source].configuration_macros:
+            collisions[(source, None)] = symbols[source].configuration_macros
+            continue
+        for other in sources:
+            if other <= source or symbols[other].configuration_macros:
+                continue
+            a, b = symbols[source], symbols[other]
+            names = (a.internal & b.internal) | _find_macro_collisions(a, b) | _find_macro_collisions(b, a)
+            if names:
+                collisions[(source, other)] = names
+    return collisions
+
+
+def find_colliding_sources(sources):
+    """Returns the sources to build on their own so that the others don't collide, see `find_collisions`."""
+    exceptions = set()
+    colliding = {source: set() for source in sources}
+    for source, other in find_collisions(sources):
+        if other is None:
+            exceptions.add(source)
+        else:
+            colliding[source].add(other)
+            colliding[other].add(source)
+
+    # Isolate the sources with the most collisions first, until there are none left.
+    while any(colliding.values()):
+        source = max(sorted(colliding), key=lambda source: len(colliding[source]))
+        exceptions.add(source)
+        for other in colliding.pop(source):
+            colliding[other].discard(source)
+
+    return exceptions
+
+
+def find_colliding_sources_cached(sources, output_folder):
+    """
+    Returns `find_colliding_sources(sources)`, which is cached in the SCU folder until one of the
+    sources, or a macro of the headers they include, changes.
+    """
+    digest = hashlib.sha256()
+    headers = set()
+    for source in sources:
+        stat = os.stat(base_folder_path + source)
+        digest.update(f"{source}:{stat.st_mtime_ns}:{stat.st_size}\n".encode("utf-8"))
+        headers |= find_included_files(base_folder_path + source)
+    for header in sorted(headers):
+        macros = get_header_macros(header)
+        digest.update(f"{header}:{sorted((name, sorted(macros[name])) for name in macros)}\n".encode("utf-8"))
+    key = digest.hexdigest()
+
+    cache_path = os.path.join(output_folder, "scu_collisions.json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["key"] == key:
+            return set(cache["exceptions"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    exceptions = find_colliding_sources(sources)
+    os.makedirs(output_folder, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8", newline="\n") as f:
+        json.dump({"key": key, "exceptions": sorted(exceptions)}, f, indent=4)
+    return exceptions
+
+
+def find_scu_folders():
+    """
+    Returns the folders (relative to the root folder) which a SCsub adds all the C++ sources of,
+    with a glob such as `env.add_source_files(env.scene_sources, "*.cpp")`, as only those can be
+    replaced by SCU files (see `methods.add_source_files_scu`).
+    """
+    folders = set()
+    for current, dirs, files in os.walk(base_folder_path):
+        dirs[:] = sorted(folder for folder in dirs if not folder.startswith(".") and folder not in _skipped_folders)
+        if "SCsub" not in files:
+            continue
+        with open(os.path.join(current, "SCsub"), "r", encoding="utf-8") as f:
+            patterns = _source_glob_regex.findall(f.read())
+        for pattern in patterns:
+            # Formatted parts, as in `f"../platform/{platform}/export/*.cpp"`, may match any folder.
+            folder_pattern = re.sub(r"\{[^}]*\}", "*", os.path.dirname(pattern))
+            for folder in glob.glob(os.path.join(current, folder_pattern)) if folder_pattern else [current]:
+                if os.path.isdir(folder):
+                    folders.add(os.path.relpath(os.path.normpath(folder), base_folder_path).replace("\\", "/"))
+    return sorted(folders - _excluded_folders)
+
+
 def write_output_file(file_count, include_list, start_line, end_line, output_folder, output_filename_prefix, extension):
     output_folder = os.path.abspath(output_folder)
 
@@ -102,7 +678,7 @@ def write_output_file(file_count, include_list, start_line, end_line, output_fol
     return output_path
 
 
-def write_exception_output_file(file_count, exception_string, output_folder, output_filename_prefix, extension):
+def write_exception_output_file(exception_string, output_folder, output_filename_prefix, extension):
     output_folder = os.path.abspath(output_folder)
     if not os.path.isdir(output_folder):
         print_error(f"SCU: {output_folder} does not exist.")
@@ -110,11 +686,12 @@ def write_exception_output_file(file_count, exception_string, output_folder, out
 
     file_text = exception_string + "\n"
 
-    num_string = ""
-    if file_count > 0:
-        num_string = "_" + str(file_count)
+    # Named after the source rather than numbered, so adding or removing an exception
+    # (such as a hot file) doesn't rename the others, which would rebuild them.
+    source = exception_string[len('#include "') : -1]
+    stem = os.path.splitext(os.path.basename(source))[0]
 
-    short_filename = output_filename_prefix + "_exception" + num_string + ".gen." + extension
+    short_filename = output_filename_prefix + "_" + stem + ".gen." + extension
     output_filename = output_folder + "/" + short_filename
 
     output_path = Path(output_filename)
@@ -203,6 +780,33 @@ def process_folder(folders, sought_exceptions=[], includes_per_scu=0, extension=
 
     found_includes = sorted(found_includes)
 
+    # These do not vary throughout the loop
+    output_folder = abs_main_folder + "/scu/"
+    output_filename_prefix = "scu_" + out_filename
+
+    # Sources which define the same names as others (or macros changing them) are built on their own.
+    # This parses all the sources, so it is only done on demand.
+    colliding = set()
+    if _detect_collisions:
+        colliding = find_colliding_sources_cached(
+            [include[len('#include "') : -1] for include in found_includes], output_folder
+        )
+    if colliding:
+        colliding_includes = [include for include in found_includes if include[len('#include "') : -1] in colliding]
+        found_includes = [include for include in found_includes if include not in colliding_includes]
+        found_exceptions += colliding_includes
+        if _verbose:
+            print("SCU: Found collisions, building separately: %s" % ", ".join(colliding_includes))
+
+    # Sources being worked on are built on their own like exceptions, so rebuilding them after
+    # an edit doesn't rebuild the other sources of their SCU file. They are only left out of their
+    # SCU file once sources are partitioned, so that toggling one doesn't move any boundary.
+    hot_includes = [include for include in found_includes if is_hot_file(include[len('#include "') : -1])]
+    if hot_includes:
+        found_exceptions += hot_includes
+        if _verbose:
+            print("SCU: Building separately: %s" % ", ".join(hot_includes))
+
     # calculate how many lines to write in each file
     total_lines = len(found_includes)
 
@@ -217,38 +821,28 @@ def process_folder(folders, sought_exceptions=[], includes_per_scu=0, extension=
 
     num_output_files = max(math.ceil(total_lines / float(includes_per_scu)), 1)
 
-    lines_per_file = math.ceil(total_lines / float(num_output_files))
-    lines_per_file = max(lines_per_file, 1)
-
-    start_line = 0
-
-    # These do not vary throughout the loop
-    output_folder = abs_main_folder + "/scu/"
-    output_filename_prefix = "scu_" + out_filename
-
     fresh_files = set()
 
-    for file_count in range(0, num_output_files):
-        end_line = start_line + lines_per_file
-
-        # special case to cover rounding error in final file
-        if file_count == (num_output_files - 1):
-            end_line = len(found_includes)
+    # Balance the SCU files by compile cost rather than by number of sources,
+    # so the heaviest sources don't all end up in the same one.
+    sources = [include[len('#include "') : -1] for include in found_includes]
+    ranges = partition_sources(sources, get_compile_costs(sources), num_output_files, includes_per_scu)
+    if not ranges:
+        # Still write an empty file, so the folder always has one to compile.
+        ranges = [(0, 0)]
 
+    for file_count, (start_line, end_line) in enumerate(ranges):
+        includes = [include for include in found_includes[start_line:end_line] if include not in hot_includes]
         fresh_file = write_output_file(
-            file_count, found_includes, start_line, end_line, output_folder, output_filename_prefix, extension
+            file_count, includes, 0, len(includes), output_folder, output_filename_prefix, extension
         )
 
         fresh_files.add(fresh_file)
 
-        start_line = end_line
-
     # Write the exceptions each in their own scu gen file,
     # so they can effectively compile in "old style / normal build".
-    for exception_count in range(len(found_exceptions)):
-        fresh_file = write_exception_output_file(
-            exception_count, found_exceptions[exception_count], output_folder, output_filename_prefix, extension
-        )
+    for exception in found_exceptions:
+        fresh_file = write_exception_output_file(exception, output_folder, output_filename_prefix, extension)
 
         fresh_files.add(fresh_file)
 
@@ -258,9 +852,19 @@ def process_folder(folders, sought_exceptions=[], includes_per_scu=0, extension=
     clear_out_stale_files(output_folder, extension, fresh_files)
 
 
-def generate_scu_files(max_includes_per_scu):
+def generate_scu_files(
+    max_includes_per_scu, compile_times_path="", hot_files="", discover_folders=False, detect_collisions=False
+):
     global _max_includes_per_scu
     _max_includes_per_scu = max_includes_per_scu
+    global _detect_collisions
+    _detect_collisions = detect_collisions
+    global _compile_times
+    _compile_times = load_compile_times(compile_times_path) if compile_times_path else {}
+    _file_info_cache.clear()
+    _included_files_cache.clear()
+    _header_macros_cache.clear()
+    set_hot_files(hot_files)
 
     print("SCU: Generating build files... (max includes per SCU: %d)" % _max_includes_per_scu)
 
@@ -271,101 +875,8 @@ def generate_scu_files(max_includes_per_scu):
         raise RuntimeError("scu_builders.py must be run from the godot folder.")
         return
 
-    process_folder(["core"])
-    process_folder(["core/crypto"])
-    process_folder(["core/debugger"])
-    process_folder(["core/extension"])
-    process_folder(["core/input"])
-    process_folder(["core/io"])
-    process_folder(["core/math"])
-    process_folder(["core/object"])
-    process_folder(["core/os"])
-    process_folder(["core/string"])
-    process_folder(["core/variant"], ["variant_utility"])
-
-    process_folder(["drivers/unix"])
-    process_folder(["drivers/png"])
-
-    process_folder(["drivers/gles3/effects"])
-    process_folder(["drivers/gles3/storage"])
-
-    process_folder(["editor"], ["file_system_dock", "editor_resource_preview"], 32)
-    process_folder(["editor/debugger"])
-    process_folder(["editor/debugger/debug_adapter"])
-    process_folder(["editor/export"])
-    process_folder(["editor/gui"])
-    process_folder(["editor/themes"])
-    process_folder(["editor/project_manager"])
-    process_folder(["editor/import"])
-    process_folder(["editor/import/3d"])
-    process_folder(["editor/plugins"])
-    process_folder(["editor/plugins/gizmos"])
-    process_folder(["editor/plugins/tiles"])
-
-    process_folder(["platform/android/export"])
-    process_folder(["platform/ios/export"])
-    process_folder(["platform/linuxbsd/export"])
-    process_folder(["platform/macos/export"])
-    process_folder(["platform/web/export"])
-    process_folder(["platform/windows/export"])
-
-    process_folder(["modules/lightmapper_rd"])
-    process_folder(["modules/gltf"])
-    process_folder(["modules/gltf/structures"])
-    process_folder(["modules/gltf/editor"])
-    process_folder(["modules/gltf/extensions"])
-    process_folder(["modules/gltf/extensions/physics"])
-    process_folder(["modules/navigation"])
-    process_folder(["modules/navigation/2d"])
-    process_folder(["modules/navigation/3d"])
-    process_folder(["modules/webrtc"])
-    process_folder(["modules/websocket"])
-    process_folder(["modules/gridmap"])
-    process_folder(["modules/multiplayer"])
-    process_folder(["modules/multiplayer/editor"])
-    process_folder(["modules/openxr"], ["register_types"])
-    process_folder(["modules/openxr/action_map"])
-    process_folder(["modules/openxr/editor"])
-    # process_folder(["modules/openxr/extensions"])  # Sensitive include order for platform code.
-    process_folder(["modules/openxr/scene"])
-    process_folder(["modules/godot_physics_2d"])
-    process_folder(["modules/godot_physics_3d"])
-    process_folder(["modules/godot_physics_3d/joints"])
-
-    process_folder(["modules/csg"])
-    process_folder(["modules/gdscript"])
-    process_folder(["modules/gdscript/editor"])
-    process_folder(["modules/gdscript/language_server"])
-
-    process_folder(["scene/2d"])
-    process_folder(["scene/2d/physics"])
-    process_folder(["scene/2d/physics/joints"])
-    process_folder(["scene/3d"])
-    process_folder(["scene/3d/physics"])
-    process_folder(["scene/3d/physics/joints"])
-    process_folder(["scene/animation"])
-    process_folder(["scene/gui"])
-    process_folder(["scene/main"])
-    process_folder(["scene/theme"])
-    process_folder(["scene/resources"])
-    process_folder(["scene/resources/2d"])
-    process_folder(["scene/resources/2d/skeleton"])
-    process_folder(["scene/resources/3d"])
-
-    process_folder(["servers"])
-    process_folder(["servers/rendering"])
-    process_folder(["servers/rendering/dummy/storage"])
-    process_folder(["servers/rendering/storage"])
-    process_folder(["servers/rendering/renderer_rd"])
-    process_folder(["servers/rendering/renderer_rd/effects"])
-    process_folder(["servers/rendering/renderer_rd/environment"])
-    process_folder(["servers/rendering/renderer_rd/storage_rd"])
-    process_folder(["servers/rendering/renderer_rd/forward_clustered"])
-    process_folder(["servers/rendering/renderer_rd/forward_mobile"])
-    process_folder(["servers/audio"])
-    process_folder(["servers/audio/effects"])
-    process_folder(["servers/navigation"])
-    process_folder(["servers/xr"])
+    for folder in find_scu_folders() if discover_folders else _verified_folders:
+        process_folder([folder], _known_exceptions.get(folder, []), _folder_includes_per_scu.get(folder, 0))
 
     # Finally change back the path to the calling folder
     os.chdir(curr_folder)
@@ -131,7 +131,7 @@ void ShaderRD::_add_stage(const char *p_code, StageType p_stage_type) {
 	}
 }
 
-void ShaderRD::setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_compute_code, const char *p_name) {
+void ShaderRD::setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_compute_code, const char *p_name, const char *p_source_key) {
 	name = p_name;
 
 	if (p_compute_code) {
@@ -156,16 +156,47 @@ void ShaderRD::setup(const char *p_vertex_code, const char *p_fragment_code, con
 	tohash.append(RenderingDevice::get_singleton()->shader_get_spirv_cache_key());
 	tohash.append("[BinaryCacheKey]");
 	tohash.append(RenderingDevice::get_singleton()->shader_get_binary_cache_key());
-	tohash.append("[Vertex]");
-	tohash.append(p_vertex_code ? p_vertex_code : "");
-	tohash.append("[Fragment]");
-	tohash.append(p_fragment_code ? p_fragment_code : "");
-	tohash.append("[Compute]");
-	tohash.append(p_compute_code ? p_compute_code : "");
+	if (p_source_key) {
+		tohash.append("[SourceKey]");
+		tohash.append(p_source_key);
+	} else {
+		tohash.append("[Vertex]");
+		tohash.append(p_vertex_code ? p_vertex_code : "");
+		tohash.append("[Fragment]");
+		tohash.append(p_fragment_code ? p_fragment_code : "");
+		tohash.append("[Compute]");
+		tohash.append(p_compute_code ? p_compute_code : "");
+	}
 
 	base_sha256 = tohash.as_string().sha256_text();
 }
 
+static CharString _join_chunks(const char *const *p_chunks) {
+	int length = 0;
+	for (const char *const *chunk = p_chunks; *chunk; chunk++) {
+		length += strlen(*chunk);
+	}
+
+	CharString code;
+	code.resize(length + 1);
+	char *dst = code.ptrw();
+	for (const char *const *chunk = p_chunks; *chunk; chunk++) {
+		const int chunk_length = strlen(*chunk);
+		memcpy(dst, *chunk, chunk_length);
+		dst += chunk_length;
+	}
+	*dst = '\0';
+	return code;
+}
+
+void ShaderRD::setup(const char *const *p_vertex_chunks, const char *const *p_fragment_chunks, const char *const *p_compute_chunks, const char *p_name, const char *p_source_key) {
+	const CharString vertex_code = p_vertex_chunks ? _join_chunks(p_vertex_chunks) : CharString();
+	const CharString fragment_code = p_fragment_chunks ? _join_chunks(p_fragment_chunks) : CharString();
+	const CharString compute_code = p_compute_chunks ? _join_chunks(p_compute_chunks) : CharString();
+
+	setup(p_vertex_chunks ? vertex_code.get_data() : nullptr, p_fragment_chunks ? fragment_code.get_data() : nullptr, p_compute_chunks ? compute_code.get_data() : nullptr, p_name, p_source_key);
+}
+
 RID ShaderRD::version_create() {
 	//initialize() was never called
 	ERR_FAIL_COND_V(group_to_variant_map.is_empty(), RID());
@@ -154,7 +154,10 @@ private:
 
 protected:
 	ShaderRD();
-	void setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_compute_code, const char *p_name);
+	// If given, `p_source_key` identifies the code in the shader cache instead of the code itself (generated shaders precompute it).
+	void setup(const char *p_vertex_code, const char *p_fragment_code, const char *p_compute_code, const char *p_name, const char *p_source_key = nullptr);
+	// Code given as null-terminated lists of chunks, which generated shaders share with each other.
+	void setup(const char *const *p_vertex_chunks, const char *const *p_fragment_chunks, const char *const *p_compute_chunks, const char *p_name, const char *p_source_key = nullptr);
 
 public:
 	RID version_create();
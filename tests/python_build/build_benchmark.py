@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks the Python generators run by the build on the real inputs of the repository:
+shaders (RD, raw and GLES3 headers), the class reference, translations, icons, fonts,
+`make_virtuals` and the SCU files. Generated files are written to a temporary folder, except
+for the SCU files, which are generated in place as in the build (existing SCU folders are
+restored afterwards, and others removed).
+
+Each generator runs `--repeat` times and its best time is kept, to reduce noise. Save the
+results of a reference checkout with `--output`, then check later changes with `--compare`,
+which fails if any generator got slower than the baseline by more than `--threshold`.
+
+The same benchmarks run under pytest when `PYTEST_BENCHMARK` is set, see `test_benchmark.py`.
+
+Usage: tests/python_build/build_benchmark.py [--repeat 3] [--output baseline.json]
+                                             [--compare baseline.json] [--threshold 0.25] [name ...]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import methods  # noqa: E402
+import scu_builders  # noqa: E402
+from core.object import make_virtuals  # noqa: E402
+from editor import editor_builders  # noqa: E402
+from editor.icons import editor_icons_builders  # noqa: E402
+from editor.themes import editor_theme_builders  # noqa: E402
+from gles3_builders import build_gles3_header  # noqa: E402
+from glsl_builders import build_raw_header, build_rd_header, map_sources  # noqa: E402
+from scene.theme import default_theme_builders  # noqa: E402
+from scene.theme.icons import default_theme_icons_builders  # noqa: E402
+
+RD_SHADERS = "servers/rendering/renderer_rd/shaders/**/*.glsl"
+RAW_SHADERS = ["modules/betsy/*.glsl", "modules/lightmapper_rd/*.glsl"]
+GLES3_SHADERS = [
+    "drivers/gles3/shaders/canvas.glsl",
+    "drivers/gles3/shaders/feed.glsl",
+    "drivers/gles3/shaders/scene.glsl",
+    "drivers/gles3/shaders/sky.glsl",
+    "drivers/gles3/shaders/canvas_occlusion.glsl",
+    "drivers/gles3/shaders/canvas_sdf.glsl",
+    "drivers/gles3/shaders/particles.glsl",
+    "drivers/gles3/shaders/particles_copy.glsl",
+    "drivers/gles3/shaders/skeleton.glsl",
+    "drivers/gles3/shaders/effects/*.glsl",
+]
+TRANSLATIONS = {
+    "editor": ["editor/translations/editor/*.po"],
+    "property": ["editor/translations/properties/*.po"],
+    "doc": ["doc/translations/*.po"],
+    "extractable": ["editor/translations/extractable/*.po", "editor/translations/extractable/extractable.pot"],
+}
+FONTS = ["thirdparty/fonts/*.ttf", "thirdparty/fonts/*.otf", "thirdparty/fonts/*.woff", "thirdparty/fonts/*.woff2"]
+
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+
+
+class BenchmarkEnvironment(dict):
+    """Stands in for the SCons environment, with the options read by the generators."""
+
+    def __init__(self):
+        super().__init__(embed_compression="zlib", msgfmt=False, minify_shaders=False)
+
+    def NoCache(self, *args):
+        pass
+
+
+def find_sources(patterns: List[str]) -> List[str]:
+    return sorted(path for pattern in patterns for path in glob.glob(pattern, recursive=True))
+
+
+def get_output(out: str, source: str) -> str:
+    output = os.path.join(out, source + ".gen.h")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    return output
+
+
+def bench_rd_shaders(out: str, env: BenchmarkEnvironment) -> None:
+    sources = [path for path in find_sources([RD_SHADERS]) if not path.endswith("_inc.glsl")]
+    map_sources(lambda source: build_rd_header(source, get_output(out, source), minify=env["minify_shaders"]), sources)
+
+
+def bench_raw_shaders(out: str, env: BenchmarkEnvironment) -> None:
+    sources = [path for path in find_sources([RD_SHADERS]) if path.endswith("_inc.glsl")]
+    sources += find_sources(RAW_SHADERS)
+    map_sources(lambda source: build_raw_header(source, get_output(out, source), minify=env["minify_shaders"]), sources)
+
+
+def bench_gles3_shaders(out: str, env: BenchmarkEnvironment) -> None:
+    map_sources(
+        lambda source: build_gles3_header(
+            source,
+            include="drivers/gles3/shader_gles3.h",
+            class_suffix="GLES3",
+            optional_output_filename=get_output(out, source),
+            minify=env["minify_shaders"],
+        ),
+        find_sources(GLES3_SHADERS),
+    )
+
+
+def bench_doc_header(out: str, env: BenchmarkEnvironment) -> None:
+    target = [os.path.join(out, "doc_data_compressed.gen.h")]
+    editor_builders.make_doc_header(target, find_sources(["doc/classes/*.xml"]), env)
+
+
+def bench_translations(out: str, env: BenchmarkEnvironment) -> None:
+    for category, patterns in TRANSLATIONS.items():
+        target = [os.path.join(out, f"{category}_translations.gen.h")]
+        editor_builders.make_translations_header(target, find_sources(patterns), env, category)
+
+
+def bench_editor_icons(out: str, env: BenchmarkEnvironment) -> None:
+    target = [os.path.join(out, "editor_icons.gen.h")]
+    editor_icons_builders.make_editor_icons_action(target, find_sources(["editor/icons/*.svg"]), env)
+
+
+def bench_default_theme_icons(out: str, env: BenchmarkEnvironment) -> None:
+    target = [os.path.join(out, "default_theme_icons.gen.h")]
+    sources = find_sources(["scene/theme/icons/*.svg"])
+    default_theme_icons_builders.make_default_theme_icons_action(target, sources, env)
+
+
+def bench_editor_fonts(out: str, env: BenchmarkEnvironment) -> None:
+    target = [os.path.join(out, "builtin_fonts.gen.h")]
+    editor_theme_builders.make_fonts_header(target, find_sources(FONTS), env)
+
+
+def bench_default_font(out: str, env: BenchmarkEnvironment) -> None:
+    target = [os.path.join(out, "default_font.gen.h")]
+    default_theme_builders.make_fonts_header(target, ["thirdparty/fonts/OpenSans_SemiBold.woff2"], env)
+
+
+def bench_make_virtuals(out: str, env: BenchmarkEnvironment) -> None:
+    make_virtuals.run([os.path.join(out, "gdvirtual.gen.inc")], [], env)
+
+
+def bench_scu(out: str, env: BenchmarkEnvironment) -> None:
+    # Default limit of non-development builds.
+    scu_builders.generate_scu_files(8)
+
+
+BENCHMARKS: Dict[str, Callable[[str, BenchmarkEnvironment], None]] = {
+    "rd_shaders": bench_rd_shaders,
+    "raw_shaders": bench_raw_shaders,
+    "gles3_shaders": bench_gles3_shaders,
+    "doc_header": bench_doc_header,
+    "translations": bench_translations,
+    "editor_icons": bench_editor_icons,
+    "default_theme_icons": bench_default_theme_icons,
+    "editor_fonts": bench_editor_fonts,
+    "default_font": bench_default_font,
+    "make_virtuals": bench_make_virtuals,
+    "scu": bench_scu,
+}
+
+
+# Files written by `scu_builders.generate_scu_files`, unlike the objects built from them.
+SCU_GENERATED_FILES = ["*.cpp", "*.c", "*.json"]
+
+
+def find_scu_folders() -> List[str]:
+    return [os.path.dirname(path) for path in glob.glob("**/scu/", recursive=True)]
+
+
+def find_scu_generated_files(folder: str) -> List[str]:
+    return find_sources([os.path.join(folder, pattern) for pattern in SCU_GENERATED_FILES])
+
+
+@contextmanager
+def benchmark_context() -> Iterator[str]:
+    """
+    Runs from the root of the repository with the compression cache disabled, as in a clean
+    build, and yields a temporary output folder. The generated files of existing SCU folders are
+    restored afterwards, with their timestamps so that an existing SCU build isn't redone, and
+    other SCU folders are removed.
+    """
+    cwd = os.getcwd()
+    compression_cache_path = methods._compression_cache_path
+    os.chdir(ROOT)
+    methods._compression_cache_path = ""
+    try:
+        with tempfile.TemporaryDirectory() as out, tempfile.TemporaryDirectory() as snapshot:
+            scu_files = {folder: find_scu_generated_files(folder) for folder in find_scu_folders()}
+            for path in sum(scu_files.values(), []):
+                os.makedirs(os.path.dirname(os.path.join(snapshot, path)), exist_ok=True)
+                shutil.copy2(path, os.path.join(snapshot, path))
+            try:
+                yield out
+            finally:
+                for folder in find_scu_folders():
+                    if folder not in scu_files:
+                        shutil.rmtree(folder, ignore_errors=True)
+                        continue
+                    for path in set(find_scu_generated_files(folder)) - set(scu_files[folder]):
+                        os.remove(path)
+                    for path in scu_files[folder]:
+                        shutil.copy2(os.path.join(snapshot, path), path)
+    finally:
+        methods._compression_cache_path = compression_cache_path
+        os.chdir(cwd)
+
+
+def run_benchmarks(names: List[str], repeat: int = DEFAULT_REPEAT) -> Dict[str, float]:
+    """Returns the best time of each benchmark over `repeat` runs, in seconds."""
+    results = {}
+    with benchmark_context() as out:
+        env = BenchmarkEnvironment()
+        for name in names:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                BENCHMARKS[name](out, env)
+                timings.append(time.perf_counter() - start)
+            results[name] = min(timings)
+    return results
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["benchmarks"]
+
+
+def save_baseline(path: str, results: Dict[str, float]) -> None:
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": {name: round(seconds, 6) for name, seconds in results.items()},
+    }
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(baseline, indent=4) + "\n")
+
+
+def find_regressions(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Returns the benchmarks which are slower than in `baseline` by more than `threshold` (e.g. 0.25 for 25%)."""
+    return [
+        name for name, seconds in results.items() if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", metavar="name", help=f"Benchmarks to run: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Number of runs of each benchmark.")
+    parser.add_argument("--output", help="Write the results to this JSON file, to be used as a baseline.")
+    parser.add_argument("--compare", help="Fail if a benchmark regressed compared to this JSON baseline.")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="Tolerated slowdown, as a ratio of the baseline."
+    )
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    baseline = load_baseline(args.compare) if args.compare else {}
+
+    results = run_benchmarks(args.names or list(BENCHMARKS), args.repeat)
+    for name, seconds in results.items():
+        line = f"{name:<20} {seconds:8.3f} s"
+        if name in baseline:
+            line += f"  (baseline {baseline[name]:.3f} s, {seconds / baseline[name] - 1:+.1%})"
+        print(line)
+
+    if args.output:
+        save_baseline(args.output, results)
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name in regressions:
+        print(f"Regression: {name} is more than {args.threshold:.0%} slower than the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
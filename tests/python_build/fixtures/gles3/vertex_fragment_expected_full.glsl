@@ -6,10 +6,43 @@
 #include "drivers/gles3/shader_gles3.h"
 
 
-class VertexFragmentShaderGLES3 : public ShaderGLES3 {
+#ifndef GLSL_CHUNK_F6D16F78C0438233
+#define GLSL_CHUNK_F6D16F78C0438233
+inline constexpr char _glsl_chunk_f6d16f78c0438233[] = {
+R"<!>(
+precision highp float;
+precision highp int;
 
-public:
+layout(location = 0) in highp vec3 vertex;
+
+out highp vec4 position_interp;
+
+void main() {
+	position_interp = vec4(vertex.x,1,0,1);
+}
+
+)<!>"
+};
+#endif
 
+#ifndef GLSL_CHUNK_73DF57551A4A7763
+#define GLSL_CHUNK_73DF57551A4A7763
+inline constexpr char _glsl_chunk_73df57551a4a7763[] = {
+R"<!>(
+precision highp float;
+precision highp int;
+
+in highp vec4 position_interp;
+
+void main() {
+	highp float depth = ((position_interp.z / position_interp.w) + 1.0);
+	frag_color = vec4(depth);
+}
+)<!>"
+};
+#endif
+
+struct VertexFragmentShaderGLES3Enums {
 	enum ShaderVariant {
 		MODE_NINEPATCH,
 	};
@@ -18,6 +51,13 @@ public:
 		DISABLE_LIGHTING=1,
 	};
 
+	static constexpr uint64_t DEFAULT_SPECIALIZATION = 0;
+};
+
+class VertexFragmentShaderGLES3 : public ShaderGLES3, public VertexFragmentShaderGLES3Enums {
+
+public:
+
 	_FORCE_INLINE_ bool version_bind_shader(RID p_version,ShaderVariant p_variant,uint64_t p_specialization=0) { return _version_bind_shader(p_version,p_variant,p_specialization); }
 
 protected:
@@ -26,47 +66,21 @@ protected:
 
 		static const char **_uniform_strings=nullptr;
 		static const char* _variant_defines[]={
-			"#define USE_NINEPATCH",
+			"#define USE_NINEPATCH\n",
 		};
 
 		static TexUnitPair *_texunit_pairs=nullptr;
 		static UBOPair *_ubo_pairs=nullptr;
 		static Specialization _spec_pairs[]={
-			{"DISABLE_LIGHTING",false},
+			{"DISABLE_LIGHTING",false,"#define DISABLE_LIGHTING\n"},
 		};
 
 		static const Feedback* _feedbacks=nullptr;
-		static const char _vertex_code[]={
-R"<!>(
-precision highp float;
-precision highp int;
-
-layout(location = 0) in highp vec3 vertex;
-
-out highp vec4 position_interp;
-
-void main() {
-	position_interp = vec4(vertex.x,1,0,1);
-}
+		static const char *const _vertex_chunks[]={_glsl_chunk_f6d16f78c0438233,nullptr};
 
-)<!>"
-		};
-
-		static const char _fragment_code[]={
-R"<!>(
-precision highp float;
-precision highp int;
-
-in highp vec4 position_interp;
-
-void main() {
-	highp float depth = ((position_interp.z / position_interp.w) + 1.0);
-	frag_color = vec4(depth);
-}
-)<!>"
-		};
+		static const char *const _fragment_chunks[]={_glsl_chunk_73df57551a4a7763,nullptr};
 
-		_setup(_vertex_code,_fragment_code,"VertexFragmentShaderGLES3",0,_uniform_strings,0,_ubo_pairs,0,_feedbacks,0,_texunit_pairs,1,_spec_pairs,1,_variant_defines);
+		_setup(_vertex_chunks,_fragment_chunks,"VertexFragmentShaderGLES3",0,_uniform_strings,0,_ubo_pairs,0,_feedbacks,0,_texunit_pairs,1,_spec_pairs,DEFAULT_SPECIALIZATION,1,_variant_defines);
 	}
 
 };
@@ -4,13 +4,9 @@
 
 #include "servers/rendering/renderer_rd/shader_rd.h"
 
-class ComputeShaderRD : public ShaderRD {
-
-public:
-
-	ComputeShaderRD() {
-
-		static const char _compute_code[] = {
+#ifndef GLSL_CHUNK_C42B7B9CC64B0093
+#define GLSL_CHUNK_C42B7B9CC64B0093
+inline constexpr char _glsl_chunk_c42b7b9cc64b0093[] = {
 R"<!>(
 #version 450
 
@@ -18,14 +14,37 @@ R"<!>(
 
 #define BLOCK_SIZE 8
 
-#define M_PI 3.14159265359
+)<!>"
+};
+#endif
 
+#ifndef GLSL_CHUNK_931B5B216BAAB494
+#define GLSL_CHUNK_931B5B216BAAB494
+inline constexpr char _glsl_chunk_931b5b216baab494[] = {
+R"<!>(#define M_PI 3.14159265359
+)<!>"
+};
+#endif
+
+#ifndef GLSL_CHUNK_8257667BE13A03B5
+#define GLSL_CHUNK_8257667BE13A03B5
+inline constexpr char _glsl_chunk_8257667be13a03b5[] = {
+R"<!>(
 void main() {
 	uint t = BLOCK_SIZE + 1;
 }
 )<!>"
-		};
-		setup(nullptr, nullptr, _compute_code, "ComputeShaderRD");
+};
+#endif
+
+class ComputeShaderRD : public ShaderRD {
+
+public:
+
+	ComputeShaderRD() {
+
+		static const char *const _compute_chunks[] = { _glsl_chunk_c42b7b9cc64b0093, _glsl_chunk_931b5b216baab494, _glsl_chunk_8257667be13a03b5, nullptr };
+		setup(nullptr, nullptr, _compute_chunks, "ComputeShaderRD", "da6db23e48cb1a22a2c39043058e7e1ae45af833c1496b5d6b7d3c8a25384db1");
 	}
 };
 
@@ -4,20 +4,30 @@
 
 #include "servers/rendering/renderer_rd/shader_rd.h"
 
-class VertexFragmentShaderRD : public ShaderRD {
-
-public:
-
-	VertexFragmentShaderRD() {
-
-		static const char _vertex_code[] = {
+#ifndef GLSL_CHUNK_B47AF0D82A9D9F8F
+#define GLSL_CHUNK_B47AF0D82A9D9F8F
+inline constexpr char _glsl_chunk_b47af0d82a9d9f8f[] = {
 R"<!>(
 #version 450
 
 #VERSION_DEFINES
 
-#define M_PI 3.14159265359
+)<!>"
+};
+#endif
+
+#ifndef GLSL_CHUNK_931B5B216BAAB494
+#define GLSL_CHUNK_931B5B216BAAB494
+inline constexpr char _glsl_chunk_931b5b216baab494[] = {
+R"<!>(#define M_PI 3.14159265359
+)<!>"
+};
+#endif
 
+#ifndef GLSL_CHUNK_704CBB91A6E87C7A
+#define GLSL_CHUNK_704CBB91A6E87C7A
+inline constexpr char _glsl_chunk_704cbb91a6e87c7a[] = {
+R"<!>(
 layout(location = 0) out vec2 uv_interp;
 
 void main() {
@@ -25,8 +35,12 @@ void main() {
 }
 
 )<!>"
-		};
-		static const char _fragment_code[] = {
+};
+#endif
+
+#ifndef GLSL_CHUNK_60D145854C58EC9B
+#define GLSL_CHUNK_60D145854C58EC9B
+inline constexpr char _glsl_chunk_60d145854c58ec9b[] = {
 R"<!>(
 #version 450
 
@@ -38,8 +52,18 @@ void main() {
 	uv_interp = vec2(1, 0);
 }
 )<!>"
-		};
-		setup(_vertex_code, _fragment_code, nullptr, "VertexFragmentShaderRD");
+};
+#endif
+
+class VertexFragmentShaderRD : public ShaderRD {
+
+public:
+
+	VertexFragmentShaderRD() {
+
+		static const char *const _vertex_chunks[] = { _glsl_chunk_b47af0d82a9d9f8f, _glsl_chunk_931b5b216baab494, _glsl_chunk_704cbb91a6e87c7a, nullptr };
+		static const char *const _fragment_chunks[] = { _glsl_chunk_60d145854c58ec9b, nullptr };
+		setup(_vertex_chunks, _fragment_chunks, nullptr, "VertexFragmentShaderRD", "f7c7aba1d458079dbbffec26becaa6adf6d92c6335c449bbd358e48df2f0be6b");
 	}
 };
 
@@ -0,0 +1,49 @@
+import os
+
+import build_benchmark
+import pytest
+from build_benchmark import BENCHMARKS, DEFAULT_THRESHOLD, find_regressions, load_baseline, run_benchmarks
+
+
+# Benchmarks take a while, so they only run on demand: set `PYTEST_BENCHMARK`, and optionally
+# `PYTEST_BENCHMARK_BASELINE` to a file written by `build_benchmark.py --output` to check for
+# regressions (with `PYTEST_BENCHMARK_THRESHOLD` as the tolerated slowdown ratio).
+@pytest.mark.skipif(not os.getenv("PYTEST_BENCHMARK"), reason="PYTEST_BENCHMARK is not set")
+@pytest.mark.parametrize("name", BENCHMARKS)
+def test_benchmark(name):
+    results = run_benchmarks([name])
+    print(f"{name}: {results[name]:.3f} s")
+
+    baseline_path = os.getenv("PYTEST_BENCHMARK_BASELINE")
+    if baseline_path:
+        baseline = load_baseline(baseline_path)
+        threshold = float(os.getenv("PYTEST_BENCHMARK_THRESHOLD", DEFAULT_THRESHOLD))
+        assert not find_regressions(results, baseline, threshold), (
+            f"{name} took {results[name]:.3f} s, baseline is {baseline[name]:.3f} s"
+        )
+
+
+def test_find_regressions():
+    baseline = {"fast": 1.0, "slow": 1.0}
+    results = {"fast": 1.2, "slow": 1.3, "new": 5.0}
+    assert find_regressions(results, baseline, 0.25) == ["slow"]
+
+
+def test_benchmark_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_benchmark, "ROOT", tmp_path)
+    scu_folder = tmp_path / "core" / "scu"
+    scu_folder.mkdir(parents=True)
+    (scu_folder / "scu_core.gen.cpp").write_text("existing\n")
+    os.utime(scu_folder / "scu_core.gen.cpp", (1000, 1000))
+    (scu_folder / "scu_core.gen.o").write_text("object\n")
+
+    with build_benchmark.benchmark_context():
+        (scu_folder / "scu_core.gen.cpp").write_text("rewritten\n")
+        (scu_folder / "scu_core_1.gen.cpp").write_text("new\n")
+        (tmp_path / "scene" / "scu").mkdir(parents=True)
+
+    # Existing SCU files are left as they were, so an existing SCU build isn't redone.
+    assert sorted(os.listdir(scu_folder)) == ["scu_core.gen.cpp", "scu_core.gen.o"]
+    assert (scu_folder / "scu_core.gen.cpp").read_text() == "existing\n"
+    assert os.stat(scu_folder / "scu_core.gen.cpp").st_mtime == 1000
+    assert not (tmp_path / "scene" / "scu").exists()
@@ -0,0 +1,78 @@
+import gettext
+import io
+import struct
+
+import pytest
+
+from editor.editor_builders import make_mo, parse_po
+
+PO = rb"""# Comment.
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\n"
+
+msgid "Cancel"
+msgstr "Abbrechen"
+
+#, fuzzy
+msgid "Fuzzy"
+msgstr "Unscharf"
+
+msgid "Untranslated"
+msgstr ""
+
+msgctxt "Transition Type"
+msgid "Linear"
+msgstr "Linear"
+
+#: editor/editor_node.cpp
+msgid "%d file"
+msgid_plural "%d files"
+msgstr[0] "%d Datei"
+msgstr[1] "%d Dateien"
+
+msgid ""
+"Multi\tline\n"
+"\"escaped\" \\ \101\x42"
+msgstr "Mehrzeilig"
+
+#~ msgid "Obsolete"
+#~ msgstr "Veraltet"
+"""
+
+
+def test_parse_po():
+    messages = parse_po(PO)
+
+    assert messages == {
+        b"": b"Content-Type: text/plain; charset=UTF-8\nPlural-Forms: nplurals=2; plural=(n != 1);\n",
+        b"Cancel": b"Abbrechen",
+        b"Transition Type\x04Linear": b"Linear",
+        b"%d file\0%d files": b"%d Datei\0%d Dateien",
+        b'Multi\tline\n"escaped" \\ AB': b"Mehrzeilig",
+    }
+
+
+@pytest.mark.parametrize("po", [b'msgid "a"\nmsgstr "\\q"\n', b'msgid "a"\nmsgstr "b"\nmsgid "a"\nmsgstr "c"\n'])
+def test_parse_po_invalid(po):
+    with pytest.raises(ValueError):
+        parse_po(po)
+
+
+def test_make_mo():
+    messages = parse_po(PO)
+    mo = make_mo(messages)
+
+    magic, revision, count, originals, translations, hash_size, hash_offset = struct.unpack_from("=7I", mo)
+    assert (magic, revision, count, hash_size) == (0x950412DE, 0, len(messages), 0)
+    assert (originals, translations, hash_offset) == (28, 28 + count * 8, 28 + count * 16)
+    # Messages are sorted by ID, and their strings laid out in the same order.
+    first_length, first_offset = struct.unpack_from("=II", mo, originals)
+    assert (first_length, first_offset) == (0, hash_offset)
+
+    translation = gettext.GNUTranslations(io.BytesIO(mo))
+    assert translation.gettext("Cancel") == "Abbrechen"
+    assert translation.gettext("Fuzzy") == "Fuzzy"
+    assert translation.pgettext("Transition Type", "Linear") == "Linear"
+    assert translation.ngettext("%d file", "%d files", 2) == "%d Dateien"
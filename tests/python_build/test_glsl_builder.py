@@ -1,8 +1,22 @@
 import json
+import os
 
 import pytest
 
-from glsl_builders import RAWHeaderStruct, RDHeaderStruct, build_raw_header, build_rd_header
+from glsl_builders import (
+    RAWHeaderStruct,
+    RDHeaderStruct,
+    build_raw_header,
+    build_rd_header,
+    find_includes,
+    format_chunks,
+    format_line_map,
+    get_rd_manifest,
+    get_shared_lines,
+    minify_glsl,
+    read_glsl_file,
+    split_chunks,
+)
 
 
 @pytest.mark.parametrize(
@@ -35,3 +49,110 @@ def test_glsl_builder(shader_files, builder, header_struct):
         expected_output = f.read()
 
     assert actual_output == expected_output
+
+
+def test_read_glsl_file(tmp_path):
+    path = tmp_path / "file_inc.glsl"
+    path.write_text('#include "other_inc.glsl"\nvoid main() {}\n', encoding="utf-8")
+
+    glsl_file = read_glsl_file(str(path))
+    assert glsl_file.includes == ["other_inc.glsl", None]
+    assert read_glsl_file(str(path)) is glsl_file
+
+    path.write_text("void main() {}\n", encoding="utf-8")
+    os.utime(path, ns=(0, 0))
+    assert read_glsl_file(str(path)).lines == ["void main() {}\n"]
+
+
+def test_find_includes(tmp_path):
+    (tmp_path / "thirdparty").mkdir()
+    (tmp_path / "shaders").mkdir()
+    (tmp_path / "thirdparty" / "lib.h").write_text("", encoding="utf-8")
+    (tmp_path / "common_inc.glsl").write_text("", encoding="utf-8")
+    shader = tmp_path / "shaders" / "shader.glsl"
+    shader.write_text(
+        '#include "../common_inc.glsl" // Comment.\n#include "thirdparty/lib.h"\n#include "missing_inc.glsl"\n',
+        encoding="utf-8",
+    )
+
+    assert find_includes(str(shader)) == [str(tmp_path / "common_inc.glsl")]
+    assert find_includes(str(shader), str(tmp_path)) == [
+        str(tmp_path / "common_inc.glsl"),
+        str(tmp_path / "thirdparty" / "lib.h"),
+    ]
+
+
+def test_minify_glsl():
+    lines = [
+        "#version 450",
+        "",
+        "#define UNUSED 1 // Comment.",
+        "#define USED(x) ((x) * 2)",
+        "#define  LONG_MACRO \\",
+        "",
+        "/* Multiline",
+        "   comment. */",
+        "layout(location = 0) out vec2 uv;",
+        'const int a = USED(1) - -1; /* " */ float b = 1.0;',
+    ]
+
+    minified, indices = minify_glsl(lines)
+    assert minified == [
+        "#version 450",
+        "#define USED(x) ((x) * 2)",
+        "layout(location=0)out vec2 uv;",
+        "const int a=USED(1)- -1;float b=1.0;",
+    ]
+    assert indices == [0, 3, 8, 9]
+
+    minified, indices = minify_glsl(lines, drop_unused_defines=False)
+    assert minified[1:5] == ["#define UNUSED 1", "#define USED(x) ((x) * 2)", "#define LONG_MACRO \\", ""]
+    assert indices[1:5] == [2, 3, 4, 5]
+
+    # Defines of shared lines are kept, so the chunks they belong to stay the same in all shaders.
+    minified, _ = minify_glsl(lines, shared_lines={2})
+    assert minified[1] == "#define UNUSED 1"
+
+    # Defines may be used by code the engine injects at the markers.
+    minified, _ = minify_glsl(["#define UNUSED 1", "#CODE : VERTEX"])
+    assert minified == ["#define UNUSED 1", "#CODE : VERTEX"]
+
+
+def test_format_line_map():
+    assert format_line_map("_vertex_code", ["a.glsl:1", "a.glsl:2", "b.glsl:1", "a.glsl:4"]) == (
+        "/* Source lines of the minified `_vertex_code`:\n * 1-2: a.glsl:1-2\n * 3: b.glsl:1\n * 4: a.glsl:4\n */"
+    )
+
+
+def test_split_chunks():
+    lines = ["#version 450", "#define A 1", "#define B 2", "void main() {}"]
+    origins = ["shader.glsl:1", "common_inc.glsl:1", "common_inc.glsl:2", "shader.glsl:3"]
+
+    chunks = split_chunks(lines, origins)
+    assert [text for _, text in chunks] == ["#version 450\n", "#define A 1\n#define B 2\n", "void main() {}\n"]
+    assert "".join(text for _, text in chunks) == "\n".join(lines) + "\n"
+    # Chunks are named after their content, so shaders including the same file share them.
+    assert chunks[1][0] == split_chunks(lines[1:3], origins[1:3])[0][0]
+    assert get_shared_lines(origins) == {1, 2}
+
+    definitions = format_chunks(dict(chunks))
+    name = chunks[1][0]
+    assert f"#ifndef {name[1:].upper()}\n" in definitions
+    assert f"inline constexpr char {name}[] = {{" in definitions
+
+
+def test_get_rd_manifest(tmp_path):
+    (tmp_path / "common_inc.glsl").write_text("#define A 1\n", encoding="utf-8")
+    shader = tmp_path / "some_effect.glsl"
+    shader.write_text('#[compute]\n#version 450\n#include "common_inc.glsl"\nvoid main() {}\n', encoding="utf-8")
+
+    manifest = get_rd_manifest(str(shader))
+    assert manifest["class"] == "SomeEffectShaderRD"
+    assert [os.path.basename(x) for x in manifest["includes"]] == ["common_inc.glsl"]
+    assert len(manifest["stages"]["compute"]) == 3
+
+    # The source key only depends on the code, and changes with any of the included files.
+    assert get_rd_manifest(str(shader))["source_key"] == manifest["source_key"]
+    (tmp_path / "common_inc.glsl").write_text("#define A 2\n", encoding="utf-8")
+    os.utime(tmp_path / "common_inc.glsl", ns=(0, 0))
+    assert get_rd_manifest(str(shader))["source_key"] != manifest["source_key"]
@@ -0,0 +1,346 @@
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import zlib
+from collections import OrderedDict
+
+import pytest
+
+import methods
+from methods import EMBED_CODECS, compress, format_buffer, get_embed_codec, open_if_changed, write_file_if_changed
+
+
+@pytest.mark.parametrize("size", [0, 1, 23, 24, 1000])
+def test_format_buffer(size):
+    buffer = os.urandom(size)
+    formatted = format_buffer(buffer, indent=1)
+
+    assert bytes(int(x) for x in formatted.replace(",", " ").split()) == buffer
+    for line in formatted.splitlines():
+        assert line.startswith("\t")
+        assert len(line.expandtabs(4)) <= 120
+
+
+def test_write_file_if_changed(tmp_path):
+    path = str(tmp_path / "file.gen.h")
+
+    assert write_file_if_changed(path, "content\n")
+    mtime = os.stat(path).st_mtime_ns
+    assert not write_file_if_changed(path, "content\n")
+    assert os.stat(path).st_mtime_ns == mtime
+    assert write_file_if_changed(path, b"other content\n")
+    with open(path, "rb") as f:
+        assert f.read() == b"other content\n"
+
+
+def test_open_if_changed(tmp_path):
+    path = str(tmp_path / "file.gen.h")
+
+    with open_if_changed(path) as f:
+        f.write("line\n")
+    mtime = os.stat(path).st_mtime_ns
+    with open_if_changed(path) as f:
+        f.write("line\n")
+    assert os.stat(path).st_mtime_ns == mtime
+
+    with pytest.raises(RuntimeError):
+        with open_if_changed(path) as f:
+            f.write("partial")
+            raise RuntimeError
+    with open(path, "rb") as f:
+        assert f.read() == b"line\n"
+
+
+def test_compress(tmp_path, monkeypatch):
+    data = os.urandom(64) * 64
+    assert compress(data) == zlib.compress(data, zlib.Z_BEST_COMPRESSION)
+
+    monkeypatch.setattr(methods, "_compression_cache_path", str(tmp_path / "compressed"))
+    assert compress(data) == zlib.compress(data, zlib.Z_BEST_COMPRESSION)
+    (cached,) = (tmp_path / "compressed").iterdir()
+    # Cached payloads are returned as is.
+    cached.write_bytes(b"cached")
+    assert compress(data) == b"cached"
+
+
+@pytest.mark.parametrize("codec", EMBED_CODECS)
+def test_get_embed_codec(codec):
+    try:
+        compressor, decompressor, _ = get_embed_codec(codec)
+    except ImportError:
+        pytest.skip(f"No Python module for {codec}")
+    data = os.urandom(64) * 64
+    assert decompressor(compressor(data)) == data
+
+
+def test_get_embed_codec_unknown():
+    with pytest.raises(ValueError):
+        get_embed_codec("lzma")
+
+
+def test_build_profiler(tmp_path):
+    profiler = methods.BuildProfiler()
+    origin = profiler.origin
+    profiler.record(["core/object.o"], "compile", "", ["core/object.cpp"], origin, origin + 2.5)
+    profiler.record(["core/scu/scu_core.gen.o"], "compile", "", ["core/scu/scu_core.gen.cpp"], origin + 1, origin + 5)
+    profiler.record(["doc.gen.h"], "generator", "editor_builders.make_doc_header", ["doc.xml"], origin, origin + 0.5)
+    profiler.record(["bin/godot"], "link", "", ["core/object.o"], origin + 5, origin + 6)
+
+    trace = profiler.get_trace()["traceEvents"]
+    assert [event["name"] for event in trace] == [
+        "thread_name",
+        "core/object.o",
+        "core/scu/scu_core.gen.o",
+        "doc.gen.h",
+        "bin/godot",
+    ]
+    assert trace[1]["ts"] == 0 and trace[1]["dur"] == 2500000 and trace[1]["cat"] == "compile"
+    assert trace[3]["args"]["generator"] == "editor_builders.make_doc_header"
+
+    # Sources built in SCU files don't have their own compile time.
+    assert profiler.get_compile_times() == {"core/object.cpp": 2.5}
+
+    summary = profiler.get_summary(2)
+    assert summary[1].split() == ["compile", "6.50", "s"]
+    assert summary[summary.index("Slowest targets:") + 1].split() == ["4.00", "s", "compile", "core/scu/scu_core.gen.o"]
+    assert summary[-1].split() == ["0.50", "s", "editor_builders.make_doc_header"]
+
+    path = tmp_path / "profile.json"
+    profiler.write(str(path))
+    assert json.loads(path.read_text())["traceEvents"] == trace
+    assert json.loads((tmp_path / "profile.compile_times.json").read_text()) == {"core/object.cpp": 2.5}
+
+
+def test_update_cache_index(tmp_path):
+    cache_path = str(tmp_path)
+    for index, shard in enumerate(["0A", "0A", "1B"]):
+        (tmp_path / shard).mkdir(exist_ok=True)
+        path = tmp_path / shard / f"entry{index}"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + index, 1000 + index))
+
+    # The index is created from the contents of the cache the first time.
+    summary, evicted = methods.update_cache_index(cache_path, 0, [])
+    assert (summary["size"], summary["entries"], summary["shards"], evicted) == (300, 3, {"0A": 200, "1B": 100}, 0)
+
+    # Later builds only append their uses of the cache, without listing it.
+    (tmp_path / "1B" / "entry3").write_bytes(b"x" * 50)
+    events = [("hit", "0A/entry0", 100), ("miss", "", 0), ("push", "1B/entry3", 50)]
+    summary, evicted = methods.update_cache_index(cache_path, 0, events)
+    assert summary["size"] == 350 and summary["entries"] == 4 and summary["bytes_saved"] == 100
+    assert (summary["hits"], summary["misses"], summary["pushes"]) == (1, 1, 1)
+
+    # The least recently used entries are evicted, down to a ratio of the limit.
+    summary, evicted = methods.update_cache_index(cache_path, 200, [])
+    assert evicted == 2 and summary["size"] == 150 and summary["shards"] == {"0A": 100, "1B": 50}
+    assert sorted(os.listdir(tmp_path / "0A")) == ["entry0"]
+    assert sorted(os.listdir(tmp_path / "1B")) == ["entry3"]
+    entries = methods.read_cache_journal(str(tmp_path / methods.CACHE_INDEX_FOLDER / "journal"))
+    assert sorted(entries) == ["0A/entry0", "1B/entry3"]
+    assert summary["evictions"] == 2 and summary["evicted_bytes"] == 200
+
+    stats = methods.get_cache_stats(summary, events, evicted)
+    assert stats[1].startswith("This build: 1 hits, 1 misses (hit rate 50.0%)")
+    assert not os.path.exists(tmp_path / methods.CACHE_INDEX_FOLDER / "lock")
+
+
+def test_update_cache_index_concurrent_pushes(tmp_path, monkeypatch):
+    cache_path = str(tmp_path)
+    methods.update_cache_index(cache_path, 0, [])
+
+    # Two builds racing on the same entries both push them, which must not count them twice.
+    events = []
+    for index in range(4):
+        (tmp_path / "0A").mkdir(exist_ok=True)
+        (tmp_path / "0A" / f"entry{index}").write_bytes(b"x" * 1000)
+        events.append(("push", f"0A/entry{index}", 1000))
+    summary, evicted = methods.update_cache_index(cache_path, 0, events)
+    summary, evicted = methods.update_cache_index(cache_path, 0, events + events[:1])
+    assert (summary["size"], summary["entries"], summary["pushes"], evicted) == (4000, 4, 4, 0)
+
+    # So the cache fits in the limit, and no entry is evicted.
+    summary, evicted = methods.update_cache_index(cache_path, 5000, [])
+    assert evicted == 0 and len(os.listdir(tmp_path / "0A")) == 4
+
+    # Evictions leave the summary matching the journal, refreshing the lock while they run.
+    monkeypatch.setattr(methods, "CACHE_LOCK_TIMEOUT", 0)
+    summary, evicted = methods.update_cache_index(cache_path, 2500, [])
+    assert evicted == 2 and (summary["size"], summary["entries"], summary["shards"]) == (2000, 2, {"0A": 2000})
+    assert len(methods.read_cache_journal(str(tmp_path / methods.CACHE_INDEX_FOLDER / "journal"))) == 2
+
+
+def test_http_cache_backend(tmp_path):
+    from misc.scripts.cache_server import CacheServer
+
+    server = CacheServer(("127.0.0.1", 0), str(tmp_path / "cache"))
+    server.update_index()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        backend = methods.HTTPCacheBackend(f"http://127.0.0.1:{server.server_address[1]}", jobs=2)
+        assert backend.retrieve("0A/missing") is None
+
+        entry = tmp_path / "entry"
+        entry.write_bytes(b"object file")
+        backend.store("0A/0a1b2c", str(entry))
+        assert backend.wait() == 1
+        assert (tmp_path / "cache" / "0A" / "0a1b2c").read_bytes() == b"object file"
+        assert backend.retrieve("0A/0a1b2c") == b"object file"
+
+        # Keys can't escape the cache folder.
+        assert backend.retrieve("../entry") is None
+
+        # Checking for an entry isn't a hit.
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        connection.request("HEAD", "/0A/0a1b2c")
+        response = connection.getresponse()
+        assert (response.status, response.headers["Content-Length"]) == (200, "11")
+        response.read()
+
+        # Uploads which don't match their digest or are cut short aren't stored.
+        connection.request("PUT", "/0A/corrupted", b"object file", {methods.CACHE_DIGEST_HEADER: "0" * 64})
+        response = connection.getresponse()
+        assert response.status == 400
+        response.read()
+        connection.close()
+        with socket.create_connection(("127.0.0.1", server.server_address[1])) as client:
+            digest = hashlib.sha256(b"object file").hexdigest()
+            client.sendall(
+                f"PUT /0A/truncated HTTP/1.1\r\nContent-Length: 11\r\n{methods.CACHE_DIGEST_HEADER}: {digest}\r\n\r\n".encode()
+                + b"object"
+            )
+            client.shutdown(socket.SHUT_WR)
+            assert client.recv(1024).startswith(b"HTTP/1.0 400")
+        assert not (tmp_path / "cache" / "0A" / "corrupted").exists()
+        assert not (tmp_path / "cache" / "0A" / "truncated").exists()
+
+        summary = server.update_index()
+        assert (summary["hits"], summary["misses"], summary["pushes"], summary["size"]) == (1, 1, 1, 11)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Builds go on with the local cache only when the server is unavailable.
+    assert backend.retrieve("0A/0a1b2c") is None
+    assert not backend.available
+
+
+def test_detect_modules(tmp_path, monkeypatch):
+    monkeypatch.setattr(methods, "MODULE_CACHE_FILENAME", str(tmp_path / "modules.json"))
+    monkeypatch.setattr(methods, "_module_cache", None)
+
+    def add_module(name):
+        (tmp_path / "modules" / name).mkdir(parents=True)
+        for file in ["register_types.h", "SCsub", "config.py"]:
+            (tmp_path / "modules" / name / file).write_text("")
+
+    add_module("beta")
+    add_module("alpha")
+    search_path = str(tmp_path / "modules")
+    assert list(methods.detect_modules(search_path)) == ["alpha", "beta"]
+
+    # Unchanged folders aren't looked at again, even in a new run.
+    monkeypatch.setattr(methods, "_module_cache", None)
+    monkeypatch.setattr(methods, "is_module", None)
+    assert list(methods.detect_modules(search_path)) == ["alpha", "beta"]
+    monkeypatch.undo()
+    monkeypatch.setattr(methods, "MODULE_CACHE_FILENAME", str(tmp_path / "modules.json"))
+
+    # Adding a module, or a file making a folder a module, invalidates the results.
+    add_module("gamma")
+    assert list(methods.detect_modules(search_path)) == ["alpha", "beta", "gamma"]
+    os.remove(tmp_path / "modules" / "beta" / "SCsub")
+    assert list(methods.detect_modules(search_path)) == ["alpha", "gamma"]
+
+
+def test_sort_module_list():
+    class Env:
+        module_list = OrderedDict((name, f"modules/{name}") for name in ["a", "b", "c", "d", "e"])
+        module_dependencies = {"a": [["c"], ["e", "missing"]], "b": [["a"], []]}
+
+    methods.sort_module_list(Env)
+    assert list(Env.module_list) == ["e", "d", "c", "a", "b"]
+
+    Env.module_dependencies["c"] = [["b"], []]
+    with pytest.raises(SystemExit):
+        methods.sort_module_list(Env)
+
+
+def test_build_estimate():
+    durations = {"a.o": 10.0, "b.o": 10.0, "c.o": 20.0, "d.o": 40.0, "old.o": 5.0}
+    estimate = methods.BuildEstimate(durations, jobs=4, start=0)
+    assert estimate.get_remaining_work() == 85
+    assert estimate.get_remaining_time(now=0) == 85 / 4
+
+    # Up-to-date targets take no time, and the same share of the remaining ones is expected to be too.
+    estimate.visit("a.o")
+    estimate.visit("b.o")
+    estimate.record("b.o", 12.0)
+    assert estimate.get_remaining_work() == 65 * 0.5
+    assert estimate.get_progress() == 12 / (12 + 32.5)
+    # After a while, the speed observed so far is used instead of the number of jobs.
+    assert estimate.get_remaining_time(now=12) == 32.5 / 1
+
+    estimate.visit("c.o")
+    estimate.visit("d.o")
+    estimate.record("new.o", 3.0)
+    assert estimate.get_durations() == {**durations, "b.o": 12.0, "new.o": 3.0}
+    assert estimate.get_durations(prune=True) == {"a.o": 10.0, "b.o": 12.0, "c.o": 20.0, "d.o": 40.0, "new.o": 3.0}
+
+
+def test_format_duration():
+    assert methods.format_duration(5.5) == "0:05"
+    assert methods.format_duration(125) == "2:05"
+    assert methods.format_duration(3725) == "1:02:05"
+
+
+@pytest.mark.skipif(shutil.which("g++") is None, reason="g++ is not available")
+def test_embed_buffers_incbin(tmp_path):
+    def embed(name, buffers, **kwargs):
+        target = [str(tmp_path / f"{name}.gen.h"), str(tmp_path / f"{name}.gen.cpp"), str(tmp_path / f"{name}.gen.bin")]
+        with open(target[0], "w", encoding="utf-8") as f:
+            f.write(methods.embed_buffers(target, buffers, **kwargs))
+        return target[1]
+
+    # Same names in several generated files, as with the editor and default theme fonts.
+    sources = [embed("first", [("_data", b"first"), ("_empty", b"")]), embed("second", [("_data", b"second")])]
+    # Names defined by a macro, as with ICU's entry point.
+    (tmp_path / "entry.h").write_text("#define ENTRY_POINT entry_data_42\n")
+    sources.append(
+        embed(
+            "entry",
+            [("ENTRY_POINT", b"entry")],
+            declaration='extern "C" const unsigned char',
+            label_prefix="",
+            includes=["entry.h"],
+        )
+    )
+    (tmp_path / "second.cpp").write_text(
+        '#include "second.gen.h"\nconst unsigned char *get_second() { return _data; }\n'
+        "int get_second_size() { return sizeof(_data); }\n"
+    )
+    (tmp_path / "main.cpp").write_text("""\
+#include <cstring>
+#include "first.gen.h"
+#include "entry.h"
+#include "entry.gen.h"
+
+const unsigned char *get_second();
+int get_second_size();
+extern "C" const unsigned char entry_data_42[];
+
+int main() {
+	return !(sizeof(_data) == 5 && memcmp(_data, "first", 5) == 0 && sizeof(_empty) == 0 &&
+			get_second_size() == 6 && memcmp(get_second(), "second", 6) == 0 && memcmp(entry_data_42, "entry", 5) == 0);
+}
+""")
+
+    executable = str(tmp_path / "main")
+    command = ["g++", "-I", str(tmp_path), "-o", executable, str(tmp_path / "main.cpp"), str(tmp_path / "second.cpp")]
+    subprocess.run(command + sources, check=True)
+    assert subprocess.run([executable]).returncode == 0
@@ -0,0 +1,93 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from platform_methods import PkgConfig
+
+
+class Environment(dict):
+    def __init__(self, pc_folder):
+        super().__init__(ENV={"PATH": os.environ.get("PATH", ""), "PKG_CONFIG_LIBDIR": str(pc_folder)})
+        self.flags = []
+
+    def MergeFlags(self, flags):
+        self.flags += flags.split()
+
+
+def write_pc(path, name, cflags, requires=""):
+    path.write_text(
+        f"Name: {name}\nDescription: {name}\nVersion: 1.0\nRequires: {requires}\nCflags: {cflags}\nLibs: -l{name}\n"
+    )
+
+
+@pytest.mark.skipif(not shutil.which("pkg-config"), reason="pkg-config is not installed")
+def test_pkg_config(tmp_path, monkeypatch):
+    pc_folder = tmp_path / "pkgconfig"
+    pc_folder.mkdir()
+    write_pc(pc_folder / "foo.pc", "foo", "-DFOO")
+    write_pc(pc_folder / "bar.pc", "bar", "-DBAR")
+    cache_path = str(tmp_path / "cache.json")
+
+    pkg_config = PkgConfig(Environment(pc_folder), cache_path)
+    pkg_config.prefetch(["foo", "bar", "missing"])
+    env = Environment(pc_folder)
+    pkg_config.parse_config(env, "foo")
+    assert env.flags == ["-DFOO", "-lfoo"]
+    assert not pkg_config.exists("missing")
+    with pytest.raises(OSError):
+        pkg_config.parse_config(env, "missing")
+    pkg_config.save()
+
+    # Later runs don't spawn pkg-config, as long as the .pc files are unchanged.
+    def run(*args, **kwargs):
+        raise AssertionError("pkg-config should not run")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    pkg_config = PkgConfig(Environment(pc_folder), cache_path)
+    env = Environment(pc_folder)
+    pkg_config.parse_config(env, "bar")
+    assert env.flags == ["-DBAR", "-lbar"]
+    assert pkg_config.exists("foo") and not pkg_config.exists("missing")
+    monkeypatch.undo()
+
+    # Changed .pc files, or other settings of pkg-config, are probed again.
+    write_pc(pc_folder / "foo.pc", "foo", "-DFOO=2")
+    os.utime(pc_folder / "foo.pc", ns=(0, 0))
+    pkg_config = PkgConfig(Environment(pc_folder), cache_path)
+    env = Environment(pc_folder)
+    pkg_config.parse_config(env, "foo")
+    assert env.flags == ["-DFOO=2", "-lfoo"]
+
+    other_folder = tmp_path / "other"
+    other_folder.mkdir()
+    assert not PkgConfig(Environment(other_folder), cache_path).exists("foo")
+
+
+@pytest.mark.skipif(not shutil.which("pkg-config"), reason="pkg-config is not installed")
+def test_pkg_config_requires(tmp_path, monkeypatch):
+    pc_folder = tmp_path / "pkgconfig"
+    pc_folder.mkdir()
+    write_pc(pc_folder / "foo.pc", "foo", "-DFOO")
+    write_pc(pc_folder / "bar.pc", "bar", "-DBAR", requires="foo >= 1.0")
+    cache_path = str(tmp_path / "cache.json")
+
+    # Variables of the user's environment are used for the cache and the queries alike.
+    environment = Environment(pc_folder)
+    del environment["ENV"]["PKG_CONFIG_LIBDIR"]
+    monkeypatch.setenv("PKG_CONFIG_LIBDIR", str(pc_folder))
+    pkg_config = PkgConfig(environment, cache_path)
+    assert pkg_config.cache["folders"] == {str(pc_folder): os.stat(pc_folder).st_mtime_ns}
+    env = Environment(pc_folder)
+    pkg_config.parse_config(env, "bar")
+    assert env.flags == ["-DBAR", "-DFOO", "-lbar", "-lfoo"]
+    pkg_config.save()
+
+    # Results are probed again when a required package changes.
+    write_pc(pc_folder / "foo.pc", "foo", "-DFOO=2")
+    os.utime(pc_folder / "foo.pc", ns=(0, 0))
+    pkg_config = PkgConfig(environment, cache_path)
+    env = Environment(pc_folder)
+    pkg_config.parse_config(env, "bar")
+    assert env.flags == ["-DBAR", "-DFOO=2", "-lbar", "-lfoo"]
@@ -0,0 +1,236 @@
+import math
+import os
+import random
+
+import pytest
+
+import scu_builders
+from scu_builders import get_compile_costs, partition_sources
+
+
+def get_sources(count, seed=0):
+    rng = random.Random(seed)
+    sources = sorted(f"scene/gui/file_{i:03}.cpp" for i in range(count))
+    costs = {source: rng.choice([1, 1, 1, 2, 3, 10]) for source in sources}
+    return sources, costs
+
+
+def test_partition_sources():
+    sources, costs = get_sources(200)
+    ranges = partition_sources(sources, costs, 8, 32)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(sources)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(end - start <= 32 for start, end in ranges)
+    # No file should be much more expensive than the average, even with a few heavy sources.
+    file_costs = [sum(costs[source] for source in sources[start:end]) for start, end in ranges]
+    assert max(file_costs) <= 1.2 * sum(file_costs) / 8
+
+
+def test_partition_sources_limit():
+    sources, costs = get_sources(20)
+    assert [end - start for start, end in partition_sources(sources, costs, 1, 1)] == [1] * 20
+    assert partition_sources(sources, costs, 1, 1024) == [(0, 20)]
+    assert partition_sources([], {}, 1, 1024) == []
+
+
+@pytest.mark.parametrize(
+    "count,max_per_file,max_changed",
+    [
+        (400, 1024, 1.1),  # Limited by cost (4 files).
+        (50, 8, 2.5),  # Limited by the number of sources (7 files), as in `scene/3d`.
+    ],
+)
+def test_partition_sources_stable(count, max_per_file, max_changed):
+    sources, costs = get_sources(count)
+    num_output_files = 4 if max_per_file == 1024 else math.ceil(count / max_per_file)
+    ranges = partition_sources(sources, costs, num_output_files, max_per_file)
+    assert len(ranges) == num_output_files
+    files = {tuple(sources[start:end]) for start, end in ranges}
+
+    # Inserting a source only changes the SCU files around it, wherever it goes.
+    changed = []
+    for source in sources:
+        new_source = source.replace(".cpp", "_new.cpp")
+        new_sources = sorted(sources + [new_source])
+        new_costs = dict(costs, **{new_source: 2})
+        new_ranges = partition_sources(new_sources, new_costs, num_output_files, max_per_file)
+        changed.append(len({tuple(new_sources[start:end]) for start, end in new_ranges} - files))
+    assert sum(changed) / len(changed) <= max_changed
+    assert max(changed) <= 4
+
+
+def test_get_compile_costs(tmp_path, monkeypatch):
+    (tmp_path / "common.h").write_text("//" * 500)
+    (tmp_path / "heavy.h").write_text('#include "common.h"\n' + "//" * 5000)
+    (tmp_path / "light.cpp").write_text('#include "common.h"\n')
+    (tmp_path / "heavy.cpp").write_text('#include "heavy.h"\n')
+    monkeypatch.setattr(scu_builders, "base_folder_path", str(tmp_path) + "/")
+    monkeypatch.setattr(scu_builders, "_file_info_cache", {})
+
+    # The common header is shared between both sources, the heavy one only counts for its own.
+    costs = get_compile_costs(["heavy.cpp", "light.cpp"])
+    assert costs["light.cpp"] == 20 + 500
+    assert costs["heavy.cpp"] == 19 + 10020 + 500
+
+    # Measured times take precedence, and estimates are scaled to them.
+    monkeypatch.setattr(scu_builders, "_compile_times", {"heavy.cpp": 2.0})
+    costs = get_compile_costs(["heavy.cpp", "light.cpp"])
+    assert costs["heavy.cpp"] == 2.0
+    assert abs(costs["light.cpp"] - 2.0 * 520 / 10539) < 1e-9
+
+
+def test_hot_files(tmp_path, monkeypatch):
+    folder = tmp_path / "scene" / "gui"
+    folder.mkdir(parents=True)
+    for name in ["a", "b", "c"]:
+        (folder / f"{name}.cpp").write_text(f"// {name}\n")
+    monkeypatch.setattr(scu_builders, "base_folder_path", str(tmp_path) + "/")
+    monkeypatch.setattr(scu_builders, "base_folder_only", tmp_path.name)
+    monkeypatch.setattr(scu_builders, "_scu_folders", set())
+    monkeypatch.setattr(scu_builders, "_file_info_cache", {})
+    monkeypatch.setattr(scu_builders, "_included_files_cache", {})
+    monkeypatch.setattr(scu_builders, "_header_macros_cache", {})
+    monkeypatch.setattr(scu_builders, "_hot_files", set())
+    monkeypatch.setattr(scu_builders, "_hot_file_age", 0)
+    monkeypatch.chdir(tmp_path)
+
+    scu_builders.process_folder(["scene/gui"])
+    assert sorted(path.name for path in (folder / "scu").glob("*.cpp")) == ["scu_scene_gui.gen.cpp"]
+
+    # Recently modified sources are moved to their own file, the others stay batched.
+    os.utime(folder / "a.cpp", (0, 0))
+    os.utime(folder / "c.cpp", (0, 0))
+    scu_builders.set_hot_files("1")
+    scu_builders.process_folder(["scene/gui"])
+    assert sorted(path.name for path in (folder / "scu").glob("*.cpp")) == [
+        "scu_scene_gui.gen.cpp",
+        "scu_scene_gui_b.gen.cpp",
+    ]
+    assert (folder / "scu" / "scu_scene_gui.gen.cpp").read_text() == (
+        '#include "scene/gui/a.cpp"\n#include "scene/gui/c.cpp"\n'
+    )
+    assert (folder / "scu" / "scu_scene_gui_b.gen.cpp").read_text() == '#include "scene/gui/b.cpp"\n'
+
+    monkeypatch.setattr(scu_builders, "find_git_modified_files", lambda: {"scene/gui/c.cpp"})
+    scu_builders.set_hot_files("git")
+    scu_builders.process_folder(["scene/gui"])
+    assert sorted(path.name for path in (folder / "scu").glob("*.cpp")) == [
+        "scu_scene_gui.gen.cpp",
+        "scu_scene_gui_c.gen.cpp",
+    ]
+    assert (folder / "scu" / "scu_scene_gui_c.gen.cpp").read_text() == '#include "scene/gui/c.cpp"\n'
+
+    # Exceptions keep their file when others are added.
+    mtime = os.stat(folder / "scu" / "scu_scene_gui_c.gen.cpp").st_mtime_ns
+    monkeypatch.setattr(scu_builders, "find_git_modified_files", lambda: {"scene/gui/a.cpp", "scene/gui/c.cpp"})
+    scu_builders.set_hot_files("git")
+    scu_builders.process_folder(["scene/gui"])
+    assert os.stat(folder / "scu" / "scu_scene_gui_c.gen.cpp").st_mtime_ns == mtime
+
+
+def test_find_colliding_sources(tmp_path, monkeypatch):
+    sources = {
+        "common.h": "#define SHARED 1\n",
+        "a.cpp": '#include "common.h"\nstatic int helper() { return 0; }\nnamespace {\nstruct Data {};\n}\n',
+        "b.cpp": "static int helper() { return 1; }\nstruct Data {};\n",
+        "c.cpp": '#include "common.h"\n#define CHECK(x) x\nint used() { return SHARED; }\n',
+        "d.cpp": "#define SHARED 2\nint other() { return CHECK(0); }\n",
+        "e.cpp": '#define FEATURE_ENABLED\n#include "common.h"\n',
+        "f.cpp": '// Comments and strings are ignored: static int helper();\nconst char *text = "#define SHARED 3";\n',
+    }
+    for name, text in sources.items():
+        (tmp_path / name).write_text(text)
+    monkeypatch.setattr(scu_builders, "base_folder_path", str(tmp_path) + "/")
+    monkeypatch.setattr(scu_builders, "_file_info_cache", {})
+    monkeypatch.setattr(scu_builders, "_included_files_cache", {})
+    monkeypatch.setattr(scu_builders, "_header_macros_cache", {})
+
+    collisions = scu_builders.find_collisions(sorted(name for name in sources if name.endswith(".cpp")))
+    assert collisions == {
+        ("a.cpp", "b.cpp"): {"Data", "helper"},
+        ("a.cpp", "d.cpp"): {"SHARED"},
+        ("c.cpp", "d.cpp"): {"CHECK", "SHARED"},
+        ("e.cpp", None): {"FEATURE_ENABLED"},
+    }
+    # Isolating the most colliding sources is enough to build the others together.
+    exceptions = scu_builders.find_colliding_sources(sorted(name for name in sources if name.endswith(".cpp")))
+    assert exceptions == {"a.cpp", "c.cpp", "e.cpp"}
+    assert all(source in exceptions or other in exceptions for source, other in collisions)
+
+
+def make_scu_folder(tmp_path, monkeypatch, count):
+    """Creates a folder of `count` sources of various sizes, to generate SCU files with `process_folder`."""
+    folder = tmp_path / "scene" / "gui"
+    folder.mkdir(parents=True)
+    rng = random.Random(0)
+    for i in range(count):
+        (folder / f"file_{i:03}.cpp").write_text("//" * rng.choice([100, 100, 100, 200, 300, 1000]))
+    monkeypatch.setattr(scu_builders, "base_folder_path", str(tmp_path) + "/")
+    monkeypatch.setattr(scu_builders, "base_folder_only", tmp_path.name)
+    monkeypatch.setattr(scu_builders, "_scu_folders", set())
+    monkeypatch.setattr(scu_builders, "_file_info_cache", {})
+    monkeypatch.setattr(scu_builders, "_included_files_cache", {})
+    monkeypatch.setattr(scu_builders, "_header_macros_cache", {})
+    monkeypatch.setattr(scu_builders, "_hot_files", set())
+    monkeypatch.setattr(scu_builders, "_hot_file_age", 0)
+    monkeypatch.chdir(tmp_path)
+    return folder
+
+
+def read_scu_files(folder):
+    return {path.name: path.read_text() for path in (folder / "scu").glob("*.cpp")}
+
+
+def test_process_folder_hot_file_stable(tmp_path, monkeypatch):
+    folder = make_scu_folder(tmp_path, monkeypatch, 60)
+    scu_builders.process_folder(["scene/gui"], includes_per_scu=8)
+    files = read_scu_files(folder)
+    assert len(files) == 8
+
+    # Making a source hot only changes the SCU file it was in, besides adding its own.
+    for i in range(60):
+        source = f"scene/gui/file_{i:03}.cpp"
+        monkeypatch.setattr(scu_builders, "_hot_files", {source})
+        scu_builders.process_folder(["scene/gui"], includes_per_scu=8)
+        new_files = read_scu_files(folder)
+        assert new_files.pop(f"scu_scene_gui_file_{i:03}.gen.cpp") == f'#include "{source}"\n'
+        (changed,) = [name for name in files if new_files[name] != files[name]]
+        assert files[changed].replace(f'#include "{source}"\n', "") == new_files[changed]
+
+
+def test_process_folder_new_source_stable(tmp_path, monkeypatch):
+    folder = make_scu_folder(tmp_path, monkeypatch, 100)
+    scu_builders.process_folder(["scene/gui"], includes_per_scu=32)
+    files = read_scu_files(folder)
+    assert len(files) == 4
+
+    # Adding a source mostly only changes the SCU file it goes in, wherever it goes.
+    changed = []
+    for i in range(100):
+        new_source = folder / f"file_{i:03}_new.cpp"
+        new_source.write_text("//" * 150)
+        scu_builders.process_folder(["scene/gui"], includes_per_scu=32)
+        new_files = read_scu_files(folder)
+        assert new_files.keys() == files.keys()
+        changed.append(sum(new_files[name] != files[name] for name in files))
+        new_source.unlink()
+    assert sum(changed) / len(changed) <= 1.1
+    assert max(changed) <= 3
+
+
+def test_find_scu_folders(tmp_path, monkeypatch):
+    for folder in ["scene/gui", "scene/main", "platform/linuxbsd/export", "platform/web/export", "thirdparty/lib"]:
+        (tmp_path / folder).mkdir(parents=True)
+    (tmp_path / "scene" / "SCsub").write_text(
+        'env.add_source_files(env.scene_sources, "*.cpp")\n'
+        'env.add_source_files(env.scene_sources, "gui/*.cpp")\n'
+        'env.add_source_files(env.scene_sources, "main/node.cpp")\n'
+    )
+    (tmp_path / "platform" / "SCsub").write_text(
+        'for platform in platforms:\n    env.add_source_files(env.platform_sources, f"{platform}/export/*.cpp")\n'
+    )
+    (tmp_path / "thirdparty" / "lib" / "SCsub").write_text('env.add_source_files(env.sources, "*.cpp")\n')
+    monkeypatch.setattr(scu_builders, "base_folder_path", str(tmp_path) + "/")
+
+    assert scu_builders.find_scu_folders() == ["platform/linuxbsd/export", "platform/web/export", "scene", "scene/gui"]